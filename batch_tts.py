@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Couch to 5K Batched Speech Synthesis
+Sends several cues in one ElevenLabs request and cuts the audio back into cues using alignment timestamps
+"""
+
+import io
+import wave
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+def build_batch_text(texts: List[str], break_seconds: float = 1.0) -> Tuple[str, List[Tuple[int, int]]]:
+    """
+    Join cues into one request text separated by explicit break markers
+
+    Args:
+        texts: Normalized cue texts
+        break_seconds: Pause requested between cues (ElevenLabs allows up to 3 seconds)
+
+    Returns:
+        Tuple of (request text, list of (start, end) character offsets of each cue)
+    """
+    separator = f' <break time="{break_seconds:.1f}s" /> '
+    parts = []
+    offsets = []
+    position = 0
+    for i, text in enumerate(texts):
+        if i:
+            parts.append(separator)
+            position += len(separator)
+        parts.append(text)
+        offsets.append((position, position + len(text)))
+        position += len(text)
+    return "".join(parts), offsets
+
+
+def locate_cues(alignment: Dict, texts: List[str], request_text: str,
+                offsets: List[Tuple[int, int]]) -> List[Tuple[float, float]]:
+    """
+    Find when each cue starts and stops speaking in a batched response
+
+    The alignment normally covers the request text character for character. If
+    the provider dropped or rewrote the break markers, each cue is searched for
+    in the aligned characters instead.
+
+    Args:
+        alignment: "alignment" object from the with-timestamps response
+        texts: Cue texts in request order
+        request_text: Text that was sent
+        offsets: Character offsets of each cue in the request text
+
+    Returns:
+        List of (start_seconds, end_seconds) for each cue
+
+    Raises:
+        ValueError: When a cue cannot be found in the alignment
+    """
+    characters = alignment["characters"]
+    starts = alignment["character_start_times_seconds"]
+    ends = alignment["character_end_times_seconds"]
+    aligned_text = "".join(characters)
+
+    if aligned_text != request_text:
+        # Characters are usually one per entry; fall back to searching cue by cue
+        located = []
+        search_from = 0
+        for text in texts:
+            index = aligned_text.find(text, search_from)
+            if index < 0:
+                raise ValueError(f"Cue not found in alignment: {text[:50]}")
+            located.append((index, index + len(text)))
+            search_from = index + len(text)
+        offsets = located
+
+    return [(starts[start], ends[end - 1]) for start, end in offsets]
+
+
+def split_batch_audio(samples: np.ndarray, sample_rate: int, channels: int,
+                      spans: List[Tuple[float, float]], lead_in: float = 0.02) -> List[np.ndarray]:
+    """
+    Cut batched speech into one sample array per cue
+
+    Each cue starts just before its first character and runs until halfway
+    through the pause that separates it from the next cue.
+
+    Args:
+        samples: Interleaved int16 samples of the whole response
+        sample_rate: Sample rate in Hz
+        channels: Channel count
+        spans: (start_seconds, end_seconds) of each cue from locate_cues
+        lead_in: Seconds kept before the first character of each cue
+
+    Returns:
+        List of int16 sample arrays, one per cue
+    """
+    total_frames = len(samples) // channels
+    segments = []
+    for i, (start, end) in enumerate(spans):
+        cut_start = max(0.0, start - lead_in)
+        if i + 1 < len(spans):
+            cut_end = (end + spans[i + 1][0]) / 2
+        else:
+            cut_end = total_frames / sample_rate
+        first = min(int(cut_start * sample_rate), total_frames)
+        last = min(max(int(cut_end * sample_rate), first), total_frames)
+        segments.append(samples[first * channels:last * channels])
+    return segments
+
+
+def samples_to_wav_bytes(samples: np.ndarray, sample_rate: int, channels: int) -> bytes:
+    """
+    Wrap int16 samples in a WAV container so they can be cached like any other cue
+
+    Args:
+        samples: Interleaved int16 samples
+        sample_rate: Sample rate in Hz
+        channels: Channel count
+
+    Returns:
+        WAV file bytes
+    """
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.astype("<i2").tobytes())
+    return buffer.getvalue()
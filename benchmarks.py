@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+"""
+Couch to 5K Benchmarks
+Offline benchmark suite for script parsing, mixing, export, full-corpus rendering, calendar generation
+and command-line startup
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import statistics
+import tempfile
+import contextlib
+import subprocess
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from pydub import AudioSegment
+
+from generate_audio import C25KAudioGenerator, SAMPLE_RATE, CHANNELS, decode_audio_bytes, load_script
+from generate_calendar import generate_calendar, parse_time_and_timezone
+from export_ladder import rendition_outputs
+from roster_calendars import generate_roster_calendars
+from timeline_mixer import MusicBed, TimelineMixer, segment_to_samples
+from pcm_store import PCMCueStore
+from script_index import ScriptIndex, parse_script_lines, parse_script_reference
+
+REPO_DIR = Path(__file__).resolve().parent
+SCRIPTS_DIR = REPO_DIR / "C25K_Audio_Scripts"
+DEFAULT_BASELINE = REPO_DIR / "benchmark_baseline.json"
+
+WEEKDAY_SETS = [[0, 2, 4], [1, 3, 5], [0, 3, 6], [1, 4, 6], [2, 4, 6]]
+WEEKDAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+WORKOUT_TIMES = ["6:00 am EST", "7:30am CDT", "12 pm MST", "5:45 pm PDT", "9 pm UTC"]
+# Scripts that split a cue across lines in every way the original whole-file regex allowed
+PARSER_EDGE_CASES = [
+    '1:00 -\n"Dash and quote on different lines"\n',
+    '1:00\n- "Timestamp and dash on different lines"\n',
+    '1:00 - \n\n  "Blank lines before the quote"\n2:00 - "Next cue"\n',
+    '1:00 - "A cue\nspread over\nthree lines"\n',
+    '1:00 - ""\n2:00 - "After an empty cue"\n',
+    '0:30 - "Two cues" 0:45 - "on one line"\n',
+    '1:00 -\nNot a cue\n2:00 - "Real cue"\n',
+    '5:00 - "Unterminated\n6:00 - "quote\n',
+]
+# Modules whose import time is the startup cost of a command-line entry point
+STARTUP_MODULES = ["generate_audio", "generate_calendar", "calendar_server", "generate_c25k_audio"]
+
+
+@contextlib.contextmanager
+def quiet():
+    """
+    Silence stdout at the file-descriptor level while benchmarked code runs
+
+    Render worker processes inherit the redirected descriptor, so their
+    progress output is hidden as well.
+    """
+    sys.stdout.flush()
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    try:
+        os.dup2(devnull, 1)
+        yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(saved)
+        os.close(devnull)
+
+
+@contextlib.contextmanager
+def working_directory(path: Path):
+    """Run a block with a different current directory (the generator writes relative to it)"""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def script_files() -> List[Path]:
+    """Script files of the corpus, excluding the README (same selection as process_all_scripts)"""
+    return sorted(f for f in SCRIPTS_DIR.glob("*.txt") if not f.name.startswith("README"))
+
+
+def tone_samples(seconds: float) -> np.ndarray:
+    """Fixed-length cue stand-in in the mixer's internal format"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return np.repeat((np.sin(2 * np.pi * 220 * t) * 8000).astype(np.int16), CHANNELS)
+
+
+def build_45_minute_mixer(cue_count: int = 50, cue_seconds: float = 3.0) -> TimelineMixer:
+    """A 45-minute timeline with evenly spaced fixed-length cues"""
+    duration_ms = 45 * 60 * 1000
+    mixer = TimelineMixer(duration_ms, SAMPLE_RATE, CHANNELS)
+    cue = tone_samples(cue_seconds)
+    spacing_ms = duration_ms // cue_count
+    for i in range(cue_count):
+        mixer.add(cue, i * spacing_ms)
+    return mixer
+
+
+def check_parser_parity() -> List[str]:
+    """
+    Check that the streaming parser finds the same cues as the original whole-file regex
+
+    Returns:
+        Descriptions of the scripts where the two disagree (empty when they all match)
+    """
+    contents = {script_file.name: script_file.read_text(encoding="utf-8") for script_file in script_files()}
+    contents.update((f"edge case {i + 1}", content) for i, content in enumerate(PARSER_EDGE_CASES))
+    mismatches = []
+    for name, content in contents.items():
+        cues, _, _ = parse_script_lines(content.splitlines(keepends=True))
+        if cues != parse_script_reference(content):
+            mismatches.append(name)
+    return mismatches
+
+
+def bench_parse_scripts(workdir: Path):
+    """Parse every script in C25K_Audio_Scripts/"""
+    for script_file in script_files():
+        load_script(str(script_file))
+
+
+def make_indexed_parse_bench() -> Callable[[Path], None]:
+    """Load every script through a warm compiled index (nothing is reparsed)"""
+    index_dir = tempfile.mkdtemp(prefix="c25k_bench_index_")
+    index = ScriptIndex(Path(index_dir) / "script_index.json")
+    index.compile(str(script_file) for script_file in script_files())
+
+    def bench_load_indexed(workdir: Path):
+        warm = ScriptIndex(index.index_file)
+        for script_file in script_files():
+            warm.load(str(script_file))
+
+    return bench_load_indexed
+
+
+def bench_mix_45min(workdir: Path):
+    """Mix a 45-minute timeline with 50 cues"""
+    build_45_minute_mixer().render()
+
+
+def make_music_bed_bench() -> Callable[[Path], None]:
+    """Mix a 60-minute timeline with 60 cues over a looped, ducked 3-minute music track"""
+    t = np.arange(180 * SAMPLE_RATE) / SAMPLE_RATE
+    track = np.repeat((np.sin(2 * np.pi * 110 * t) * 12000).astype(np.int16), CHANNELS)
+    music = MusicBed(track, SAMPLE_RATE, CHANNELS)
+    duration_ms = 60 * 60 * 1000
+    cue = tone_samples(3.0)
+
+    def bench_mix_music_bed(workdir: Path):
+        mixer = TimelineMixer(duration_ms, SAMPLE_RATE, CHANNELS)
+        for i in range(60):
+            mixer.add(cue, i * 60 * 1000)
+        mixer.set_music_bed(music)
+        mixer.render()
+
+    return bench_mix_music_bed
+
+
+def make_cue_load_bench(mapped: bool) -> Callable[[Path], None]:
+    """Load 50 cached 3-second cues onto a 45-minute timeline, from MP3 or memory-mapped from the PCM store"""
+    cues = {}
+    for i in range(50):
+        # Distinct cues, so nothing is shared between decodes
+        segment = AudioSegment(data=(tone_samples(3.0) // (i + 1)).tobytes(), sample_width=2,
+                               frame_rate=SAMPLE_RATE, channels=CHANNELS)
+        cues[f"{i:064x}"] = segment.export(format="mp3", bitrate="128k").read()
+    store = PCMCueStore(tempfile.mkdtemp(prefix="c25k_bench_pcm_"), SAMPLE_RATE, CHANNELS)
+    for key, audio_bytes in cues.items():
+        store.put(key, segment_to_samples(decode_audio_bytes(audio_bytes), SAMPLE_RATE, CHANNELS))
+    spacing_ms = 45 * 60 * 1000 // len(cues)
+
+    def bench_load_cues(workdir: Path):
+        timeline = TimelineMixer(45 * 60 * 1000, SAMPLE_RATE, CHANNELS)
+        for i, (key, audio_bytes) in enumerate(cues.items()):
+            if mapped:
+                samples = store.get(key)
+            else:
+                samples = segment_to_samples(decode_audio_bytes(audio_bytes), SAMPLE_RATE, CHANNELS)
+            timeline.add(samples, i * spacing_ms, -3.0)
+        timeline.render()
+
+    return bench_load_cues
+
+
+def make_export_bench() -> Callable[[Path], None]:
+    """MP3 export of a mixed 45-minute timeline (mixing is done once, outside the timing)"""
+    segment = build_45_minute_mixer().to_audio_segment()
+
+    def bench_export_mp3(workdir: Path):
+        segment.export(str(workdir / "export.mp3"), format="mp3", bitrate="128k")
+
+    return bench_export_mp3
+
+
+def make_ladder_bench() -> Callable[[Path], None]:
+    """Export a mixed 45-minute timeline as 128k MP3 plus 64k MP3, 48k Opus and 96k AAC in one pass"""
+    mixer = build_45_minute_mixer()
+    samples = mixer.render()
+    renditions = [("mp3", "128k"), ("mp3", "64k"), ("opus", "48k"), ("aac", "96k")]
+
+    def bench_export_ladder(workdir: Path):
+        mixer.export_renditions(rendition_outputs(workdir / "export.mp3", renditions), samples=samples)
+
+    return bench_export_ladder
+
+
+def make_corpus_bench(jobs: int) -> Callable[[Path], None]:
+    """Render the full corpus with the tone TTS backend"""
+    def bench_render_corpus(workdir: Path):
+        with working_directory(workdir):
+            generator = C25KAudioGenerator("", tts_backend="tone", use_cache=False,
+                                           max_concurrency=4)
+            generator.process_all_scripts(str(SCRIPTS_DIR), force_regenerate=True, jobs=jobs)
+
+    return bench_render_corpus
+
+
+def make_calendar_bench(count: int) -> Callable[[Path], None]:
+    """Generate many ICS calendars with varied start dates, days and times"""
+    rng = random.Random(5)
+    plans = []
+    for i in range(count):
+        start = datetime(2025, 1, 1) + timedelta(days=rng.randrange(365))
+        workout_time, tz = parse_time_and_timezone(rng.choice(WORKOUT_TIMES))
+        plans.append((start, rng.choice(WEEKDAY_SETS), workout_time, tz))
+
+    def bench_calendars(workdir: Path):
+        for i, (start, days, workout_time, tz) in enumerate(plans):
+            generate_calendar(start, days, workout_time, tz, str(workdir / f"calendar_{i % 100}.ics"))
+
+    return bench_calendars
+
+
+def make_roster_bench(count: int, jobs: int) -> Callable[[Path], None]:
+    """Generate a cohort's calendars from a CSV roster in bulk mode"""
+    rng = random.Random(5)
+    roster_dir = Path(tempfile.mkdtemp(prefix="c25k_bench_roster_"))
+    roster_file = roster_dir / "roster.csv"
+    with open(roster_file, "w", encoding="utf-8") as f:
+        f.write("start_date,workout_days,workout_time,output\n")
+        for i in range(count):
+            start = datetime(2025, 1, 1) + timedelta(days=rng.randrange(365))
+            days = ",".join(WEEKDAY_NAMES[day] for day in rng.choice(WEEKDAY_SETS))
+            f.write(f'{start:%Y-%m-%d},"{days}",{rng.choice(WORKOUT_TIMES)},calendar_{i % 100}.ics\n')
+
+    def bench_roster(workdir: Path):
+        generate_roster_calendars(str(roster_file), str(workdir), jobs)
+
+    return bench_roster
+
+
+def make_startup_bench(args: List[str]) -> Callable[[Path], None]:
+    """Start a fresh interpreter with the given arguments, as a user launching a command would"""
+    command = [sys.executable] + args
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(REPO_DIR), os.environ.get("PYTHONPATH")])))
+
+    def bench_startup(workdir: Path):
+        subprocess.run(command, cwd=workdir, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    return bench_startup
+
+
+def run_benchmark(name: str, bench: Callable[[Path], None], repeat: int) -> Dict:
+    """
+    Time a benchmark several times, each run in a fresh scratch directory
+
+    Args:
+        name: Benchmark name
+        bench: Function called with the scratch directory
+        repeat: Number of timed runs
+
+    Returns:
+        Result with the median, minimum and every run time in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory(prefix=f"c25k_bench_{name}_") as workdir:
+            with quiet():
+                started = time.perf_counter()
+                bench(Path(workdir))
+                times.append(time.perf_counter() - started)
+    return {"median_s": statistics.median(times), "min_s": min(times), "runs": times}
+
+
+def build_suite(jobs: int, calendars: int, quick: bool) -> Dict[str, tuple]:
+    """
+    Assemble the benchmark suite
+
+    Args:
+        jobs: Worker count for the parallel corpus render
+        calendars: Number of calendars to generate
+        quick: Fewer repeats, for a fast sanity run
+
+    Returns:
+        Mapping of benchmark name to (factory returning the benchmark function, repeat count)
+    """
+    repeat = 1 if quick else 5
+    suite = {
+        "parse_scripts": (lambda: bench_parse_scripts, repeat * 4),
+        "load_scripts_indexed": (make_indexed_parse_bench, repeat * 4),
+        "mix_45min_50_cues": (lambda: bench_mix_45min, repeat),
+        "mix_60min_music_bed": (make_music_bed_bench, repeat),
+        "load_cues_decoded_mp3": (lambda: make_cue_load_bench(False), repeat),
+        "load_cues_mapped_pcm": (lambda: make_cue_load_bench(True), repeat),
+        "export_mp3_45min": (make_export_bench, 1 if quick else 3),
+        "export_ladder_45min": (make_ladder_bench, 1),
+        "render_corpus_1_worker": (lambda: make_corpus_bench(1), 1),
+        f"render_corpus_{jobs}_workers": (lambda: make_corpus_bench(jobs), 1),
+        f"calendars_{calendars}": (lambda: make_calendar_bench(calendars), 1 if quick else 3),
+        f"roster_calendars_{calendars}": (lambda: make_roster_bench(calendars, jobs), 1 if quick else 3),
+        "startup_python": (lambda: make_startup_bench(["-c", "pass"]), repeat * 2),
+    }
+    for module in STARTUP_MODULES:
+        suite[f"import_{module}"] = (lambda module=module: make_startup_bench(["-c", f"import {module}"]), repeat * 2)
+    suite.update({
+        "cli_generate_audio_dry_run": (lambda: make_startup_bench(
+            [str(REPO_DIR / "generate_audio.py"), "--dry-run", "--scripts-dir", str(SCRIPTS_DIR)]), repeat * 2),
+        "cli_generate_calendar": (lambda: make_startup_bench(
+            [str(REPO_DIR / "generate_calendar.py"), "--start-date", "2025-06-09", "--workout-days", "Mon,Wed,Fri",
+             "--workout-time", "7:00am America/Chicago", "--output", "calendar.ics"]), repeat * 2),
+    })
+    return suite
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """
+    Find benchmarks whose median got slower than the baseline by more than a threshold
+
+    Args:
+        results: Current results
+        baseline: Results loaded from a baseline file
+        threshold: Allowed slowdown as a fraction (0.1 = 10%)
+
+    Returns:
+        Names of regressed benchmarks
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if result["median_s"] > previous["median_s"] * (1 + threshold):
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Couch to 5K offline benchmark suite")
+    parser.add_argument("--only", help="Comma-separated benchmark names to run (default: all)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Workers for the parallel corpus render (default: CPU count)")
+    parser.add_argument("--calendars", type=int, default=10000, help="Calendars to generate (default: 10000)")
+    parser.add_argument("--quick", action="store_true", help="Run every benchmark once")
+    parser.add_argument("--save-baseline", nargs="?", const=str(DEFAULT_BASELINE),
+                        help=f"Store the results as the baseline (default: {DEFAULT_BASELINE.name})")
+    parser.add_argument("--compare", nargs="?", const=str(DEFAULT_BASELINE),
+                        help=f"Compare against a baseline and exit non-zero on regressions (default: {DEFAULT_BASELINE.name})")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Slowdown that counts as a regression, as a fraction (default: 0.10)")
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    suite = build_suite(max(1, args.jobs), args.calendars, args.quick)
+    if args.only:
+        selected = [name.strip() for name in args.only.split(",")]
+        unknown = [name for name in selected if name not in suite]
+        if unknown:
+            print(f"❌ Unknown benchmarks: {', '.join(unknown)} (available: {', '.join(suite)})")
+            sys.exit(2)
+        suite = {name: suite[name] for name in selected}
+
+    baseline: Optional[Dict] = None
+    if args.compare:
+        try:
+            with open(args.compare, "r", encoding="utf-8") as f:
+                baseline = json.load(f)["results"]
+        except FileNotFoundError:
+            print(f"❌ Baseline not found: {args.compare} (create one with --save-baseline)")
+            sys.exit(2)
+
+    print("⏱️  Couch to 5K Benchmarks")
+    print("=" * 60)
+
+    mismatches = check_parser_parity()
+    if mismatches:
+        print(f"❌ Streaming parser disagrees with the reference parser on: {', '.join(mismatches)}")
+        sys.exit(1)
+    print(f"✅ Parser parity: {len(script_files()) + len(PARSER_EDGE_CASES)} scripts match the reference parser")
+
+    results = {}
+    for name, (factory, repeat) in suite.items():
+        with quiet():
+            bench = factory()
+        result = run_benchmark(name, bench, repeat)
+        results[name] = result
+
+        line = f"{name:<28} {result['median_s'] * 1000:>10.1f} ms  (min {result['min_s'] * 1000:.1f} ms, {repeat}x)"
+        previous = baseline.get(name) if baseline else None
+        if previous:
+            change = result["median_s"] / previous["median_s"] - 1
+            marker = "🔴" if change > args.threshold else "🟢"
+            line += f"  {marker} {change:+.1%}"
+        print(line)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results written to {path}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n🔴 {len(regressions)} regression(s) above {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\n🟢 No regressions above {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
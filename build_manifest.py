@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Couch to 5K Build Manifest
+Records what each generated audio file was built from so only stale outputs are rebuilt
+"""
+
+import json
+import hashlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from cue_cache import atomic_write_bytes
+
+# Human-readable names for fingerprint fields, used in stale reasons
+FINGERPRINT_LABELS = {
+    "cues_hash": "script cues changed",
+    "duration": "workout duration changed",
+    "voice_id": "voice changed",
+    "model_id": "model changed",
+    "format": "export format changed",
+    "bitrate": "export bitrate changed",
+    "renditions": "export renditions changed",
+    "music": "music bed changed",
+    "loudness": "cue loudness normalization changed",
+}
+
+
+def hash_cues(timestamps: List[Tuple[float, str]]) -> str:
+    """
+    Hash a parsed cue list
+
+    Args:
+        timestamps: List of (timestamp_seconds, text) tuples
+
+    Returns:
+        Hex SHA-256 digest of the cue list
+    """
+    payload = json.dumps([[timestamp, text] for timestamp, text in timestamps], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def build_fingerprint(timestamps: List[Tuple[float, str]], duration: int, voice_id: str,
+                      model_id: str, audio_format: str, bitrate: str,
+                      renditions: Optional[List[Tuple[str, str]]] = None, music: Optional[str] = None,
+                      loudness: Optional[str] = None) -> Dict:
+    """
+    Describe everything that determines the content of a rendered workout
+
+    Args:
+        timestamps: Parsed cue list of the script
+        duration: Workout duration in seconds
+        voice_id: ElevenLabs voice ID
+        model_id: ElevenLabs model ID
+        audio_format: Export format
+        bitrate: Export bitrate
+        renditions: Additional (format, bitrate) renditions; left out of the
+                    fingerprint when there are none, so single-format builds keep theirs
+        music: Fingerprint of the music bed and its settings, if the workout has one
+        loudness: Loudness target and true-peak ceiling cues were normalized to, if they were
+
+    Returns:
+        Fingerprint dictionary stored in the manifest
+    """
+    fingerprint = {
+        "cues_hash": hash_cues(timestamps),
+        "duration": duration,
+        "voice_id": voice_id,
+        "model_id": model_id,
+        "format": audio_format,
+        "bitrate": bitrate,
+    }
+    if renditions:
+        fingerprint["renditions"] = [f"{rendition_format}:{rendition_bitrate}"
+                                     for rendition_format, rendition_bitrate in renditions]
+    if music:
+        fingerprint["music"] = music
+    if loudness:
+        fingerprint["loudness"] = loudness
+    return fingerprint
+
+
+def diff_cues(previous: List[Dict], current: List[Dict]) -> Dict[str, List[Dict]]:
+    """
+    Compare the cue list of the last render with the newly parsed one
+
+    Cues are matched by their content address, so a cue that only moved in
+    time is reused rather than synthesized again.
+
+    Args:
+        previous: Cue records ({"timestamp", "text", "key"}) from the manifest
+        current: Cue records for the script as it is now
+
+    Returns:
+        Dictionary with "unchanged", "retimed", "new" and "removed" cue records
+    """
+    previous_by_key = {}
+    for cue in previous:
+        previous_by_key.setdefault(cue["key"], []).append(cue["timestamp"])
+
+    plan = {"unchanged": [], "retimed": [], "new": [], "removed": []}
+    for cue in current:
+        timestamps = previous_by_key.get(cue["key"])
+        if timestamps is None:
+            plan["new"].append(cue)
+        elif cue["timestamp"] in timestamps:
+            plan["unchanged"].append(cue)
+        else:
+            plan["retimed"].append(cue)
+
+    current_keys = {cue["key"] for cue in current}
+    plan["removed"] = [cue for cue in previous if cue["key"] not in current_keys]
+    return plan
+
+
+class BuildManifest:
+    def __init__(self, output_dir: str = "generated_audio"):
+        """
+        Initialize the manifest
+
+        Each script gets its own entry file under <output_dir>/.build, so parallel
+        render workers never write the same file.
+
+        Args:
+            output_dir: Directory holding the generated audio files
+        """
+        self.output_dir = Path(output_dir)
+        self.manifest_dir = self.output_dir / ".build"
+
+    def _entry_path(self, script_name: str) -> Path:
+        return self.manifest_dir / f"{script_name}.json"
+
+    def _pending_path(self, script_name: str) -> Path:
+        return self.manifest_dir / f"{script_name}.pending"
+
+    def start(self, script_name: str, fingerprint: Dict):
+        """
+        Mark a build of a script as started; record() clears the mark
+
+        A mark left behind by a paused or interrupted build lets the next run tell
+        a resume of that build from a fresh one.
+
+        Args:
+            script_name: Script file stem
+            fingerprint: Fingerprint the build is working towards
+        """
+        self.manifest_dir.mkdir(parents=True, exist_ok=True)
+        atomic_write_bytes(self._pending_path(script_name),
+                           json.dumps(fingerprint, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+
+    def was_started(self, script_name: str, fingerprint: Dict) -> bool:
+        """Whether a build towards this fingerprint was started and never recorded"""
+        try:
+            with open(self._pending_path(script_name), "r", encoding="utf-8") as f:
+                return json.load(f) == fingerprint
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+
+    def get(self, script_name: str) -> Optional[Dict]:
+        """
+        Load the manifest entry of a script
+
+        Args:
+            script_name: Script file stem
+
+        Returns:
+            Entry dictionary, or None if the script was never built (or the entry is unreadable)
+        """
+        try:
+            with open(self._entry_path(script_name), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def stale_reasons(self, script_name: str, output_file: Path, fingerprint: Dict,
+                      extra_outputs: Optional[List[Path]] = None) -> List[str]:
+        """
+        Explain why an output needs to be rebuilt
+
+        Args:
+            script_name: Script file stem
+            output_file: Expected output path
+            fingerprint: Fingerprint of the current script and settings
+            extra_outputs: Other files the same build produces (additional renditions)
+
+        Returns:
+            List of reasons; empty if the output is up to date
+        """
+        if not output_file.exists():
+            return ["output missing"]
+        missing = [path.name for path in extra_outputs or [] if not path.exists()]
+        if missing:
+            return [f"rendition missing ({', '.join(missing)})"]
+
+        entry = self.get(script_name)
+        if entry is None:
+            return ["no build record (built before manifests were introduced)"]
+
+        reasons = []
+        previous = entry.get("fingerprint", {})
+        for field, label in FINGERPRINT_LABELS.items():
+            if previous.get(field) != fingerprint.get(field):
+                if field in ("cues_hash", "duration"):
+                    reasons.append(label)
+                else:
+                    reasons.append(f"{label} ({previous.get(field)} → {fingerprint.get(field)})")
+
+        if entry.get("output_size") != output_file.stat().st_size:
+            reasons.append("output file modified since it was built")
+
+        return reasons
+
+    def record(self, script_name: str, script_file: str, output_file: Path, fingerprint: Dict, **extra):
+        """
+        Store the build record of a freshly rendered output
+
+        Args:
+            script_name: Script file stem
+            script_file: Path to the script file
+            output_file: Path to the rendered output
+            fingerprint: Fingerprint the output was built from
+            **extra: Additional fields stored with the entry
+        """
+        entry = {
+            "script": str(script_file),
+            "output": output_file.name,
+            "output_size": output_file.stat().st_size,
+            "built_at": datetime.now(timezone.utc).isoformat(),
+            "fingerprint": fingerprint,
+        }
+        entry.update(extra)
+
+        self.manifest_dir.mkdir(parents=True, exist_ok=True)
+        atomic_write_bytes(self._entry_path(script_name),
+                           json.dumps(entry, indent=2, ensure_ascii=False).encode("utf-8"))
+        try:
+            self._pending_path(script_name).unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Couch to 5K Calendar Server
+Serves subscribable calendar feeds built from query parameters, with an LRU of rendered
+calendars and ETag revalidation so polling clients get cheap 304 responses
+"""
+
+import json
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+from datetime import datetime, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from generate_calendar import WORKOUTS, get_timezone, parse_time_and_timezone, parse_workout_days
+
+DEFAULT_CACHE_ENTRIES = 10000
+# How long clients may reuse a feed before revalidating it
+DEFAULT_MAX_AGE = 3600
+# Bump when the rendered feed changes for the same parameters (template or serialization changes);
+# edits to the workouts themselves are picked up from WORKOUTS
+FEED_FORMAT_VERSION = 1
+
+
+class LRUCache:
+    def __init__(self, max_entries: int):
+        """
+        Initialize a thread-safe least-recently-used cache
+
+        Args:
+            max_entries: Entries kept before the least recently used one is evicted
+        """
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: tuple, value: bytes):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+def normalize_feed_params(query: Dict[str, list]) -> tuple:
+    """
+    Validate feed query parameters and reduce them to a canonical cache key
+
+    Equivalent spellings ("Mon,Wed,Fri" and "friday,monday,wednesday", "7 am"
+    and "7:00am") map to the same key, so they share one cache entry and ETag.
+
+    Args:
+        query: Parsed query string with start (YYYY-MM-DD), days (e.g. "Mon,Wed,Fri"),
+               time (e.g. "7:00 am") and tz (e.g. "CDT"; may instead be part of time)
+
+    Returns:
+        Tuple of (start date, sorted weekday numbers, hour, minute, timezone name)
+
+    Raises:
+        ValueError: When a parameter is missing or invalid
+    """
+    def param(name: str) -> str:
+        values = query.get(name)
+        if not values or not values[0].strip():
+            raise ValueError(f"Missing query parameter: {name}")
+        return values[0].strip()
+
+    start_date = datetime.strptime(param("start"), '%Y-%m-%d').date()
+    workout_days = tuple(sorted(set(parse_workout_days(param("days")))))
+    if not workout_days:
+        raise ValueError("At least one workout day must be specified")
+    time_str = param("time")
+    if query.get("tz"):
+        time_str = f"{time_str} {param('tz')}"
+    workout_time, timezone = parse_time_and_timezone(time_str)
+    return start_date, workout_days, workout_time.hour, workout_time.minute, timezone.key
+
+
+def feed_version() -> str:
+    """Hash of everything besides the feed parameters that a rendered calendar depends on"""
+    content = json.dumps({"format": FEED_FORMAT_VERSION, "workouts": WORKOUTS}, sort_keys=True)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def feed_etag(key: tuple, version: str) -> str:
+    """
+    ETag of a feed, known without rendering it
+
+    Args:
+        key: Normalized feed parameters from normalize_feed_params
+        version: Result of feed_version
+
+    Returns:
+        Quoted ETag
+    """
+    start_date, workout_days, hour, minute, timezone_name = key
+    identity = f"{version}|{start_date.isoformat()}|{','.join(map(str, workout_days))}|{hour}:{minute}|{timezone_name}"
+    return f'"{hashlib.sha256(identity.encode("utf-8")).hexdigest()[:32]}"'
+
+
+class CalendarServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080, cache_entries: int = DEFAULT_CACHE_ENTRIES,
+                 max_age: int = DEFAULT_MAX_AGE):
+        """
+        Initialize the calendar server
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free port)
+            cache_entries: Rendered calendars kept in memory
+            max_age: Seconds clients may cache a feed before revalidating
+        """
+        super().__init__((host, port), CalendarHandler)
+        self.cache = LRUCache(cache_entries)
+        self.max_age = max_age
+        self.version = feed_version()
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "hits": 0, "misses": 0, "not_modified": 0, "errors": 0}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "CalendarServer":
+        """Serve requests on a background thread"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def count(self, stat: str):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def etag(self, key: tuple) -> str:
+        """ETag of a feed, derived from its parameters so revalidation never renders"""
+        return feed_etag(key, self.version)
+
+    def feed(self, key: tuple) -> bytes:
+        """
+        Get a rendered calendar, rendering it on a cache miss
+
+        Args:
+            key: Normalized feed parameters from normalize_feed_params
+
+        Returns:
+            ICS bytes
+        """
+        body = self.cache.get(key)
+        if body is not None:
+            self.count("hits")
+            return body
+
+        self.count("misses")
+        # icalendar is only loaded once the first feed is rendered
+        from roster_calendars import get_template
+        start_date, workout_days, hour, minute, timezone_name = key
+        body = get_template().render(datetime.combine(start_date, time(0)), list(workout_days),
+                                     time(hour, minute), get_timezone(timezone_name))
+        self.cache.put(key, body)
+        return body
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches an ETag (weak comparison, as RFC 9110 requires for it)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+class CalendarHandler(BaseHTTPRequestHandler):
+    server: CalendarServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None,
+              include_body: bool = True):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if include_body:
+            self.wfile.write(body)
+
+    def _serve(self, include_body: bool):
+        server = self.server
+        server.count("requests")
+        url = urlsplit(self.path)
+
+        if url.path == "/stats":
+            with server.lock:
+                stats = dict(server.stats, entries=len(server.cache))
+            self._send(200, json.dumps(stats).encode("utf-8"), "application/json", include_body=include_body)
+            return
+        if url.path not in ("/calendar.ics", "/calendar"):
+            self._send(404, b"Not found\n", "text/plain; charset=utf-8", include_body=include_body)
+            return
+
+        try:
+            key = normalize_feed_params(parse_qs(url.query))
+        except ValueError as e:
+            server.count("errors")
+            self._send(400, f"{e}\n".encode("utf-8"), "text/plain; charset=utf-8", include_body=include_body)
+            return
+
+        etag = server.etag(key)
+        headers = {"ETag": etag, "Cache-Control": f"public, max-age={server.max_age}"}
+        if etag_matches(self.headers.get("If-None-Match"), etag):
+            server.count("not_modified")
+            self.send_response(304)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+        body = server.feed(key)
+        headers["Content-Disposition"] = 'inline; filename="couch_to_5k_calendar.ics"'
+        self._send(200, body, "text/calendar; charset=utf-8", headers, include_body)
+
+    def do_GET(self):
+        self._serve(include_body=True)
+
+    def do_HEAD(self):
+        self._serve(include_body=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve subscribable Couch to 5K calendar feeds")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument("--cache-entries", type=int, default=DEFAULT_CACHE_ENTRIES,
+                        help=f"Rendered calendars kept in memory (default: {DEFAULT_CACHE_ENTRIES})")
+    parser.add_argument("--max-age", type=int, default=DEFAULT_MAX_AGE,
+                        help=f"Seconds clients may cache a feed before revalidating (default: {DEFAULT_MAX_AGE})")
+    args = parser.parse_args()
+
+    server = CalendarServer(args.host, args.port, args.cache_entries, args.max_age)
+    print(f"📅 Calendar server listening on {server.url}")
+    print(f"💡 Subscribe to: {server.url}/calendar.ics?start=2025-06-09&days=Mon,Wed,Fri&time=7:00am&tz=CDT")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        with server.lock:
+            print(f"\n📊 {server.stats['requests']} requests, {server.stats['hits']} cache hits, "
+                  f"{server.stats['misses']} renders, {server.stats['not_modified']} not modified")
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Couch to 5K Cue Cache
+Content-addressed on-disk cache of synthesized speech cues shared across all scripts
+"""
+
+import os
+import re
+import json
+import hashlib
+import tempfile
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+
+# Encodings a cue can be stored in: MP3 straight from the API, or WAV cut from a batched request
+AUDIO_EXTENSIONS = ("mp3", "wav")
+
+
+def normalize_cue_text(text: str) -> str:
+    """
+    Normalize cue text so trivially different spellings share one cache entry
+
+    Case and punctuation are kept because they change how the voice reads the cue.
+
+    Args:
+        text: Raw cue text from a script
+
+    Returns:
+        Text with unicode normalized and whitespace collapsed
+    """
+    text = unicodedata.normalize("NFC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def cue_cache_key(text: str, voice_id: str, model_id: str) -> str:
+    """
+    Build the content address of a cue
+
+    Args:
+        text: Cue text (normalized before hashing)
+        voice_id: ElevenLabs voice ID
+        model_id: ElevenLabs model ID
+
+    Returns:
+        Hex SHA-256 digest identifying the rendered cue
+    """
+    payload = "\x1f".join([voice_id, model_id, normalize_cue_text(text)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def audio_extension(data: bytes) -> str:
+    """
+    Pick the file extension for encoded cue audio
+
+    Args:
+        data: Encoded audio bytes
+
+    Returns:
+        "wav" for RIFF/WAVE data, otherwise "mp3"
+    """
+    return "wav" if data[:4] == b"RIFF" else "mp3"
+
+
+def find_cue_file(directory: Path, key: str) -> Optional[Path]:
+    """
+    Locate a stored cue regardless of its encoding
+
+    Args:
+        directory: Directory holding cue files
+        key: Content address from cue_cache_key
+
+    Returns:
+        Path of the cue file, or None if it is not stored
+    """
+    for extension in AUDIO_EXTENSIONS:
+        path = directory / f"{key}.{extension}"
+        if path.exists():
+            return path
+    return None
+
+
+def iter_cue_files(directory: Path) -> Iterator[Path]:
+    """Iterate over every stored cue file in a directory"""
+    for extension in AUDIO_EXTENSIONS:
+        yield from directory.glob(f"*.{extension}")
+
+
+def loudness_path(directory: Path, key: str) -> Path:
+    """File holding a cue's loudness measurement, next to its audio"""
+    return directory / f"{key}.loudness.json"
+
+
+def read_loudness(directory: Path, key: str) -> Optional[Dict]:
+    """
+    Load a cue's stored loudness measurement
+
+    Args:
+        directory: Directory holding cue files
+        key: Content address from cue_cache_key
+
+    Returns:
+        Measurement from loudness.measure_loudness, or None if the cue was never measured
+    """
+    try:
+        return json.loads(loudness_path(directory, key).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def remove_loudness(directory: Path, key: str):
+    """Forget a cue's loudness measurement (its audio was replaced or removed)"""
+    try:
+        loudness_path(directory, key).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def atomic_write_bytes(path: Path, data: bytes):
+    """
+    Write a file so readers never see a partial cue
+
+    The data and the rename are flushed to disk before returning, so a cue that
+    was paid for survives a crash or power loss right after it arrives.
+
+    Args:
+        path: Destination file
+        data: File contents
+    """
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    fsync_directory(path.parent)
+
+
+def fsync_directory(directory: Path):
+    """Flush a directory entry change to disk (a no-op where directories cannot be opened, e.g. Windows)"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class CueCache:
+    def __init__(self, cache_dir: str = ".cue_cache", max_size_mb: float = 500):
+        """
+        Initialize the cue cache
+
+        Entries are stored as one file per cue named after its content address.
+        The file modification time doubles as the last-access time, so several
+        generator processes can share one cache directory without an index file.
+
+        Args:
+            cache_dir: Directory holding cached cue audio
+            max_size_mb: Size bound in megabytes before least recently used cues are evicted
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "evictions": 0,
+            "characters_saved": 0,
+        }
+
+    def _count(self, stat: str, amount: int = 1):
+        with self._lock:
+            self.stats[stat] += amount
+
+    def contains(self, key: str) -> bool:
+        """Check whether a cue is cached without counting a hit or miss"""
+        return find_cue_file(self.cache_dir, key) is not None
+
+    def get(self, key: str, text: str = "") -> Optional[bytes]:
+        """
+        Look up cached cue audio
+
+        Args:
+            key: Content address from cue_cache_key
+            text: Cue text, used only to account for characters saved
+
+        Returns:
+            Encoded audio bytes, or None on a miss
+        """
+        path = find_cue_file(self.cache_dir, key)
+        try:
+            if path is None:
+                raise FileNotFoundError(key)
+            data = path.read_bytes()
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+
+        # Touch the entry so LRU eviction sees it as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        self._count("hits")
+        self._count("characters_saved", len(text))
+        return data
+
+    def put(self, key: str, data: bytes):
+        """
+        Store cue audio and evict old entries if the cache grew past its bound
+
+        Args:
+            key: Content address from cue_cache_key
+            data: Encoded audio bytes
+        """
+        atomic_write_bytes(self.cache_dir / f"{key}.{audio_extension(data)}", data)
+        remove_loudness(self.cache_dir, key)
+        self._count("writes")
+        self.evict()
+
+    def loudness(self, key: str) -> Optional[Dict]:
+        """Loudness measurement stored with a cached cue, or None"""
+        return read_loudness(self.cache_dir, key)
+
+    def put_loudness(self, key: str, measurement: Dict):
+        """Keep a cue's loudness measurement next to its cached audio"""
+        atomic_write_bytes(loudness_path(self.cache_dir, key), json.dumps(measurement).encode("utf-8"))
+
+    def size_bytes(self) -> int:
+        """Total size of all cached cues"""
+        return sum(entry.stat().st_size for entry in iter_cue_files(self.cache_dir))
+
+    def evict(self) -> int:
+        """
+        Remove least recently used cues until the cache fits its size bound
+
+        Returns:
+            Number of cues evicted
+        """
+        entries = []
+        total = 0
+        for entry in iter_cue_files(self.cache_dir):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+            total += stat.st_size
+
+        if total <= self.max_size_bytes:
+            return 0
+
+        evicted = 0
+        for _, size, entry in sorted(entries, key=lambda x: x[0]):
+            if total <= self.max_size_bytes:
+                break
+            try:
+                entry.unlink()
+            except FileNotFoundError:
+                pass
+            remove_loudness(self.cache_dir, entry.stem)
+            total -= size
+            evicted += 1
+
+        self._count("evictions", evicted)
+        return evicted
+
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        """Snapshot of cache statistics for reporting"""
+        with self._lock:
+            summary = dict(self.stats)
+        summary["hit_rate"] = self.hit_rate()
+        summary["size_mb"] = self.size_bytes() / (1024 * 1024)
+        return summary
+
+
+class ScriptCueStore:
+    def __init__(self, store_dir: str):
+        """
+        Initialize the cue store of one script
+
+        Unlike the shared CueCache, entries are never evicted by size: the store
+        always holds the audio of every cue in the script's last render, so an
+        edited script only needs its added or changed cues synthesized.
+
+        Args:
+            store_dir: Directory holding this script's cue audio
+        """
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+
+    def path(self, key: str) -> Optional[Path]:
+        """File holding a cue's audio, or None if the cue is not stored"""
+        return find_cue_file(self.store_dir, key)
+
+    def contains(self, key: str) -> bool:
+        """Check whether a cue's audio is stored"""
+        return self.path(key) is not None
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Load stored cue audio
+
+        Args:
+            key: Content address from cue_cache_key
+
+        Returns:
+            Encoded audio bytes, or None if the cue is not stored
+        """
+        path = self.path(key)
+        try:
+            return path.read_bytes() if path else None
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, data: bytes):
+        """
+        Store cue audio
+
+        Args:
+            key: Content address from cue_cache_key
+            data: Encoded audio bytes
+        """
+        atomic_write_bytes(self.store_dir / f"{key}.{audio_extension(data)}", data)
+        remove_loudness(self.store_dir, key)
+
+    def loudness(self, key: str) -> Optional[Dict]:
+        """Loudness measurement stored with a cue, or None"""
+        return read_loudness(self.store_dir, key)
+
+    def put_loudness(self, key: str, measurement: Dict):
+        """Keep a cue's loudness measurement next to its audio"""
+        atomic_write_bytes(loudness_path(self.store_dir, key), json.dumps(measurement).encode("utf-8"))
+
+    def prune(self, keep_keys: Iterable[str]) -> int:
+        """
+        Delete cues that are no longer part of the script
+
+        Args:
+            keep_keys: Keys of the cues in the current render
+
+        Returns:
+            Number of cues removed
+        """
+        keep = set(keep_keys)
+        removed = 0
+        for entry in list(iter_cue_files(self.store_dir)):
+            if entry.stem not in keep:
+                entry.unlink()
+                remove_loudness(self.store_dir, entry.stem)
+                removed += 1
+        return removed
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Couch to 5K Export Ladder
+Encodes one mixed PCM timeline into several formats and bitrates at once (e.g. MP3 for
+cellular, Opus for Android, AAC for iOS), with one encoder process per rendition
+"""
+
+import queue
+import subprocess
+import threading
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+# Format name → (file extension, ffmpeg encoder arguments); other formats are left to ffmpeg
+FORMAT_ENCODERS = {
+    "mp3": ("mp3", ["-c:a", "libmp3lame"]),
+    "opus": ("opus", ["-c:a", "libopus"]),
+    "aac": ("m4a", ["-c:a", "aac"]),
+    "m4a": ("m4a", ["-c:a", "aac"]),
+    "ogg": ("ogg", ["-c:a", "libvorbis"]),
+}
+
+# Chunks buffered per encoder: enough to absorb jitter between encoders without holding
+# more than a few seconds of the timeline in memory
+ENCODER_QUEUE_CHUNKS = 4
+
+# (format, bitrate), e.g. ("opus", "48k")
+Rendition = Tuple[str, str]
+
+
+def parse_renditions(spec: str) -> List[Rendition]:
+    """
+    Parse a rendition list like "mp3:64k,opus:48k,aac:96k"
+
+    Args:
+        spec: Comma-separated format:bitrate pairs
+
+    Returns:
+        Renditions in the given order, without duplicates
+
+    Raises:
+        ValueError: When an entry is not format:bitrate
+    """
+    renditions = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        audio_format, _, bitrate = item.partition(":")
+        if not audio_format.strip() or not bitrate.strip():
+            raise ValueError(f"Invalid rendition: {item!r} (expected format:bitrate, e.g. opus:48k)")
+        rendition = (audio_format.strip().lower(), bitrate.strip())
+        if rendition not in renditions:
+            renditions.append(rendition)
+    return renditions
+
+
+def rendition_extension(audio_format: str) -> str:
+    """File extension of a rendition format ("aac" is written as .m4a)"""
+    return FORMAT_ENCODERS.get(audio_format, (audio_format, []))[0]
+
+
+def encoder_arguments(audio_format: str, bitrate: str) -> List[str]:
+    """ffmpeg output arguments of a rendition"""
+    return FORMAT_ENCODERS.get(audio_format, (audio_format, []))[1] + ["-b:a", bitrate]
+
+
+def rendition_outputs(primary: Path, renditions: List[Rendition]) -> List[Tuple[Path, str, str]]:
+    """
+    Output files of every rendition of a workout
+
+    The first rendition is written to the primary path; the others sit next to it,
+    named after their bitrate (Week1_Audio_Script_64k.mp3, Week1_Audio_Script_48k.opus).
+
+    Args:
+        primary: Output path of the first rendition
+        renditions: Renditions to produce, the primary one first
+
+    Returns:
+        List of (output path, format, bitrate)
+    """
+    outputs = [(primary, renditions[0][0], renditions[0][1])]
+    for audio_format, bitrate in renditions[1:]:
+        path = primary.with_name(f"{primary.stem}_{bitrate}.{rendition_extension(audio_format)}")
+        outputs.append((path, audio_format, bitrate))
+    return outputs
+
+
+def encode_pcm(chunks: Iterable, outputs: List[Tuple[Path, str, str]], sample_rate: int = 44100,
+               channels: int = 1, converter: str = "ffmpeg"):
+    """
+    Encode 16-bit PCM into every rendition in one pass over the timeline
+
+    One ffmpeg process is started per rendition, each fed by its own writer thread
+    from a small bounded queue. A blocking pipe write only stalls that encoder's
+    thread, so the timeline is mixed once and the encoders run in parallel on
+    separate cores; the slowest encoder sets the pace through its full queue.
+
+    Args:
+        chunks: Interleaved int16 sample buffers (NumPy arrays or bytes), in timeline order
+        outputs: (output path, format, bitrate) of every rendition
+        sample_rate: Sample rate of the PCM
+        channels: Channel count of the PCM
+        converter: ffmpeg executable
+
+    Raises:
+        RuntimeError: When any encoder fails
+    """
+    processes = []
+    feeds: List[queue.Queue] = []
+    writers: List[threading.Thread] = []
+    try:
+        for output_file, audio_format, bitrate in outputs:
+            command = [
+                converter, "-hide_banner", "-loglevel", "error", "-y",
+                "-f", "s16le", "-ar", str(sample_rate), "-ac", str(channels), "-i", "pipe:0",
+                *encoder_arguments(audio_format, bitrate),
+                str(output_file),
+            ]
+            process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+            processes.append(process)
+            feeds.append(queue.Queue(maxsize=ENCODER_QUEUE_CHUNKS))
+            writers.append(threading.Thread(target=_feed_encoder, args=(process, feeds[-1]), daemon=True))
+            writers[-1].start()
+
+        for chunk in chunks:
+            # Chunks are shared between the writers, never modified after they are queued
+            data = memoryview(chunk)
+            for feed in feeds:
+                feed.put(data)
+            if all(process.poll() is not None for process in processes):
+                # Every encoder exited before the end of the timeline; their errors are reported below
+                break
+    finally:
+        for feed in feeds:
+            feed.put(None)
+        for writer in writers:
+            writer.join()
+
+    errors = []
+    for process, (output_file, _, _) in zip(processes, outputs):
+        stderr = process.stderr.read()
+        process.stderr.close()
+        if process.wait() != 0:
+            errors.append(f"{output_file}: {stderr.decode(errors='replace').strip()}")
+    if errors:
+        raise RuntimeError("ffmpeg could not encode " + "; ".join(errors))
+
+
+def _feed_encoder(process: subprocess.Popen, feed: queue.Queue):
+    """
+    Write queued chunks to one encoder until None arrives, then close its input (runs in a writer thread)
+
+    If the encoder dies, the rest of the queue is still drained so the producer never
+    blocks on it; the encoder's error is reported by encode_pcm.
+    """
+    try:
+        for data in iter(feed.get, None):
+            try:
+                process.stdin.write(data)
+            except BrokenPipeError:
+                for _ in iter(feed.get, None):
+                    pass
+                break
+    finally:
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Couch to 5K ffmpeg Render Backend
+Assembles a workout in a single ffmpeg filtergraph (adelay + amix) instead of mixing in Python
+"""
+
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from export_ladder import encoder_arguments
+
+
+def build_filtergraph_command(cues: List[Tuple[int, Path]], duration_ms: int, output_file: str,
+                              bitrate: str = "128k", sample_rate: int = 44100, channels: int = 1,
+                              converter: str = "ffmpeg",
+                              extra_outputs: Optional[List[Tuple[Path, str, str]]] = None,
+                              gains: Optional[Dict[Path, float]] = None) -> List[str]:
+    """
+    Build an ffmpeg command that mixes cue files over silence and encodes the result
+
+    Each distinct cue file is opened once; cues used several times are fanned out
+    with asplit. Every placement is delayed to its timestamp and mixed over a
+    generated silence source that sets the workout length.
+
+    Args:
+        cues: List of (position_ms, cue audio file) placements
+        duration_ms: Workout length in milliseconds
+        output_file: Destination audio file (format taken from its extension)
+        bitrate: Encoder bitrate
+        sample_rate: Output sample rate in Hz
+        channels: Output channel count
+        converter: ffmpeg executable
+        extra_outputs: Further (output path, format, bitrate) renditions encoded from the same mix
+        gains: Loudness normalization gain in dB of each cue file
+
+    Returns:
+        Command line as a list of arguments
+    """
+    layout = "mono" if channels == 1 else "stereo"
+    command = [converter, "-hide_banner", "-loglevel", "error", "-y"]
+
+    # Input 0 is the silence bed; cue files follow
+    command += ["-f", "lavfi", "-t", f"{duration_ms / 1000:.3f}",
+                "-i", f"anullsrc=r={sample_rate}:cl={layout}"]
+
+    input_index: Dict[Path, int] = {}
+    uses: Dict[Path, int] = {}
+    for _, cue_file in cues:
+        if cue_file not in input_index:
+            input_index[cue_file] = len(input_index) + 1
+            command += ["-i", str(cue_file)]
+        uses[cue_file] = uses.get(cue_file, 0) + 1
+
+    filters = []
+    streams: Dict[Path, List[str]] = {}
+    for cue_file, index in input_index.items():
+        normalized = f"[{index}:a]aresample={sample_rate},aformat=channel_layouts={layout}"
+        gain = (gains or {}).get(cue_file)
+        if gain:
+            normalized += f",volume={gain:.2f}dB"
+        if uses[cue_file] == 1:
+            filters.append(f"{normalized}[n{index}]")
+            streams[cue_file] = [f"n{index}"]
+        else:
+            labels = [f"n{index}_{copy}" for copy in range(uses[cue_file])]
+            filters.append(f"{normalized},asplit={len(labels)}" + "".join(f"[{label}]" for label in labels))
+            streams[cue_file] = labels
+
+    mix_inputs = ["[0:a]"]
+    for placement, (position_ms, cue_file) in enumerate(cues):
+        label = streams[cue_file].pop()
+        filters.append(f"[{label}]adelay=delays={position_ms}:all=1[d{placement}]")
+        mix_inputs.append(f"[d{placement}]")
+
+    filters.append(
+        "".join(mix_inputs)
+        + f"amix=inputs={len(mix_inputs)}:duration=first:dropout_transition=0:normalize=0[out]"
+    )
+
+    if not extra_outputs:
+        command += ["-filter_complex", ";".join(filters), "-map", "[out]", "-b:a", bitrate, str(output_file)]
+        return command
+
+    # One mix, split to an encoder per rendition
+    labels = [f"out{i}" for i in range(len(extra_outputs) + 1)]
+    filters.append("[out]asplit=" + str(len(labels)) + "".join(f"[{label}]" for label in labels))
+    command += ["-filter_complex", ";".join(filters), "-map", f"[{labels[0]}]", "-b:a", bitrate, str(output_file)]
+    for label, (extra_file, audio_format, extra_bitrate) in zip(labels[1:], extra_outputs):
+        command += ["-map", f"[{label}]", *encoder_arguments(audio_format, extra_bitrate), str(extra_file)]
+    return command
+
+
+def render_filtergraph(cues: List[Tuple[int, Path]], duration_ms: int, output_file: str,
+                       bitrate: str = "128k", sample_rate: int = 44100, channels: int = 1,
+                       converter: str = "ffmpeg", extra_outputs: Optional[List[Tuple[Path, str, str]]] = None,
+                       gains: Optional[Dict[Path, float]] = None):
+    """
+    Mix and encode a workout entirely inside one ffmpeg process
+
+    Args:
+        cues: List of (position_ms, cue audio file) placements
+        duration_ms: Workout length in milliseconds
+        output_file: Destination audio file (format taken from its extension)
+        bitrate: Encoder bitrate
+        sample_rate: Output sample rate in Hz
+        channels: Output channel count
+        converter: ffmpeg executable
+        extra_outputs: Further (output path, format, bitrate) renditions encoded from the same mix
+        gains: Loudness normalization gain in dB of each cue file
+
+    Raises:
+        RuntimeError: When ffmpeg fails to render the workout
+    """
+    command = build_filtergraph_command(cues, duration_ms, output_file, bitrate, sample_rate, channels, converter,
+                                        extra_outputs, gains)
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not render {output_file}: {result.stderr.decode(errors='replace').strip()}")
@@ -5,37 +5,314 @@ Converts text scripts with timestamps into audio files using ElevenLabs API
 """
 
 import os
-import re
-import json
+import sys
+import io
+import wave
 import time
+import hashlib
+import contextlib
+import subprocess
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import List, Tuple, Dict
-import requests
-from elevenlabs.client import ElevenLabs
-from pydub import AudioSegment
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple, Dict
 import argparse
+from cue_cache import CueCache, ScriptCueStore, audio_extension, cue_cache_key, normalize_cue_text
+from rate_limiter import TokenBucket
+from build_manifest import BuildManifest, build_fingerprint, diff_cues
+from export_ladder import parse_renditions, rendition_outputs
+from ffmpeg_render import render_filtergraph
+from tts_backends import TTS_BACKENDS, backend_identity, create_tts_backend
+from tts_transport import StreamingDecoder
+from pipeline_metrics import PipelineMetrics
+from script_index import ScriptIndex, parse_script_lines
+
+# numpy and pydub are imported by the code paths that decode or mix audio, so
+# --dry-run, --help and argument errors start without loading them
+if TYPE_CHECKING:
+    import numpy as np
+    from pydub import AudioSegment
+    from timeline_mixer import TimelineMixer
+
+# Internal PCM format every cue is decoded to (matches ElevenLabs' default mp3_44100_128 output)
+SAMPLE_RATE = 44100
+CHANNELS = 1
+SAMPLE_WIDTH = 2  # bytes (16-bit signed)
+
+# Timeline assembly backends selectable with --render-backend
+RENDER_BACKENDS = ("numpy", "ffmpeg")
+
+# Level every cue is normalized to (EBU R128 integrated loudness) and the true-peak ceiling it must respect
+LOUDNESS_TARGET_LUFS = -16.0
+TRUE_PEAK_DBTP = -1.0
+
+def peak_rss_mb() -> Dict[str, float]:
+    """
+    Peak resident memory of this process so far
+    
+    ru_maxrss is a lifetime maximum, so the value only grows over a run; the peak of
+    ffmpeg children is not reported because RUSAGE_CHILDREN cannot tell an encoder
+    from a render worker process.
+    
+    Returns:
+        Dictionary with the "process" peak in megabytes (empty where unsupported)
+    """
+    try:
+        import resource
+    except ImportError:  # Windows
+        return {}
+    
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "process": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+    }
 
 class QuotaExceededException(Exception):
     """Raised when API quota is exceeded"""
     pass
 
+def decode_audio_bytes(audio_bytes: bytes) -> "AudioSegment":
+    """
+    Decode encoded cue audio entirely in memory
+    
+    The bytes are piped through ffmpeg's stdin and raw PCM is read back from its
+    stdout, so no temporary files are written and several generators can run
+    side by side in one checkout.
+    
+    WAV cues cut from batched requests are read directly without ffmpeg.
+    
+    Args:
+        audio_bytes: Encoded audio (MP3 or any other format ffmpeg can detect)
+        
+    Returns:
+        AudioSegment in the internal PCM format
+        
+    Raises:
+        RuntimeError: When ffmpeg cannot decode the audio
+    """
+    from pydub import AudioSegment
+    
+    if audio_extension(audio_bytes) == "wav":
+        segment = AudioSegment.from_wav(io.BytesIO(audio_bytes))
+        return segment.set_frame_rate(SAMPLE_RATE).set_channels(CHANNELS).set_sample_width(SAMPLE_WIDTH)
+    
+    command = [
+        AudioSegment.converter, "-hide_banner", "-loglevel", "error",
+        "-i", "pipe:0",
+        "-f", "s16le", "-acodec", "pcm_s16le",
+        "-ar", str(SAMPLE_RATE), "-ac", str(CHANNELS),
+        "pipe:1",
+    ]
+    result = subprocess.run(command, input=audio_bytes, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not decode audio: {result.stderr.decode(errors='replace').strip()}")
+    
+    return AudioSegment(
+        data=result.stdout,
+        sample_width=SAMPLE_WIDTH,
+        frame_rate=SAMPLE_RATE,
+        channels=CHANNELS
+    )
+
+def music_bed_fingerprint(music_file: str, gain_db: float = -18.0, duck_db: float = -12.0, attack_ms: int = 200,
+                          release_ms: int = 600) -> str:
+    """
+    Identify a music bed and its mix settings for the build fingerprint
+    
+    Args:
+        music_file: Music track
+        gain_db: Level of the music while nobody is speaking
+        duck_db: Additional attenuation under speech
+        attack_ms: Ducking attack time
+        release_ms: Ducking release time
+        
+    Returns:
+        Hex digest of the track contents and settings
+    """
+    digest = hashlib.sha256()
+    with open(music_file, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    digest.update(f"{gain_db}:{duck_db}:{attack_ms}:{release_ms}".encode("utf-8"))
+    return digest.hexdigest()
+
+def loudness_setting(loudness_target: Optional[float], true_peak_db: float = TRUE_PEAK_DBTP) -> Optional[str]:
+    """Cue loudness normalization as recorded in the build fingerprint (None when it is off)"""
+    if loudness_target is None:
+        return None
+    return f"{loudness_target:g} LUFS, {true_peak_db:g} dBTP"
+
+def parse_script_file(file_path: str) -> List[Tuple[float, str]]:
+    """
+    Parse a script file and extract timestamps with text
+    
+    Args:
+        file_path: Path to the script file
+    
+    Returns:
+        List of (timestamp_seconds, text) tuples
+    """
+    return load_script(file_path)[0]
+
+def get_workout_duration(script_content: str) -> int:
+    """
+    Extract total duration from script content
+    
+    Args:
+        script_content: Content of the script file
+    
+    Returns:
+        Duration in seconds (from the header, else 5 minutes after the last cue)
+    """
+    _, duration, _ = parse_script_lines(io.StringIO(script_content))
+    return duration
+
+def load_script(script_file: str) -> Tuple[List[Tuple[float, str]], int]:
+    """
+    Parse a script file's cues and workout duration in one streaming pass
+    
+    Args:
+        script_file: Path to the script file
+        
+    Returns:
+        Tuple of (list of (timestamp_seconds, text) tuples, duration in seconds)
+    """
+    with open(script_file, 'r', encoding='utf-8') as file:
+        timestamps, duration, _ = parse_script_lines(file)
+    return timestamps, duration
+
 class C25KAudioGenerator:
-    def __init__(self, api_key: str, voice_id: str = "21m00Tcm4TlvDq8ikWAM"):
+    def __init__(self, api_key: str, voice_id: str = "21m00Tcm4TlvDq8ikWAM",
+                 model_id: str = "eleven_monolingual_v1", cache_dir: str = ".cue_cache",
+                 cache_size_mb: float = 500, use_cache: bool = True,
+                 max_concurrency: int = 2, requests_per_second: float = 2.0,
+                 audio_format: str = "mp3", bitrate: str = "128k", streaming: bool = False,
+                 render_backend: str = "numpy", batch_size: int = 1, batch_break_seconds: float = 1.0,
+                 tts_backend: str = "elevenlabs", tts_url: Optional[str] = None, local_voice: str = "en-us",
+                 profile: bool = False, renditions: Optional[List[Tuple[str, str]]] = None,
+                 music_file: Optional[str] = None, music_gain_db: float = -18.0, duck_db: float = -12.0,
+                 duck_attack_ms: int = 200, duck_release_ms: int = 600,
+                 loudness_target: Optional[float] = LOUDNESS_TARGET_LUFS, true_peak_db: float = TRUE_PEAK_DBTP,
+                 pcm_cache_size_mb: float = 2000):
         """
         Initialize the audio generator
         
         Args:
             api_key: ElevenLabs API key
             voice_id: ElevenLabs voice ID (default: Rachel)
+            model_id: ElevenLabs model ID
+            cache_dir: Directory for the shared cue cache
+            cache_size_mb: Size bound of the cue cache in megabytes
+            use_cache: If False, skip the shared cue cache (per-script cue stores are still used)
+            max_concurrency: Maximum number of cues synthesized at the same time
+            requests_per_second: Sustained API request rate allowed by the token bucket
+            audio_format: Export format of the rendered workouts
+            bitrate: Export bitrate of the rendered workouts
+            streaming: If True, mix in fixed-size chunks piped straight to the encoder
+                       so peak memory stays flat regardless of workout length
+            render_backend: "numpy" to mix in Python, or "ffmpeg" to mix and encode in one ffmpeg filtergraph
+            batch_size: Number of cues sent per request; above 1, cues are split back apart
+                        using the provider's character alignment
+            batch_break_seconds: Pause requested between cues in a batched request
+            tts_backend: Speech engine: "elevenlabs", "local" (offline espeak-ng drafts)
+                         or "mock" (ElevenLabs-compatible mock_tts_server.py)
+            tts_url: Server address for the elevenlabs or mock backend
+            local_voice: espeak voice used by the local backend
+            profile: If True, capture cProfile stats of every render and keep those of the slowest script
+            renditions: Additional (format, bitrate) pairs encoded from the same mix as the main file,
+                        e.g. [("mp3", "64k"), ("opus", "48k"), ("aac", "96k")]
+            music_file: Background music looped under the whole workout and ducked under every cue
+            music_gain_db: Level of the music while nobody is speaking
+            duck_db: Additional attenuation of the music under speech
+            duck_attack_ms: How long the music takes to duck before a cue
+            duck_release_ms: How long the music takes to come back after a cue
+            loudness_target: Integrated loudness (LUFS) every cue is normalized to; None leaves cues as synthesized
+            true_peak_db: True-peak ceiling (dBTP) a normalized cue may not exceed
+            pcm_cache_size_mb: Size bound of the decoded (raw PCM) copy of the cue cache kept in
+                               <cache_dir>/pcm; 0 decodes every cue on every use
         """
+        if render_backend not in RENDER_BACKENDS:
+            raise ValueError(f"Unknown render backend: {render_backend} (choose from {', '.join(RENDER_BACKENDS)})")
+        if music_file and render_backend != "numpy":
+            raise ValueError("A music bed needs the numpy render backend")
+        
         self.api_key = api_key
         self.voice_id = voice_id
-        self.client = ElevenLabs(api_key=api_key)
-        self.quota_exceeded = False
+        self.model_id = model_id
+        self.tts_backend = tts_backend
+        self.tts_url = tts_url
+        self.local_voice = local_voice
+        self.max_concurrency = max(1, max_concurrency)
+        # One keep-alive connection per concurrent request
+        self.tts = create_tts_backend(tts_backend, api_key, voice_id, model_id, tts_url, local_voice,
+                                      pool_size=self.max_concurrency)
+        # Connection counts already attributed to metrics
+        self._connection_baseline = {"requests": 0, "connections": 0}
+        self._quota_exceeded = False
+        # Optional multiprocessing.Event shared by render workers so one quota error stops them all
+        self.quota_event = None
+        self.cache = CueCache(cache_dir, cache_size_mb) if use_cache else None
+        self.pcm_store = None
+        if use_cache and pcm_cache_size_mb > 0:
+            from pcm_store import PCMCueStore
+            
+            self.pcm_store = PCMCueStore(Path(cache_dir) / "pcm", SAMPLE_RATE, CHANNELS, pcm_cache_size_mb)
+        self.requests_per_second = requests_per_second
+        # Local synthesis has no provider limits to respect
+        self.rate_limiter = TokenBucket(requests_per_second, capacity=self.max_concurrency) if self.tts.remote else None
+        self.max_retries = 5
+        self.audio_format = audio_format
+        self.bitrate = bitrate
+        self.music_file = music_file
+        self.music_gain_db = music_gain_db
+        self.duck_db = duck_db
+        self.duck_attack_ms = duck_attack_ms
+        self.duck_release_ms = duck_release_ms
+        # Decoded once, on the first render that needs it
+        self._music_bed = None
+        self.music_fingerprint = music_bed_fingerprint(music_file, music_gain_db, duck_db, duck_attack_ms,
+                                                       duck_release_ms) if music_file else None
+        self.loudness_target = loudness_target
+        self.true_peak_db = true_peak_db
+        self.loudness_fingerprint = loudness_setting(loudness_target, true_peak_db)
+        # Every format and bitrate a render produces; the first is the main output file
+        self.renditions = [(audio_format, bitrate)]
+        for rendition in renditions or []:
+            if rendition not in self.renditions:
+                self.renditions.append(rendition)
+        self.streaming = streaming
+        self.render_backend = render_backend
+        self.batch_size = max(1, batch_size)
+        self.batch_break_seconds = batch_break_seconds
+        self.stream_chunk_ms = 10000
+        self.metrics = PipelineMetrics()
+        self.profile = profile
+        # Profiles of thread-pool tasks run during the render being profiled
+        self._worker_profiles: Optional[List] = None
+        self._profile_lock = threading.Lock()
+        # Cues that fell back to silence; a render containing any is not recorded as up to date
+        self.fallback_cues = 0
+        self._fallback_lock = threading.Lock()
         
         # Create output directory
         self.output_dir = Path("generated_audio")
         self.output_dir.mkdir(exist_ok=True)
+        self.manifest = BuildManifest(self.output_dir)
+        self.profile_dir = self.output_dir / ".profile"
+        self.script_index = ScriptIndex(self.output_dir / ".build" / "script_index.json")
+    
+    @property
+    def quota_exceeded(self) -> bool:
+        """Whether the API quota ran out in this generator or any render worker sharing its quota event"""
+        return self._quota_exceeded or (self.quota_event is not None and self.quota_event.is_set())
+    
+    @quota_exceeded.setter
+    def quota_exceeded(self, value: bool):
+        self._quota_exceeded = value
+        if value and self.quota_event is not None:
+            self.quota_event.set()
     
     def parse_script_file(self, file_path: str) -> List[Tuple[float, str]]:
         """
@@ -47,123 +324,738 @@ class C25KAudioGenerator:
         Returns:
             List of (timestamp_seconds, text) tuples
         """
-        with open(file_path, 'r', encoding='utf-8') as file:
-            content = file.read()
-        
-        # Pattern to match timestamps like "5:00 - " or "10:30 - "
-        timestamp_pattern = r'(\d{1,2}):(\d{2})\s*-\s*"([^"]+)"'
+        return self.load_script(file_path)[0]
+    
+    def load_script(self, script_file: str) -> Tuple[List[Tuple[float, str]], int]:
+        """
+        Get a script's cues and duration from the compiled index, parsing it only if it changed
         
-        matches = re.findall(timestamp_pattern, content, re.MULTILINE | re.DOTALL)
+        Args:
+            script_file: Path to the script file
+            
+        Returns:
+            Tuple of (list of (timestamp_seconds, text) tuples, duration in seconds)
+        """
+        return self.script_index.load(script_file)
+    
+    def cue_key(self, text: str) -> str:
+        """Content address of a cue as rendered by the current TTS backend"""
+        return cue_cache_key(text, self.tts.voice_id, self.tts.model_id)
+    
+    def _is_quota_error(self, error: Exception) -> bool:
+        """Check whether an API error means the character quota ran out"""
+        error_str = str(error)
+        return "quota_exceeded" in error_str or "exceeds your quota" in error_str
+    
+    def _is_rate_limit_error(self, error: Exception) -> bool:
+        """Check whether an API error asks us to slow down and retry"""
+        if getattr(error, "status_code", None) == 429:
+            return True
+        error_str = str(error)
+        return "too_many_concurrent_requests" in error_str or "system_busy" in error_str
+    
+    def _call_api(self, request: Callable[[], object], characters: int):
+        """
+        Make one API call, pacing and retrying per the provider's rate limits
         
-        timestamps = []
-        for match in matches:
-            minutes, seconds, text = match
-            total_seconds = int(minutes) * 60 + int(seconds)
-            # Clean up the text
-            clean_text = text.strip().replace('\n', ' ').replace('  ', ' ')
-            timestamps.append((total_seconds, clean_text))
+        Args:
+            request: Function performing the call; returns audio bytes, or a tuple starting with them
+            characters: Characters billed for the call, for metrics
+            
+        Returns:
+            Whatever the request returns
+        """
+        for attempt in range(self.max_retries + 1):
+            if self.quota_exceeded:
+                raise QuotaExceededException("API quota previously exceeded")
+            
+            if self.rate_limiter:
+                waited = self.rate_limiter.acquire()
+                if waited:
+                    self.metrics.add_time("rate_limit_wait", waited)
+            try:
+                started = time.perf_counter()
+                result = request()
+                audio = result[0] if isinstance(result, tuple) else result
+                self.metrics.record_tts_request(time.perf_counter() - started, characters, len(audio))
+                return result
+            except Exception as e:
+                if not self._is_rate_limit_error(e) or attempt == self.max_retries:
+                    raise
+                backoff = 2 ** attempt
+                print(f"⏳ Rate limited by {self.tts.name}, retrying in {backoff}s...")
+                if self.rate_limiter:
+                    self.rate_limiter.penalize(backoff)
+                else:
+                    time.sleep(backoff)
+    
+    def _request_speech(self, text: str) -> bytes:
+        """
+        Call the TTS backend for one cue
         
-        return sorted(timestamps, key=lambda x: x[0])
+        Args:
+            text: Text to convert to speech
+            
+        Returns:
+            Encoded audio bytes returned by the backend
+        """
+        text = normalize_cue_text(text)
+        return self._call_api(partial(self.tts.synthesize, text), len(text))
     
-    def generate_speech_segment(self, text: str) -> AudioSegment:
+    def _request_speech_streaming(self, text: str) -> Tuple[bytes, "AudioSegment"]:
         """
-        Generate speech audio for a text segment using ElevenLabs
+        Call the backend's streaming endpoint, decoding the audio while it downloads
+        
+        Chunks are fed to an ffmpeg decoder as they arrive, so once the last byte
+        is in only the tail of the cue is left to decode.
         
         Args:
             text: Text to convert to speech
             
         Returns:
-            AudioSegment containing the generated speech
+            Tuple of (MP3 bytes for the cue cache, decoded AudioSegment)
+        """
+        from pydub import AudioSegment
+        
+        text = normalize_cue_text(text)
+        
+        def request() -> Tuple[bytes, StreamingDecoder]:
+            decoder = StreamingDecoder(SAMPLE_RATE, CHANNELS, AudioSegment.converter, input_format="mp3")
+            chunks = []
+            started = time.perf_counter()
+            try:
+                for chunk in self.tts.synthesize_stream(text):
+                    if not chunks:
+                        self.metrics.add_time("tts_first_byte", time.perf_counter() - started)
+                    chunks.append(chunk)
+                    decoder.feed(chunk)
+            except BaseException:
+                decoder.abort()
+                raise
+            return b"".join(chunks), decoder
+        
+        audio_bytes, decoder = self._call_api(request, len(text))
+        # Only the decoding left after the download finished is counted
+        with self.metrics.timer("decode"):
+            pcm = decoder.finish()
+        
+        segment = AudioSegment(data=pcm, sample_width=SAMPLE_WIDTH, frame_rate=SAMPLE_RATE, channels=CHANNELS)
+        return audio_bytes, segment
+    
+    def record_connection_stats(self):
+        """Count the HTTP requests and new connections made since the last call into the metrics"""
+        stats = self.tts.connection_stats()
+        if not stats:
+            return
+        for key, counter in (("requests", "http_requests"), ("connections", "http_connections_opened")):
+            delta = stats[key] - self._connection_baseline[key]
+            if delta:
+                self.metrics.count(counter, delta)
+        self._connection_baseline = stats
+    
+    def _request_speech_batch(self, texts: List[str]) -> List[bytes]:
+        """
+        Synthesize several cues in one request and cut the result back into cues
+        
+        The cues are joined with break markers and sent to the with-timestamps
+        endpoint; its character alignment tells where each cue starts and ends.
+        
+        Args:
+            texts: Cue texts to synthesize together
+            
+        Returns:
+            WAV bytes for each cue, in the same order as texts
+            
+        Raises:
+            APIRequestError: When the API rejects the request
+            ValueError: When the response cannot be split into cues
+        """
+        import numpy as np
+        from batch_tts import build_batch_text, locate_cues, samples_to_wav_bytes, split_batch_audio
+        
+        texts = [normalize_cue_text(text) for text in texts]
+        request_text, offsets = build_batch_text(texts, self.batch_break_seconds)
+        
+        audio_bytes, alignment = self._call_api(partial(self.tts.synthesize_with_timestamps, request_text),
+                                                len(request_text))
+        
+        with self.metrics.timer("decode"):
+            audio = decode_audio_bytes(audio_bytes)
+        samples = np.frombuffer(audio.raw_data, dtype=np.int16)
+        spans = locate_cues(alignment, texts, request_text, offsets)
+        segments = split_batch_audio(samples, SAMPLE_RATE, CHANNELS, spans)
+        return [samples_to_wav_bytes(segment, SAMPLE_RATE, CHANNELS) for segment in segments]
+    
+    def prefetch_batched(self, texts: List[str], cue_store: Optional[ScriptCueStore] = None) -> int:
+        """
+        Synthesize cues that are not stored yet in batched requests of batch_size cues
+        
+        Cues whose batch fails for any reason other than quota are left for the
+        regular one-request-per-cue path.
+        
+        Args:
+            texts: Cue texts that will be needed
+            cue_store: Cue store of the script being rendered, if any
+            
+        Returns:
+            Number of cues synthesized through batches
             
         Raises:
             QuotaExceededException: When API quota is exceeded
         """
-        if self.quota_exceeded:
-            raise QuotaExceededException("API quota previously exceeded")
+        if self.batch_size < 2 or not self.tts.supports_alignment or not (self.cache or cue_store):
+            return 0
+        
+        missing = {}
+        for text in texts:
+            key = self.cue_key(text)
+            if key in missing:
+                continue
+            if self.is_synthesized(key, cue_store):
+                continue
+            missing[key] = text
+        
+        missing_items = list(missing.items())
+        batches = [missing_items[i:i + self.batch_size] for i in range(0, len(missing_items), self.batch_size)]
+        if not batches:
+            return 0
+        
+        print(f"📦 Synthesizing {len(missing_items)} cues in {len(batches)} batched requests")
+        
+        def synthesize_batch(batch: List[Tuple[str, str]]) -> int:
+            try:
+                cue_audio = self._request_speech_batch([text for _, text in batch])
+            except QuotaExceededException:
+                raise
+            except Exception as e:
+                if self._is_quota_error(e):
+                    if not self.quota_exceeded:
+                        self.quota_exceeded = True
+                        print("🚨 API quota exceeded! Stopping audio generation.")
+                    raise QuotaExceededException(f"ElevenLabs API quota exceeded: {e}")
+                print(f"⚠️  Batch of {len(batch)} cues failed, falling back to single-cue requests: {e}")
+                return 0
             
-        try:
-            # Generate audio using ElevenLabs
-            audio_generator = self.client.text_to_speech.convert(
-                text=text,
-                voice_id=self.voice_id,
-                model_id="eleven_monolingual_v1"
-            )
+            for (_, text), audio_bytes in zip(batch, cue_audio):
+                self.store_speech_bytes(text, audio_bytes, cue_store)
+            return len(batch)
+        
+        results = self._synthesize_concurrently(
+            synthesize_batch, batches, "Batch",
+            describe=lambda batch: f"{len(batch)} cues starting with {batch[0][1]}"
+        )
+        return sum(results)
+    
+    def _synthesize_concurrently(self, worker: Callable[[object], object], texts: List, label: str,
+                                 describe: Callable[[object], str] = str) -> List:
+        """
+        Run a per-cue worker over a bounded thread pool
+        
+        Args:
+            worker: Function called with each cue text (or other work item)
+            texts: Cue texts (or other work items) to process
+            label: Progress label printed for each finished item
+            describe: Turns an item into the text shown in progress output
             
-            # Convert generator to bytes
-            audio_bytes = b"".join(audio_generator)
+        Returns:
+            Worker results in the same order as texts, regardless of completion order
             
-            # Save to temporary file and load as AudioSegment
-            temp_file = "temp_speech.mp3"
-            with open(temp_file, "wb") as f:
-                f.write(audio_bytes)
+        Raises:
+            QuotaExceededException: When API quota is exceeded (pending cues are cancelled)
+        """
+        results = [None] * len(texts)
+        worker = self._profiled(worker)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            futures = {executor.submit(worker, text): i for i, text in enumerate(texts)}
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    i = futures[future]
+                    results[i] = future.result()
+                    print(f"  {label} {done}/{len(texts)}: {describe(texts[i])[:50]}...")
+            except QuotaExceededException:
+                for future in futures:
+                    future.cancel()
+                raise
+        return results
+    
+    def is_synthesized(self, key: str, cue_store: Optional[ScriptCueStore] = None) -> bool:
+        """Whether any copy of a cue is on disk: the script's cue store, the cue cache or the PCM store"""
+        if cue_store and cue_store.contains(key):
+            return True
+        if self.cache and self.cache.contains(key):
+            return True
+        return bool(self.pcm_store and self.pcm_store.contains(key))
+    
+    def stored_speech_bytes(self, text: str, cue_store: Optional[ScriptCueStore] = None) -> Optional[bytes]:
+        """
+        Look a cue up in the script's cue store, then in the cue cache, then in the PCM store
+        
+        A cue found only in the cache is copied into the cue store. A cue whose only
+        copy left is its decoded PCM is re-encoded losslessly as WAV (no TTS request)
+        and written to the cue store.
+        
+        Args:
+            text: Cue text
+            cue_store: Cue store of the script being rendered, if any
             
-            audio_segment = AudioSegment.from_mp3(temp_file)
+        Returns:
+            Encoded audio bytes, or None when the cue has not been synthesized
+        """
+        cache_key = self.cue_key(text)
+        if cue_store:
+            audio_bytes = cue_store.get(cache_key)
+            if audio_bytes is not None:
+                return audio_bytes
+        
+        audio_bytes = self.cache.get(cache_key, text) if self.cache else None
+        if audio_bytes is None:
+            audio_bytes = self.pcm_wav_bytes(cache_key)
+        if audio_bytes is not None and cue_store:
+            cue_store.put(cache_key, audio_bytes)
+        return audio_bytes
+    
+    def pcm_wav_bytes(self, key: str) -> Optional[bytes]:
+        """A cue's decoded PCM copy wrapped as WAV, or None if the PCM store doesn't have it"""
+        samples = self.pcm_store.get(key) if self.pcm_store else None
+        if samples is None:
+            return None
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(CHANNELS)
+            wav.setsampwidth(SAMPLE_WIDTH)
+            wav.setframerate(SAMPLE_RATE)
+            wav.writeframes(samples.tobytes())
+        return buffer.getvalue()
+    
+    def store_speech_bytes(self, text: str, audio_bytes: bytes, cue_store: Optional[ScriptCueStore] = None,
+                           measure: bool = True):
+        """
+        Keep newly synthesized cue audio in the cue cache and the script's cue store
+        
+        The audio is written before anything else so a paid-for cue is never lost; its
+        loudness is then measured once and stored next to it.
+        
+        Args:
+            text: Cue text
+            audio_bytes: Encoded audio from the TTS backend
+            cue_store: Cue store of the script being rendered, if any
+            measure: If False, leave the measurement to the caller (who is about to decode the cue anyway)
+        """
+        cache_key = self.cue_key(text)
+        if self.cache:
+            self.cache.put(cache_key, audio_bytes)
+        if cue_store:
+            cue_store.put(cache_key, audio_bytes)
+        if measure and self.loudness_target is not None:
+            self.measure_cue(text, self.decode_cue(text, audio_bytes), cue_store)
+    
+    def decode_cue(self, text: str, audio_bytes: bytes) -> "np.ndarray":
+        """Decode a cue's audio into timeline-format samples, keeping them in the PCM store for reuse"""
+        from timeline_mixer import segment_to_samples
+        
+        with self.metrics.timer("decode"):
+            samples = segment_to_samples(decode_audio_bytes(audio_bytes), SAMPLE_RATE, CHANNELS)
+        self.metrics.count("cues_decoded")
+        if self.pcm_store:
+            self.pcm_store.put(self.cue_key(text), samples)
+        return samples
+    
+    def measure_cue(self, text: str, samples: "np.ndarray", cue_store: Optional[ScriptCueStore] = None) -> Dict:
+        """
+        Measure a cue's loudness and keep the measurement next to its audio
+        
+        Args:
+            text: Cue text
+            samples: Decoded cue in the timeline format
+            cue_store: Cue store of the script being rendered, if any
             
-            # Clean up temp file
-            os.remove(temp_file)
+        Returns:
+            Measurement from loudness.measure_loudness
+        """
+        from loudness import measure_loudness
+        
+        with self.metrics.timer("loudness"):
+            measurement = measure_loudness(samples, SAMPLE_RATE, CHANNELS)
+        cache_key = self.cue_key(text)
+        if self.cache:
+            self.cache.put_loudness(cache_key, measurement)
+        if cue_store:
+            cue_store.put_loudness(cache_key, measurement)
+        return measurement
+    
+    def cue_loudness(self, text: str, cue_store: Optional[ScriptCueStore] = None,
+                     samples: Optional["np.ndarray"] = None) -> Dict:
+        """
+        Stored loudness measurement of a cue, measuring it only if it never was
+        
+        Cues synthesized before normalization existed are measured on first use.
+        
+        Args:
+            text: Cue text
+            cue_store: Cue store of the script being rendered, if any
+            samples: The cue already decoded, if the caller has it
             
-            return audio_segment
+        Returns:
+            Measurement from loudness.measure_loudness
+        """
+        cache_key = self.cue_key(text)
+        measurement = cue_store.loudness(cache_key) if cue_store else None
+        if measurement is None and self.cache:
+            measurement = self.cache.loudness(cache_key)
+            if measurement is not None and cue_store:
+                cue_store.put_loudness(cache_key, measurement)
+        if measurement is not None:
+            return measurement
+        
+        if samples is None:
+            samples = self.stored_samples(text, cue_store)
+            if samples is None:
+                # Never synthesized: nothing to measure, so nothing to normalize
+                return {}
+        return self.measure_cue(text, samples, cue_store)
+    
+    def cue_gain_db(self, text: str, cue_store: Optional[ScriptCueStore] = None,
+                    samples: Optional["np.ndarray"] = None) -> float:
+        """Gain that normalizes a cue to the loudness target (0.0 when normalization is off)"""
+        if self.loudness_target is None:
+            return 0.0
+        from loudness import normalization_gain_db
+        
+        return normalization_gain_db(self.cue_loudness(text, cue_store, samples), self.loudness_target,
+                                     self.true_peak_db)
+    
+    def get_speech_bytes(self, text: str, cue_store: Optional[ScriptCueStore] = None) -> bytes:
+        """
+        Get encoded speech audio for a cue, from the script's cue store or the cue cache when possible
+        
+        Args:
+            text: Text to convert to speech
+            cue_store: Cue store of the script being rendered, if any
+            
+        Returns:
+            MP3 bytes for the cue
+            
+        Raises:
+            QuotaExceededException: When the cue is not cached and API quota was exceeded
+        """
+        audio_bytes = self.stored_speech_bytes(text, cue_store)
+        if audio_bytes is None:
+            audio_bytes = self._request_speech(text)
+            self.store_speech_bytes(text, audio_bytes, cue_store)
+        return audio_bytes
+    
+    def stored_samples(self, text: str, cue_store: Optional[ScriptCueStore] = None) -> Optional["np.ndarray"]:
+        """
+        Decoded samples of a cue that has already been synthesized
+        
+        The PCM store is tried first: a hit is memory-mapped with no ffmpeg decode.
+        Otherwise the stored audio is decoded once and added to the PCM store.
+        
+        Args:
+            text: Cue text
+            cue_store: Cue store of the script being rendered, if any
+            
+        Returns:
+            int16 samples in the timeline format, or None when the cue has not been synthesized
+        """
+        if self.pcm_store:
+            cache_key = self.cue_key(text)
+            samples = self.pcm_store.get(cache_key)
+            if samples is not None:
+                self.metrics.count("cues_mapped")
+                # The script's cue store must still hold the encoded audio in case the PCM copy is evicted
+                if cue_store and not cue_store.contains(cache_key):
+                    self.stored_speech_bytes(text, cue_store)
+                return samples
+        
+        audio_bytes = self.stored_speech_bytes(text, cue_store)
+        return self.decode_cue(text, audio_bytes) if audio_bytes is not None else None
+    
+    def speech_samples(self, text: str, cue_store: Optional[ScriptCueStore] = None) -> Tuple["np.ndarray", float]:
+        """
+        Speech for a cue as timeline-format samples plus its loudness normalization gain
+        
+        Args:
+            text: Text to convert to speech
+            cue_store: Cue store of the script being rendered, if any
             
+        Returns:
+            Tuple of (int16 samples, gain in dB); one second of silence if synthesis failed
+            
+        Raises:
+            QuotaExceededException: When API quota is exceeded
+        """
+        try:
+            samples = self.stored_samples(text, cue_store)
+            if samples is None and self.tts.supports_streaming:
+                from timeline_mixer import segment_to_samples
+                
+                audio_bytes, segment = self._request_speech_streaming(text)
+                # Measured below from the segment the stream already decoded
+                self.store_speech_bytes(text, audio_bytes, cue_store, measure=False)
+                samples = segment_to_samples(segment, SAMPLE_RATE, CHANNELS)
+                if self.pcm_store:
+                    self.pcm_store.put(self.cue_key(text), samples)
+            elif samples is None:
+                audio_bytes = self._request_speech(text)
+                self.store_speech_bytes(text, audio_bytes, cue_store, measure=False)
+                samples = self.decode_cue(text, audio_bytes)
+            
+            return samples, self.cue_gain_db(text, cue_store, samples)
+            
+        except QuotaExceededException:
+            raise
         except Exception as e:
-            error_str = str(e)
-            print(f"❌ Error generating speech for text: {text[:50]}...")
-            print(f"Error: {e}")
+            self._handle_speech_error(e, text)
+            import numpy as np
+            
+            return np.zeros(SAMPLE_RATE * CHANNELS, dtype=np.int16), 0.0  # 1 second of silence as fallback
+    
+    def generate_speech_segment(self, text: str, cue_store: Optional[ScriptCueStore] = None) -> "AudioSegment":
+        """
+        Generate speech audio for a text segment using ElevenLabs
+        
+        Args:
+            text: Text to convert to speech
+            cue_store: Cue store of the script being rendered, if any
             
-            # Check if this is a quota exceeded error
-            if "quota_exceeded" in error_str or "exceeds your quota" in error_str:
+        Returns:
+            AudioSegment containing the generated speech, loudness-normalized
+            
+        Raises:
+            QuotaExceededException: When API quota is exceeded
+        """
+        from pydub import AudioSegment
+        
+        samples, gain = self.speech_samples(text, cue_store)
+        segment = AudioSegment(data=samples.tobytes(), sample_width=SAMPLE_WIDTH, frame_rate=SAMPLE_RATE,
+                               channels=CHANNELS)
+        return segment.apply_gain(gain) if gain else segment
+    
+    def _handle_speech_error(self, error: Exception, text: str):
+        """
+        Report a failed cue, escalating quota errors and counting everything else as a silent fallback
+        
+        Raises:
+            QuotaExceededException: When the error means the API quota was exceeded
+        """
+        print(f"❌ Error generating speech for text: {text[:50]}...")
+        print(f"Error: {error}")
+        
+        # Check if this is a quota exceeded error
+        if self._is_quota_error(error):
+            if not self.quota_exceeded:
                 self.quota_exceeded = True
                 print("🚨 API quota exceeded! Stopping audio generation.")
-                raise QuotaExceededException(f"ElevenLabs API quota exceeded: {e}")
+            raise QuotaExceededException(f"ElevenLabs API quota exceeded: {error}")
+        
+        # For other errors, the cue becomes silence
+        print("⚠️  Using silence as fallback for this segment")
+        with self._fallback_lock:
+            self.fallback_cues += 1
+    
+    def fetch_cue_file(self, text: str, cue_store: ScriptCueStore) -> Optional[Path]:
+        """
+        Make sure a cue's encoded audio is in the script's cue store, without decoding it
+        
+        Args:
+            text: Text to convert to speech
+            cue_store: Cue store of the script being rendered
             
-            # For other errors, return silence as fallback
-            print("⚠️  Using silence as fallback for this segment")
-            return AudioSegment.silent(duration=1000)  # 1 second of silence as fallback
+        Returns:
+            Path to the cue audio file, or None if synthesis failed (the cue is left silent)
+            
+        Raises:
+            QuotaExceededException: When API quota is exceeded
+        """
+        try:
+            self.get_speech_bytes(text, cue_store)
+            return cue_store.path(self.cue_key(text))
+        except QuotaExceededException:
+            raise
+        except Exception as e:
+            self._handle_speech_error(e, text)
+            return None
     
-    def create_timed_audio(self, timestamps: List[Tuple[float, str]], total_duration: int) -> AudioSegment:
+    def prefetch_cues(self, script_files: List[Path]) -> int:
         """
-        Create a complete audio file with speech at specified timestamps
+        Synthesize every distinct cue across the given scripts into the cue cache
+        
+        Cues that repeat across scripts (e.g. "BEGIN walking now!") are requested
+        once, before any script is rendered.
+        
+        Args:
+            script_files: Script files whose cues should be cached
+            
+        Returns:
+            Number of cues fetched from the API
+            
+        Raises:
+            QuotaExceededException: When API quota is exceeded
+        """
+        if not self.cache:
+            return 0
+        
+        unique_cues = {}
+        total_cues = 0
+        for script_file in script_files:
+            for _, text in self.parse_script_file(str(script_file)):
+                total_cues += 1
+                key = self.cue_key(text)
+                unique_cues.setdefault(key, text)
+        
+        missing = [(key, text) for key, text in unique_cues.items() if not self.is_synthesized(key)]
+        print(f"🗂️  Cue cache: {total_cues} cues, {len(unique_cues)} unique, {len(missing)} to synthesize")
+        
+        batched = self.prefetch_batched([text for _, text in missing])
+        if batched:
+            missing = [(key, text) for key, text in missing if not self.is_synthesized(key)]
+        
+        def fetch(text: str) -> bool:
+            try:
+                self.get_speech_bytes(text)
+                return True
+            except QuotaExceededException:
+                raise
+            except Exception as e:
+                if self._is_quota_error(e):
+                    if not self.quota_exceeded:
+                        self.quota_exceeded = True
+                        print("🚨 API quota exceeded! Stopping audio generation.")
+                    raise QuotaExceededException(f"ElevenLabs API quota exceeded: {e}")
+                # The cue will be retried when its script is rendered
+                print(f"⚠️  Could not cache cue, will retry during render: {e}")
+                return False
+        
+        results = self._synthesize_concurrently(fetch, [text for _, text in missing], "Cached")
+        fetched = sum(1 for result in results if result)
+        
+        return batched + fetched
+    
+    def build_timeline(self, timestamps: List[Tuple[float, str]], total_duration: int,
+                       cue_store: Optional[ScriptCueStore] = None) -> "TimelineMixer":
+        """
+        Synthesize every cue and place it on a workout timeline
         
         Args:
             timestamps: List of (timestamp_seconds, text) tuples
             total_duration: Total duration of the workout in seconds
+            cue_store: Cue store to reuse unchanged cue audio from and save new cues to
             
         Returns:
-            Complete AudioSegment with timed speech
+            TimelineMixer with every cue placed, ready to render or stream
             
         Raises:
             QuotaExceededException: When API quota is exceeded
         """
+        from timeline_mixer import TimelineMixer
+        
         # Add 10 second buffer at the end to ensure final message is included
         buffer_duration = 10  # seconds
         final_duration = total_duration + buffer_duration
         
         # Start with silence for the full duration plus buffer
-        final_audio = AudioSegment.silent(duration=final_duration * 1000)  # Convert to milliseconds
+        mixer = TimelineMixer(final_duration * 1000, SAMPLE_RATE, CHANNELS)  # Convert to milliseconds
         
         print(f"Creating audio with {len(timestamps)} speech segments over {total_duration} seconds (plus {buffer_duration}s buffer)...")
         
-        for i, (timestamp, text) in enumerate(timestamps):
-            print(f"  Processing {i+1}/{len(timestamps)}: {timestamp}s - {text[:50]}...")
+        self.prefetch_batched([text for _, text in timestamps], cue_store)
+        
+        # Synthesize cues concurrently; results come back in timestamp order
+        speech_cues = self._synthesize_concurrently(
+            partial(self.speech_samples, cue_store=cue_store), [text for _, text in timestamps], "Processed"
+        )
+        
+        for (timestamp, text), (samples, gain) in zip(timestamps, speech_cues):
+            # Calculate position in milliseconds
+            position_ms = int(timestamp * 1000)
             
-            try:
-                # Generate speech for this text
-                speech_audio = self.generate_speech_segment(text)
-                
-                # Calculate position in milliseconds
-                position_ms = int(timestamp * 1000)
-                
-                # Overlay the speech at the specified timestamp
-                if position_ms < len(final_audio):
-                    final_audio = final_audio.overlay(speech_audio, position=position_ms)
-                
-                # Small delay to avoid rate limiting
-                time.sleep(0.5)
-                
-            except QuotaExceededException:
-                # Re-raise quota exceeded to stop processing
-                raise
+            # Place the speech on the timeline at the specified timestamp, normalized as it is mixed
+            mixer.add(samples, position_ms, gain)
+        
+        self.apply_music_bed(mixer)
+        return mixer
+    
+    def apply_music_bed(self, mixer: "TimelineMixer"):
+        """Lay the configured music bed under a timeline (no-op without --music)"""
+        if not self.music_file:
+            return
+        if self._music_bed is None:
+            from timeline_mixer import MusicBed, segment_to_samples
+            
+            with open(self.music_file, "rb") as f:
+                track = segment_to_samples(decode_audio_bytes(f.read()), SAMPLE_RATE, CHANNELS)
+            self._music_bed = MusicBed(track, SAMPLE_RATE, CHANNELS, self.music_gain_db, self.duck_db,
+                                       self.duck_attack_ms, self.duck_release_ms)
+        mixer.set_music_bed(self._music_bed)
+    
+    def render_with_ffmpeg(self, timestamps: List[Tuple[float, str]], total_duration: int,
+                           cue_store: ScriptCueStore, output_file: Path,
+                           extra_outputs: Optional[List[Tuple[Path, str, str]]] = None):
+        """
+        Render a workout with the ffmpeg filtergraph backend
+        
+        Cue audio is fetched into the script's cue store but never decoded in Python;
+        a single ffmpeg process delays, mixes and encodes every cue.
+        
+        Args:
+            timestamps: List of (timestamp_seconds, text) tuples
+            total_duration: Total duration of the workout in seconds
+            cue_store: Cue store holding the script's cue audio
+            output_file: Destination audio file
+            extra_outputs: Further (output path, format, bitrate) renditions encoded from the same mix
+            
+        Raises:
+            QuotaExceededException: When API quota is exceeded
+        """
+        from pydub import AudioSegment
+        
+        # Same 10 second buffer as build_timeline
+        final_duration_ms = (total_duration + 10) * 1000
+        
+        print(f"Creating audio with {len(timestamps)} speech segments over {total_duration} seconds (ffmpeg backend)...")
+        
+        self.prefetch_batched([text for _, text in timestamps], cue_store)
+        
+        cue_files = self._synthesize_concurrently(
+            partial(self.fetch_cue_file, cue_store=cue_store), [text for _, text in timestamps], "Fetched"
+        )
+        placements = [
+            (int(timestamp * 1000), cue_file)
+            for (timestamp, _), cue_file in zip(timestamps, cue_files)
+            if cue_file is not None and int(timestamp * 1000) < final_duration_ms
+        ]
+        
+        # Normalization gains come from the stored measurements, applied by ffmpeg's volume filter
+        gains = {}
+        for (_, text), cue_file in zip(timestamps, cue_files):
+            if cue_file is not None and cue_file not in gains:
+                gains[cue_file] = self.cue_gain_db(text, cue_store)
+        
+        render_filtergraph(placements, final_duration_ms, str(output_file), self.bitrate,
+                           SAMPLE_RATE, CHANNELS, AudioSegment.converter, extra_outputs, gains)
+    
+    def create_timed_audio(self, timestamps: List[Tuple[float, str]], total_duration: int,
+                           cue_store: Optional[ScriptCueStore] = None) -> "AudioSegment":
+        """
+        Create a complete audio file with speech at specified timestamps
         
-        return final_audio
+        Args:
+            timestamps: List of (timestamp_seconds, text) tuples
+            total_duration: Total duration of the workout in seconds
+            cue_store: Cue store to reuse unchanged cue audio from and save new cues to
+            
+        Returns:
+            Complete AudioSegment with timed speech
+            
+        Raises:
+            QuotaExceededException: When API quota is exceeded
+        """
+        mixer = self.build_timeline(timestamps, total_duration, cue_store)
+        audio = mixer.to_audio_segment()
+        if mixer.clipped_samples:
+            print(f"⚠️  {mixer.clipped_samples} samples clipped where cues overlap")
+        return audio
     
     def get_workout_duration(self, script_content: str) -> int:
         """
@@ -175,86 +1067,409 @@ class C25KAudioGenerator:
         Returns:
             Duration in seconds
         """
-        # Look for duration information in the header
-        duration_patterns = [
-            r'Total Duration:\s*(\d+)\s*minutes',
-            r'Duration:\s*(\d+)\s*minutes',
-            r'(\d+)\s*minutes\s*total'
-        ]
+        return get_workout_duration(script_content)
+    
+    def output_path(self, script_file: str) -> Path:
+        """Path of the audio file rendered from a script"""
+        return self.output_dir / f"{Path(script_file).stem}.{self.audio_format}"
+    
+    def rendition_outputs(self, output_file: Path) -> List[Tuple[Path, str, str]]:
+        """(output path, format, bitrate) of every rendition of an output, the main file first"""
+        return rendition_outputs(output_file, self.renditions)
+    
+    def export_timeline(self, mixer: "TimelineMixer", output_file: Path):
+        """
+        Encode a mixed timeline into the output file and every additional rendition
         
-        for pattern in duration_patterns:
-            match = re.search(pattern, script_content, re.IGNORECASE)
-            if match:
-                return int(match.group(1)) * 60
+        Args:
+            mixer: Timeline with every cue placed
+            output_file: Main output file
+        """
+        if len(self.renditions) > 1:
+            # One mix feeds an encoder per rendition
+            outputs = self.rendition_outputs(output_file)
+            if self.streaming:
+                with self.metrics.timer("export"):
+                    mixer.export_renditions(outputs, self.stream_chunk_ms)
+            else:
+                with self.metrics.timer("mix"):
+                    samples = mixer.render()
+                with self.metrics.timer("export"):
+                    mixer.export_renditions(outputs, self.stream_chunk_ms, samples)
+        elif self.streaming:
+            with self.metrics.timer("export"):
+                mixer.export_stream(str(output_file), self.bitrate, self.stream_chunk_ms)
+        else:
+            with self.metrics.timer("mix"):
+                combined_audio = mixer.to_audio_segment()
+            with self.metrics.timer("export"):
+                combined_audio.export(str(output_file), format=self.audio_format, bitrate=self.bitrate)
+    
+    def build_fingerprint(self, timestamps: List[Tuple[float, str]], duration: int) -> Dict:
+        """Fingerprint of a script's cues plus the voice and export settings of this generator"""
+        return build_fingerprint(timestamps, duration, self.tts.voice_id, self.tts.model_id, self.audio_format,
+                                 self.bitrate, self.renditions[1:], self.music_fingerprint,
+                                 self.loudness_fingerprint)
+    
+    def cue_store_for(self, script_file: str) -> ScriptCueStore:
+        """Cue store holding the audio of every cue in a script's last render"""
+        return ScriptCueStore(self.output_dir / ".cues" / Path(script_file).stem)
+    
+    def cue_records(self, timestamps: List[Tuple[float, str]]) -> List[Dict]:
+        """Cue list with content addresses, as stored in the build manifest"""
+        return [
+            {"timestamp": timestamp, "text": text, "key": self.cue_key(text)}
+            for timestamp, text in timestamps
+        ]
+    
+    def unsynthesized_cues(self, cues: List[Dict], cue_store: ScriptCueStore) -> List[str]:
+        """
+        Keys of the cues with no copy on disk (script cue store, cue cache or PCM store)
         
-        # Default fallback - estimate from last timestamp
-        timestamps = self.parse_script_file("temp_script.txt")
-        if timestamps:
-            return int(timestamps[-1][0]) + 300  # Add 5 minutes buffer
+        Args:
+            cues: Cue records from cue_records
+            cue_store: Cue store of the script
+            
+        Returns:
+            Distinct keys that still need a TTS request
+        """
+        unsynthesized = []
+        for key in dict.fromkeys(cue["key"] for cue in cues):
+            if self.is_synthesized(key, cue_store):
+                continue
+            unsynthesized.append(key)
+        return unsynthesized
+    
+    def stale_reasons(self, script_file: str) -> List[str]:
+        """
+        Explain why a script's output needs to be rebuilt
         
-        return 2400  # 40 minutes default
+        Args:
+            script_file: Path to the script file
+            
+        Returns:
+            List of reasons; empty if the output is up to date
+        """
+        timestamps, duration = self.load_script(script_file)
+        output_file = self.output_path(script_file)
+        return self.manifest.stale_reasons(
+            Path(script_file).stem, output_file, self.build_fingerprint(timestamps, duration),
+            [path for path, _, _ in self.rendition_outputs(output_file)[1:]]
+        )
     
-    def process_script_file(self, script_file: str, force_regenerate: bool = False) -> str:
+    def render_script(self, script_file: str, force_regenerate: bool = False) -> Tuple[str, Optional[str]]:
         """
-        Process a single script file and generate audio
+        Render a single script file and report what happened
         
         Args:
             script_file: Path to the script file
             force_regenerate: If True, regenerate even if file exists
             
         Returns:
-            Path to the generated audio file, or None if failed
+            Tuple of (status, output path) where status is "generated", "skipped", "failed",
+            or "paused" when the API quota ran out before every cue was synthesized
         """
         print(f"\n=== Processing {script_file} ===")
         
         # Generate output filename
         script_name = Path(script_file).stem
-        output_file = self.output_dir / f"{script_name}.mp3"
+        output_file = self.output_path(script_file)
         
-        # Check if file already exists
-        if output_file.exists() and not force_regenerate:
+        # Parse the script
+        timestamps, duration = self.load_script(script_file)
+        fingerprint = self.build_fingerprint(timestamps, duration)
+        
+        # Check if the existing file is still up to date
+        extra_outputs = self.rendition_outputs(output_file)[1:]
+        stale_reasons = self.manifest.stale_reasons(script_name, output_file, fingerprint,
+                                                    [path for path, _, _ in extra_outputs])
+        if not stale_reasons and not force_regenerate:
             size_mb = output_file.stat().st_size / (1024 * 1024)
-            print(f"⏭️  Skipping {script_name}.mp3 (already exists, {size_mb:.1f} MB)")
+            print(f"⏭️  Skipping {output_file.name} (up to date, {size_mb:.1f} MB)")
             print("   Use --force to regenerate existing files")
-            return str(output_file)
-        
-        # Parse the script
-        timestamps = self.parse_script_file(script_file)
+            return "skipped", str(output_file)
         
         if not timestamps:
             print(f"No timestamps found in {script_file}")
-            return None
+            return "failed", None
         
+        if stale_reasons:
+            print(f"🔄 Rebuilding {output_file.name}: {', '.join(stale_reasons)}")
         print(f"Found {len(timestamps)} speech segments")
         
-        # Get duration
-        with open(script_file, 'r', encoding='utf-8') as file:
-            content = file.read()
-        duration = self.get_workout_duration(content)
+        # Diff against the previous render so only added or changed cues are synthesized
+        cue_store = self.cue_store_for(script_file)
+        cues = self.cue_records(timestamps)
+        previous_entry = self.manifest.get(script_name) or {}
+        plan = diff_cues(previous_entry.get("cues", []), cues)
+        missing = sum(1 for cue in plan["new"] if not cue_store.contains(cue["key"]))
+        print(f"♻️  Cue diff: {len(plan['unchanged'])} unchanged, {len(plan['retimed'])} retimed, "
+              f"{len(plan['new'])} new or changed, {len(plan['removed'])} removed "
+              f"({missing} not in the cue store)")
+        
+        # Every cue is checkpointed to disk as it arrives, so an interrupted render resumes here.
+        # The manifest marks a build as started until it is recorded, which tells a resumed
+        # build from one that reuses cues of earlier builds.
+        unsynthesized = self.unsynthesized_cues(cues, cue_store)
+        synthesized = len({cue["key"] for cue in cues}) - len(unsynthesized)
+        if self.manifest.was_started(script_name, fingerprint):
+            print(f"⏯️  Resuming: {synthesized} cues already synthesized, {len(unsynthesized)} to go")
+        elif synthesized and unsynthesized:
+            print(f"➕ Incremental build: {synthesized} cues reused, {len(unsynthesized)} to synthesize")
+        self.manifest.start(script_name, fingerprint)
+        if unsynthesized and self.quota_exceeded:
+            print(f"⏸️  Waiting for quota: {len(unsynthesized)} cues of {script_name} still need synthesis")
+            return "paused", None
         
         try:
-            # Generate the audio
-            audio = self.create_timed_audio(timestamps, duration)
+            with self.metrics.script(script_name) as script_metrics, self._profiling(script_name):
+                script_metrics["cues"] = len(timestamps)
+                
+                # Generate the audio
+                fallbacks_before = self.fallback_cues
+                render_started = time.perf_counter()
+                
+                if self.render_backend == "ffmpeg":
+                    with self.metrics.timer("export"):
+                        self.render_with_ffmpeg(timestamps, duration, cue_store, output_file, extra_outputs)
+                else:
+                    mixer = self.build_timeline(timestamps, duration, cue_store)
+                    
+                    # Export the audio
+                    if extra_outputs:
+                        print(f"Exporting to {output_file} and {len(extra_outputs)} more renditions...")
+                    else:
+                        print(f"Exporting to {output_file}...")
+                    self.export_timeline(mixer, output_file)
+                    
+                    if mixer.clipped_samples:
+                        print(f"⚠️  {mixer.clipped_samples} samples clipped where cues overlap")
+                
+                print(f"⏱️  Rendered with the {self.render_backend} backend in {time.perf_counter() - render_started:.1f}s")
+                
+                peak = peak_rss_mb()
+                if peak:
+                    self.metrics.observe_peak_rss(peak)
+                    print(f"📈 Peak RSS so far: {peak['process']:.0f} MB")
+                self.record_connection_stats()
             
-            # Export the audio
-            print(f"Exporting to {output_file}...")
-            audio.export(str(output_file), format="mp3", bitrate="128k")
+            if self.fallback_cues > fallbacks_before:
+                print("⚠️  Some cues fell back to silence; this file will be rebuilt on the next run")
+            else:
+                self.manifest.record(script_name, script_file, output_file, fingerprint, cues=cues)
+                cue_store.prune(cue["key"] for cue in cues)
             
             print(f"✅ Generated: {output_file}")
-            return str(output_file)
+            return "generated", str(output_file)
             
         except QuotaExceededException as e:
-            print(f"❌ Cannot generate {script_file}: {e}")
-            print("💡 Tip: Add more credits to your ElevenLabs account to continue")
-            return None
+            print(f"⏸️  Cannot finish {script_file}: {e}")
+            print("💡 Cues synthesized so far are saved; add more credits and run again to resume")
+            return "paused", None
+    
+    @contextlib.contextmanager
+    def _profiling(self, script_name: str):
+        """
+        Capture cProfile stats of a render into <output_dir>/.profile/<script>.prof when profiling
+        
+        cProfile only sees the thread that enabled it, so tasks on the synthesis thread
+        pool are profiled separately (see _profiled) and merged into the same stats.
+        """
+        if not self.profile:
+            yield
+            return
+        
+        import cProfile
+        import pstats
+        
+        profiler = cProfile.Profile()
+        self._worker_profiles = []
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            stats = pstats.Stats(profiler)
+            for worker_profile in self._worker_profiles:
+                stats.add(worker_profile)
+            self._worker_profiles = None
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+            stats.dump_stats(str(self.profile_dir / f"{script_name}.prof"))
+    
+    def _profiled(self, worker: Callable[[object], object]) -> Callable[[object], object]:
+        """Wrap a thread-pool task so its time shows up in the profile of the render in progress"""
+        if self._worker_profiles is None:
+            return worker
+        
+        import cProfile
+        
+        def run(item):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Python 3.12+ allows one active profiler per interpreter, and it already sees every thread
+                return worker(item)
+            try:
+                return worker(item)
+            finally:
+                profiler.disable()
+                with self._profile_lock:
+                    self._worker_profiles.append(profiler)
+        
+        return run
+    
+    def write_run_report(self, report_file: str, prometheus_file: Optional[str] = None):
+        """
+        Summarize where the run spent its time and write the run report
+        
+        With profiling enabled, only the profile of the slowest script is kept
+        and its most expensive functions are printed.
+        
+        Args:
+            report_file: Destination of the JSON run report
+            prometheus_file: Optional Prometheus textfile-collector file (.prom)
+        """
+        self.record_connection_stats()
+        self.metrics.print_summary()
+        report = self.metrics.write_json(report_file)
+        print(f"📊 Run report written to {report_file}")
+        
+        if prometheus_file:
+            self.metrics.write_prometheus(prometheus_file)
+            print(f"📊 Prometheus metrics written to {prometheus_file}")
+        
+        slowest = report["slowest_script"]
+        if self.profile and slowest:
+            profile_file = self.profile_dir / f"{slowest}.prof"
+            for other in self.profile_dir.glob("*.prof"):
+                if other != profile_file:
+                    other.unlink()
+            if profile_file.exists():
+                print(f"\n🔬 Profile of the slowest script ({slowest}) saved to {profile_file}")
+                import pstats
+                stats = pstats.Stats(str(profile_file), stream=sys.stdout)
+                stats.sort_stats("cumulative").print_stats(15)
+    
+    def process_script_file(self, script_file: str, force_regenerate: bool = False) -> str:
+        """
+        Process a single script file and generate audio
+        
+        Args:
+            script_file: Path to the script file
+            force_regenerate: If True, regenerate even if file exists
+            
+        Returns:
+            Path to the generated audio file, or None if failed
+        """
+        _, output_file = self.render_script(script_file, force_regenerate)
+        self.script_index.save()
+        return output_file
+    
+    def worker_settings(self, jobs: int) -> Dict:
+        """
+        Constructor arguments for a render worker process
+        
+        The concurrency and request rate are split across workers so the pool
+        as a whole stays within the provider's limits.
+        
+        Args:
+            jobs: Number of worker processes sharing the limits
+            
+        Returns:
+            Keyword arguments for C25KAudioGenerator
+        """
+        return {
+            "api_key": self.api_key,
+            "voice_id": self.voice_id,
+            "model_id": self.model_id,
+            "cache_dir": str(self.cache.cache_dir) if self.cache else ".cue_cache",
+            "cache_size_mb": self.cache.max_size_bytes / (1024 * 1024) if self.cache else 500,
+            "use_cache": self.cache is not None,
+            "max_concurrency": max(1, self.max_concurrency // jobs),
+            "requests_per_second": self.requests_per_second / jobs,
+            "audio_format": self.audio_format,
+            "bitrate": self.bitrate,
+            "streaming": self.streaming,
+            "render_backend": self.render_backend,
+            "batch_size": self.batch_size,
+            "batch_break_seconds": self.batch_break_seconds,
+            "tts_backend": self.tts_backend,
+            "tts_url": self.tts_url,
+            "local_voice": self.local_voice,
+            "profile": self.profile,
+            "renditions": self.renditions[1:],
+            "music_file": self.music_file,
+            "music_gain_db": self.music_gain_db,
+            "duck_db": self.duck_db,
+            "duck_attack_ms": self.duck_attack_ms,
+            "duck_release_ms": self.duck_release_ms,
+            "loudness_target": self.loudness_target,
+            "true_peak_db": self.true_peak_db,
+            "pcm_cache_size_mb": self.pcm_store.max_size_bytes / (1024 * 1024) if self.pcm_store else 0,
+        }
     
-    def process_all_scripts(self, scripts_dir: str = "C25K_Audio_Scripts", force_regenerate: bool = False):
+    def _render_parallel(self, script_files: List[Path], force_regenerate: bool, jobs: int) -> Dict[str, Tuple[str, Optional[str]]]:
+        """
+        Render scripts in a process pool that shares one quota flag
+        
+        Args:
+            script_files: Script files to render
+            force_regenerate: If True, regenerate even if files exist
+            jobs: Number of worker processes
+            
+        Returns:
+            Mapping of script path to (status, output path)
+        """
+        # Only parallel renders need the process pool machinery
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        
+        context = multiprocessing.get_context()
+        if self.quota_event is None:
+            self.quota_event = context.Event()
+        if self._quota_exceeded:
+            self.quota_event.set()
+        
+        print(f"🧵 Rendering with {jobs} worker processes")
+        
+        results = {}
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=context,
+                                 initializer=_init_render_worker,
+                                 initargs=(self.worker_settings(jobs), self.quota_event)) as executor:
+            futures = {
+                executor.submit(_render_in_worker, str(script_file), force_regenerate): str(script_file)
+                for script_file in script_files
+            }
+            for future in as_completed(futures):
+                script_file = futures[future]
+                try:
+                    status, output_file, cache_stats, metrics = future.result()
+                except Exception as e:
+                    print(f"❌ Error processing {script_file}: {e}")
+                    status, output_file, cache_stats, metrics = "failed", None, {}, None
+                results[script_file] = (status, output_file)
+                
+                if metrics:
+                    self.metrics.merge(metrics)
+                
+                if self.cache:
+                    for stat, amount in cache_stats.items():
+                        self.cache.stats[stat] += amount
+        
+        return results
+    
+    def process_all_scripts(self, scripts_dir: str = "C25K_Audio_Scripts", force_regenerate: bool = False, jobs: int = 1):
         """
         Process all script files in the directory
         
+        After the quota runs out, scripts whose cues are all on disk are still rendered;
+        the others pause without making any API calls.
+        
         Args:
             scripts_dir: Directory containing script files
             force_regenerate: If True, regenerate even if files exist
+            jobs: Number of scripts to render in parallel worker processes
         """
         scripts_dir = Path(scripts_dir)
         
@@ -269,47 +1484,53 @@ class C25KAudioGenerator:
         
         print(f"Found {len(script_files)} script files to process")
         
+        # Parse new or edited scripts once; workers and later runs read the compiled index
+        parsed = self.script_index.compile(str(script_file) for script_file in script_files)
+        print(f"📇 Script index: {parsed} parsed, {len(script_files) - parsed} unchanged")
+        
+        # Deduplicate and cache every cue before rendering any script
+        pending_files = [
+            script_file for script_file in script_files
+            if force_regenerate or self.stale_reasons(str(script_file))
+        ]
+        try:
+            self.prefetch_cues(pending_files)
+        except QuotaExceededException as e:
+            print(f"⚠️  Cue prefetch stopped: {e}")
+            print("   Scripts whose cues are already cached can still be rendered")
+        
+        if jobs > 1 and len(pending_files) > 1:
+            results = self._render_parallel(script_files, force_regenerate, jobs)
+        else:
+            results = {}
+            for script_file in script_files:
+                try:
+                    results[str(script_file)] = self.render_script(str(script_file), force_regenerate)
+                except Exception as e:
+                    print(f"❌ Error processing {script_file}: {e}")
+                    results[str(script_file)] = ("failed", None)
+        
         generated_files = []
         skipped_files = []
+        paused_files = []
         failed_files = []
         
+        # Merge per-file results back into script order
         for script_file in script_files:
-            try:
-                output_file = self.process_script_file(str(script_file), force_regenerate)
-                if output_file:
-                    # Check if this was a skip or actual generation
-                    script_name = Path(script_file).stem
-                    expected_output = self.output_dir / f"{script_name}.mp3"
-                    if expected_output.exists() and not force_regenerate:
-                        # Check if it was just created or already existed
-                        if expected_output.stat().st_mtime > time.time() - 60:  # Created in last minute
-                            generated_files.append(output_file)
-                        else:
-                            skipped_files.append(output_file)
-                    else:
-                        generated_files.append(output_file)
-                else:
-                    failed_files.append(str(script_file))
-                    
-                # If quota exceeded, stop processing remaining files
-                if self.quota_exceeded:
-                    remaining_files = script_files[script_files.index(script_file) + 1:]
-                    if remaining_files:
-                        print(f"\n⚠️  Skipping {len(remaining_files)} remaining files due to quota exceeded:")
-                        for remaining_file in remaining_files:
-                            print(f"  - {remaining_file.name}")
-                            failed_files.append(str(remaining_file))
-                    break
-                    
-            except Exception as e:
-                print(f"❌ Error processing {script_file}: {e}")
+            status, output_file = results.get(str(script_file), ("failed", None))
+            if status == "generated":
+                generated_files.append(output_file)
+            elif status == "skipped":
+                skipped_files.append(output_file)
+            elif status == "paused":
+                paused_files.append(str(script_file))
+            else:
                 failed_files.append(str(script_file))
-                continue
-        
+
         # Final summary
         print(f"\n🎉 Audio generation summary:")
         print(f"✅ Successfully generated: {len(generated_files)} files")
-        print(f"⏭️  Skipped (already exist): {len(skipped_files)} files")
+        print(f"⏭️  Skipped (up to date): {len(skipped_files)} files")
         
         if generated_files:
             print("Generated files:")
@@ -321,24 +1542,65 @@ class C25KAudioGenerator:
             for file in skipped_files:
                 print(f"  - {file}")
         
+        if paused_files:
+            print(f"\n⏸️  Waiting for quota: {len(paused_files)} files (synthesized cues are saved)")
+            for file in paused_files:
+                print(f"  - {Path(file).name}")
+        
         if failed_files:
             print(f"\n❌ Failed to generate: {len(failed_files)} files")
             print("Failed files:")
             for file in failed_files:
                 print(f"  - {Path(file).name}")
+        
+        if self.cache:
+            stats = self.cache.summary()
+            print(f"\n🗂️  Cue cache: {stats['hits']} hits, {stats['misses']} misses "
+                  f"({stats['hit_rate']:.0%} hit rate), {stats['characters_saved']} characters saved, "
+                  f"{stats['size_mb']:.1f} MB on disk")
                 
         if self.quota_exceeded:
             print(f"\n💰 API quota exceeded during processing.")
-            print(f"💡 Add more credits to your ElevenLabs account to generate the remaining {len(failed_files)} files.")
+            print(f"💡 Add more credits to your ElevenLabs account and run again: the remaining "
+                  f"{len(paused_files)} files resume from the cues already synthesized.")
         
         return generated_files
 
-def check_audio_status(scripts_dir: str = "C25K_Audio_Scripts"):
+# Per-process generator used by render workers in process_all_scripts(jobs > 1)
+_worker_generator = None
+
+def _init_render_worker(settings: Dict, quota_event):
+    """Create the generator for a render worker process"""
+    global _worker_generator
+    _worker_generator = C25KAudioGenerator(**settings)
+    _worker_generator.quota_event = quota_event
+
+def _render_in_worker(script_file: str, force_regenerate: bool) -> Tuple[str, Optional[str], Dict, Dict]:
+    """Render one script in a worker process and return its status plus cache statistics and metrics"""
+    cache = _worker_generator.cache
+    before = dict(cache.stats) if cache else {}
+    _worker_generator.metrics = PipelineMetrics()
+    status, output_file = _worker_generator.render_script(script_file, force_regenerate)
+    _worker_generator.record_connection_stats()
+    cache_stats = {stat: cache.stats[stat] - before[stat] for stat in before} if cache else {}
+    return status, output_file, cache_stats, _worker_generator.metrics.snapshot()
+
+def check_audio_status(scripts_dir: str = "C25K_Audio_Scripts", voice_id: str = "21m00Tcm4TlvDq8ikWAM",
+                       model_id: str = "eleven_monolingual_v1", audio_format: str = "mp3", bitrate: str = "128k",
+                       renditions: Optional[List[Tuple[str, str]]] = None, music: Optional[str] = None,
+                       loudness: Optional[str] = loudness_setting(LOUDNESS_TARGET_LUFS)):
     """
     Check which audio files need to be generated (dry run)
     
     Args:
         scripts_dir: Directory containing script files
+        voice_id: ElevenLabs voice ID the files should be rendered with
+        model_id: ElevenLabs model ID the files should be rendered with
+        audio_format: Export format the files should have
+        bitrate: Export bitrate the files should have
+        renditions: Additional (format, bitrate) renditions the files should have
+        music: Music bed fingerprint (from music_bed_fingerprint) the files should have been mixed with
+        loudness: Cue normalization (from loudness_setting) the files should have, or None for none
     """
     scripts_dir = Path(scripts_dir)
     audio_dir = Path("generated_audio")
@@ -369,51 +1631,74 @@ def check_audio_status(scripts_dir: str = "C25K_Audio_Scripts"):
     print(f"🎧 Audio directory: {audio_dir}")
     print()
     
+    manifest = BuildManifest(audio_dir)
+    script_index = ScriptIndex(audio_dir / ".build" / "script_index.json")
+    
     # Check each script file
     missing_files = []
+    stale_files = []
     existing_files = []
     
     for script_file in script_files:
         # Expected audio filename
-        audio_filename = f"{script_file.stem}.mp3"
+        audio_filename = f"{script_file.stem}.{audio_format}"
         audio_path = audio_dir / audio_filename
         
-        if audio_path.exists():
+        timestamps, duration = script_index.load(str(script_file))
+        extra = [rendition for rendition in renditions or [] if rendition != (audio_format, bitrate)]
+        fingerprint = build_fingerprint(timestamps, duration, voice_id, model_id, audio_format, bitrate, extra, music,
+                                        loudness)
+        extra_paths = [path for path, _, _ in rendition_outputs(audio_path, [(audio_format, bitrate)] + extra)[1:]]
+        reasons = manifest.stale_reasons(script_file.stem, audio_path, fingerprint, extra_paths)
+        
+        if not audio_path.exists():
+            missing_files.append((script_file.name, audio_filename))
+        elif reasons:
+            stale_files.append((script_file.name, audio_filename, reasons))
+        else:
             # Get file size for info
             size_mb = audio_path.stat().st_size / (1024 * 1024)
             existing_files.append((script_file.name, audio_filename, size_mb))
-        else:
-            missing_files.append(script_file.name)
+    
+    script_index.save()
     
     # Display results
     print(f"📊 Status Summary:")
     print(f"   Total script files: {len(script_files)}")
-    print(f"   ✅ Generated: {len(existing_files)}")
+    print(f"   ✅ Up to date: {len(existing_files)}")
+    print(f"   🔄 Stale: {len(stale_files)}")
     print(f"   ❌ Missing: {len(missing_files)}")
     print()
     
     if existing_files:
-        print("✅ Generated Audio Files:")
+        print("✅ Up-to-date Audio Files:")
         for script_name, audio_name, size_mb in existing_files:
             print(f"   📁 {script_name} → {audio_name} ({size_mb:.1f} MB)")
         print()
     
+    if stale_files:
+        print("🔄 Stale Audio Files (will be rebuilt):")
+        for script_name, audio_name, reasons in stale_files:
+            print(f"   📝 {script_name} → {audio_name}: {', '.join(reasons)}")
+        print()
+    
     if missing_files:
         print("❌ Missing Audio Files:")
-        for script_name in missing_files:
-            print(f"   📝 {script_name} → {script_name.replace('.txt', '.mp3')}")
+        for script_name, audio_name in missing_files:
+            print(f"   📝 {script_name} → {audio_name}")
         print()
-        
-        print("🚀 To generate missing files, run:")
+    
+    if missing_files or stale_files:
+        print("🚀 To generate missing and stale files, run:")
         print("   python generate_audio.py --api-key YOUR_KEY")
         print()
         print("   Or generate a specific file:")
         print("   python generate_audio.py --api-key YOUR_KEY --single-file C25K_Audio_Scripts/Week1_Audio_Script.txt")
     else:
-        print("🎉 All audio files have been generated!")
+        print("🎉 All audio files are up to date!")
         print()
         print("💡 To regenerate all files, run:")
-        print("   python generate_audio.py --api-key YOUR_KEY")
+        print("   python generate_audio.py --api-key YOUR_KEY --force")
 
 def main():
     parser = argparse.ArgumentParser(description="Generate Couch to 5K audio files using ElevenLabs")
@@ -423,29 +1708,140 @@ def main():
     parser.add_argument("--single-file", help="Process only a single script file")
     parser.add_argument("--dry-run", action="store_true", help="Check which audio files need to be generated without making any changes")
     parser.add_argument("--force", action="store_true", help="Force regeneration of existing audio files")
+    parser.add_argument("--model-id", default="eleven_monolingual_v1", help="ElevenLabs model ID")
+    parser.add_argument("--cache-dir", default=".cue_cache", help="Directory for the shared cue cache")
+    parser.add_argument("--cache-size-mb", type=float, default=500, help="Maximum cue cache size in MB (default: 500)")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the cue cache and call the API for every cue")
+    parser.add_argument("--pcm-cache-size-mb", type=float, default=2000,
+                        help="Maximum size of the decoded cue store in MB; 0 decodes every cue on every use (default: 2000)")
+    parser.add_argument("--concurrency", type=int, default=2, help="Maximum concurrent ElevenLabs requests (default: 2)")
+    parser.add_argument("--requests-per-second", type=float, default=2.0, help="Sustained ElevenLabs request rate (default: 2)")
+    parser.add_argument("--format", default="mp3", help="Export format (default: mp3)")
+    parser.add_argument("--bitrate", default="128k", help="Export bitrate (default: 128k)")
+    parser.add_argument("--renditions", type=parse_renditions, default=[],
+                        help="More format:bitrate renditions encoded from the same mix, e.g. mp3:64k,opus:48k,aac:96k")
+    parser.add_argument("--music", help="Background music looped under every workout and ducked under the coaching cues")
+    parser.add_argument("--music-gain-db", type=float, default=-18.0,
+                        help="Music level while nobody is speaking, in dB (default: -18)")
+    parser.add_argument("--duck-db", type=float, default=-12.0,
+                        help="Extra music attenuation under speech, in dB (default: -12)")
+    parser.add_argument("--duck-attack-ms", type=int, default=200,
+                        help="How long the music takes to duck before a cue (default: 200)")
+    parser.add_argument("--duck-release-ms", type=int, default=600,
+                        help="How long the music takes to come back after a cue (default: 600)")
+    parser.add_argument("--loudness-target", type=float, default=LOUDNESS_TARGET_LUFS,
+                        help=f"EBU R128 loudness every cue is normalized to, in LUFS (default: {LOUDNESS_TARGET_LUFS:g})")
+    parser.add_argument("--true-peak", type=float, default=TRUE_PEAK_DBTP,
+                        help=f"True-peak ceiling of a normalized cue, in dBTP (default: {TRUE_PEAK_DBTP:g})")
+    parser.add_argument("--no-normalize", action="store_true",
+                        help="Leave cues at the level the TTS provider returned them")
+    parser.add_argument("--stream", action="store_true", help="Stream the mix to the encoder in chunks to keep memory flat")
+    parser.add_argument("--render-backend", choices=RENDER_BACKENDS, default="numpy",
+                        help="Mix the timeline in Python (numpy) or in a single ffmpeg filtergraph (ffmpeg)")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="Cues synthesized per API request, split apart with alignment timestamps (default: 1)")
+    parser.add_argument("--batch-break", type=float, default=1.0,
+                        help="Pause in seconds requested between cues of a batch (default: 1.0)")
+    parser.add_argument("--tts-backend", choices=TTS_BACKENDS, default="elevenlabs",
+                        help="Speech engine: ElevenLabs, offline espeak-ng drafts (local), mock_tts_server.py (mock), "
+                             "or a fixed-length placeholder tone for timing the pipeline (tone)")
+    parser.add_argument("--tts-url", help="Server address for the elevenlabs or mock TTS backend")
+    parser.add_argument("--local-voice", default="en-us", help="espeak voice for the local TTS backend (default: en-us)")
+    parser.add_argument("--report", default="generated_audio/run_report.json",
+                        help="Where to write the JSON run report (default: generated_audio/run_report.json)")
+    parser.add_argument("--prometheus-textfile",
+                        help="Also write run metrics in Prometheus textfile-collector format (e.g. /var/lib/node_exporter/c25k.prom)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Capture cProfile stats and keep those of the slowest script in generated_audio/.profile/")
+    parser.add_argument("--jobs", type=int, default=1, help="Number of scripts to render in parallel processes (default: 1)")
+    parser.add_argument("--variants",
+                        help="JSONL file of personalized variants (name substitutions, shifted timings) to render "
+                             "from shared cue audio instead of the base workouts")
+    parser.add_argument("--variants-dir", default="generated_audio/variants",
+                        help="Directory for variant renders, one subdirectory per variant (default: generated_audio/variants)")
+    parser.add_argument("--whole-cues", action="store_true",
+                        help="Synthesize substituted variant cues as whole sentences instead of sharing their unchanged fragments")
     
     args = parser.parse_args()
     
+    if args.music and not os.path.isfile(args.music):
+        print(f"❌ Music file not found: {args.music}")
+        sys.exit(1)
+    
+    loudness_target = None if args.no_normalize else args.loudness_target
+    
     if args.dry_run:
         # Dry run - just check status
-        check_audio_status(args.scripts_dir)
+        music = music_bed_fingerprint(args.music, args.music_gain_db, args.duck_db, args.duck_attack_ms,
+                                      args.duck_release_ms) if args.music else None
+        # Outputs are fingerprinted with the backend's voice and model, e.g. mock:<model> or espeak-ng
+        voice_id, model_id = backend_identity(args.tts_backend, args.voice_id, args.model_id, args.local_voice)
+        check_audio_status(args.scripts_dir, voice_id, model_id, args.format, args.bitrate,
+                           args.renditions, music, loudness_setting(loudness_target, args.true_peak))
         return
     
-    # Regular generation requires API key
-    if not args.api_key:
+    # Regular generation with ElevenLabs requires API key
+    if args.tts_backend == "elevenlabs" and not args.api_key:
         print("❌ API key is required for audio generation")
-        print("💡 Use --dry-run to check status without API key")
+        print("💡 Use --dry-run to check status without API key, or --tts-backend local for offline drafts")
         return
     
     # Initialize the generator
-    generator = C25KAudioGenerator(args.api_key, args.voice_id)
+    generator = C25KAudioGenerator(args.api_key or "", args.voice_id, args.model_id,
+                                   cache_dir=args.cache_dir, cache_size_mb=args.cache_size_mb,
+                                   use_cache=not args.no_cache, max_concurrency=args.concurrency,
+                                   requests_per_second=args.requests_per_second,
+                                   audio_format=args.format, bitrate=args.bitrate, streaming=args.stream,
+                                   render_backend=args.render_backend, batch_size=args.batch_size,
+                                   batch_break_seconds=args.batch_break, tts_backend=args.tts_backend,
+                                   tts_url=args.tts_url, local_voice=args.local_voice, profile=args.profile,
+                                   renditions=args.renditions, music_file=args.music,
+                                   music_gain_db=args.music_gain_db, duck_db=args.duck_db,
+                                   duck_attack_ms=args.duck_attack_ms, duck_release_ms=args.duck_release_ms,
+                                   loudness_target=loudness_target, true_peak_db=args.true_peak,
+                                   pcm_cache_size_mb=args.pcm_cache_size_mb)
     
-    if args.single_file:
+    if args.variants:
+        # Imported here so plain renders don't load the variant renderer
+        from variant_renderer import VariantRenderer, read_variants
+        
+        try:
+            variants = read_variants(args.variants)
+            renderer = VariantRenderer(generator, args.variants_dir, split=not args.whole_cues, jobs=args.jobs)
+        except (OSError, ValueError) as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        
+        if args.single_file:
+            script_files = [Path(args.single_file)]
+        else:
+            script_files = sorted(
+                (file for file in Path(args.scripts_dir).glob("*.txt") if not file.name.startswith("README")),
+                key=lambda file: file.name
+            )
+        
+        started = time.perf_counter()
+        try:
+            stats = renderer.render_all(script_files, variants, args.force)
+        except QuotaExceededException as e:
+            print(f"⏸️  {e}")
+            print("💡 Fragments synthesized so far are cached; add more credits and run again to resume")
+            stats = renderer.stats
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        generator.script_index.save()
+        print(f"\n👥 Variants: {stats['rendered']} rendered, {stats['skipped']} up to date, "
+              f"{stats['incomplete']} incomplete, {stats['failed']} failed in {time.perf_counter() - started:.1f}s")
+        print(f"🧩 {stats['fragments']} unique fragments, {stats['synthesized']} synthesized this run")
+    elif args.single_file:
         # Process single file
         generator.process_script_file(args.single_file, args.force)
     else:
         # Process all files
-        generator.process_all_scripts(args.scripts_dir, args.force)
+        generator.process_all_scripts(args.scripts_dir, args.force, args.jobs)
+    
+    generator.write_run_report(args.report, args.prometheus_textfile)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -12,6 +12,7 @@ from pathlib import Path
 # Try to import the main generator
 try:
     from generate_audio import C25KAudioGenerator, QuotaExceededException
+    from export_ladder import parse_renditions
 except ImportError:
     print("❌ Error: Could not import generate_audio module")
     print("Make sure you're running this from the project directory")
@@ -56,6 +57,25 @@ def main():
     # Get voice settings
     voice_id = config["elevenlabs"]["voice_id"]
     voice_name = config["elevenlabs"]["voice_name"]
+    model_id = config["elevenlabs"].get("model", "eleven_monolingual_v1")
+    audio_settings = config.get("audio_settings", {})
+    audio_format = audio_settings.get("format", "mp3")
+    bitrate = audio_settings.get("bitrate", "128k")
+    # Extra format:bitrate pairs encoded from the same mix, e.g. ["opus:48k", "aac:96k"]
+    try:
+        renditions = parse_renditions(",".join(audio_settings.get("renditions", [])))
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    
+    # Level every cue is normalized to; null leaves cues as synthesized
+    loudness_target = audio_settings.get("loudness_target", -16.0)
+    
+    # Optional background music, looped under every workout and ducked under the cues
+    music_file = audio_settings.get("music_file") or None
+    if music_file and not os.path.isfile(music_file):
+        print(f"❌ Music file not found: {music_file}")
+        return
     
     print(f"🎤 Using voice: {voice_name}")
     print(f"📁 Scripts directory: C25K_Audio_Scripts")
@@ -72,7 +92,9 @@ def main():
     
     # Initialize generator
     try:
-        generator = C25KAudioGenerator(api_key, voice_id)
+        generator = C25KAudioGenerator(api_key, voice_id, model_id,
+                                       audio_format=audio_format, bitrate=bitrate, renditions=renditions,
+                                       music_file=music_file, loudness_target=loudness_target)
     except Exception as e:
         print(f"❌ Error initializing generator: {e}")
         return
@@ -82,7 +104,7 @@ def main():
             # Generate all files
             print("\n🚀 Generating all audio files...")
             print("⚠️  This will take 20-30 minutes and use ~1000-2000 ElevenLabs characters")
-            print("💡 Existing files will be skipped (use --force to regenerate)")
+            print("💡 Up-to-date files will be skipped (use --force to regenerate)")
             
             confirm = input("Continue? (y/N): ").strip().lower()
             
@@ -139,8 +161,11 @@ def main():
         elif choice == "4":
             # Dry run - check status
             print("\n🔍 Checking audio file status...")
-            from generate_audio import check_audio_status
-            check_audio_status()
+            from generate_audio import check_audio_status, loudness_setting, music_bed_fingerprint
+            music = music_bed_fingerprint(music_file) if music_file else None
+            check_audio_status(voice_id=voice_id, model_id=model_id,
+                               audio_format=audio_format, bitrate=bitrate, renditions=renditions, music=music,
+                               loudness=loudness_setting(loudness_target))
         
         else:
             print("❌ Invalid choice")
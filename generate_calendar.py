@@ -1,9 +1,18 @@
+import os
+import json
+import time as time_module
 from datetime import datetime, timedelta, time
-from icalendar import Calendar, Event
-import pytz
+from functools import lru_cache
 import argparse
-from typing import List, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 import re
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
+from schedule_engine import WorkoutPlan
+
+# icalendar is imported where calendars are built, so argument parsing and schedule
+# arithmetic don't pay for loading it
+if TYPE_CHECKING:
+    from icalendar import Calendar, Event
 
 # Define the workout program
 WORKOUTS = [
@@ -126,35 +135,65 @@ WORKOUTS = [
     }
 ]
 
-def parse_time_and_timezone(time_str: str) -> Tuple[time, pytz.timezone]:
-    """Parse time string in format 'HH:MM am/pm TIMEZONE' or 'HH am/pm TIMEZONE'"""
-    # Common timezone abbreviations
-    timezone_map = {
-        'EST': 'America/New_York',
-        'EDT': 'America/New_York',
-        'CST': 'America/Chicago',
-        'CDT': 'America/Chicago',
-        'MST': 'America/Denver',
-        'MDT': 'America/Denver',
-        'PST': 'America/Los_Angeles',
-        'PDT': 'America/Los_Angeles',
-        'UTC': 'UTC',
-        'GMT': 'UTC'
-    }
+# Common timezone abbreviations; any IANA name (e.g. "Europe/London") is accepted as well
+TIMEZONE_ABBREVIATIONS = {
+    'EST': 'America/New_York',
+    'EDT': 'America/New_York',
+    'CST': 'America/Chicago',
+    'CDT': 'America/Chicago',
+    'MST': 'America/Denver',
+    'MDT': 'America/Denver',
+    'PST': 'America/Los_Angeles',
+    'PDT': 'America/Los_Angeles',
+    'UTC': 'UTC',
+    'GMT': 'UTC'
+}
+
+@lru_cache(maxsize=None)
+def _iana_names_by_lowercase() -> Dict[str, str]:
+    return {name.lower(): name for name in available_timezones()}
+
+@lru_cache(maxsize=None)
+def get_timezone(name: str) -> ZoneInfo:
+    """
+    Look up a timezone by abbreviation (e.g. 'CDT') or IANA name (e.g. 'Europe/London')
+    
+    Lookups are cached, so each timezone is only loaded from the tz database once per process.
+    
+    Raises:
+        ValueError: When the name is not a known abbreviation or IANA timezone
+    """
+    key = TIMEZONE_ABBREVIATIONS.get(name.upper(), name)
+    try:
+        return ZoneInfo(key)
+    except (ZoneInfoNotFoundError, ValueError):
+        pass
     
-    # Normalize the input string
-    time_str = time_str.strip().lower()
+    # IANA names are case-sensitive on most systems; accept "europe/london" too
+    canonical = _iana_names_by_lowercase().get(key.lower())
+    if canonical:
+        return ZoneInfo(canonical)
+    raise ValueError(
+        f"Unsupported timezone: {name}\n"
+        f"Use an IANA name such as America/Chicago or Europe/London, "
+        f"or one of: {', '.join(TIMEZONE_ABBREVIATIONS)}"
+    )
+
+def parse_time_and_timezone(time_str: str) -> Tuple[time, ZoneInfo]:
+    """Parse time string in format 'HH:MM am/pm TIMEZONE' or 'HH am/pm TIMEZONE'"""
+    # Normalize the input string (timezone names keep their case)
+    time_str = time_str.strip()
     
     # Try different time formats
     formats = [
-        r'(\d{1,2})(?::(\d{2}))?\s+(am|pm)\s+([a-z]{3,4})',  # 7:00 am cdt
-        r'(\d{1,2})(?::(\d{2}))?(am|pm)\s+([a-z]{3,4})',     # 7:00am cdt
-        r'(\d{1,2})\s+(am|pm)\s+([a-z]{3,4})'                # 7 am cdt
+        r'(\d{1,2})(?::(\d{2}))?\s+(am|pm)\s+(\S+)',  # 7:00 am cdt
+        r'(\d{1,2})(?::(\d{2}))?(am|pm)\s+(\S+)',     # 7:00am cdt
+        r'(\d{1,2})\s+(am|pm)\s+(\S+)'                # 7 am cdt
     ]
     
     match = None
     for pattern in formats:
-        match = re.match(pattern, time_str)
+        match = re.fullmatch(pattern, time_str, re.IGNORECASE)
         if match:
             break
     
@@ -163,20 +202,21 @@ def parse_time_and_timezone(time_str: str) -> Tuple[time, pytz.timezone]:
             "Invalid time format. Please use one of these formats:\n"
             "- '7:00 am CDT'\n"
             "- '7:00am CDT'\n"
-            "- '7 am CDT'"
+            "- '7 am CDT'\n"
+            "- '7:00 am Europe/London'"
         )
     
     # Extract components
     if len(match.groups()) == 4:
         hour = int(match.group(1))
         minute = int(match.group(2) or 0)
-        am_pm = match.group(3)
-        tz_abbr = match.group(4).upper()  # Convert timezone to uppercase for lookup
+        am_pm = match.group(3).lower()
+        tz_name = match.group(4)
     else:  # 3 groups for the simple format
         hour = int(match.group(1))
         minute = 0
-        am_pm = match.group(2)
-        tz_abbr = match.group(3).upper()  # Convert timezone to uppercase for lookup
+        am_pm = match.group(2).lower()
+        tz_name = match.group(3)
     
     # Convert to 24-hour format
     if am_pm == 'pm' and hour != 12:
@@ -184,16 +224,9 @@ def parse_time_and_timezone(time_str: str) -> Tuple[time, pytz.timezone]:
     elif am_pm == 'am' and hour == 12:
         hour = 0
     
-    # Get timezone
-    if tz_abbr not in timezone_map:
-        raise ValueError(
-            f"Unsupported timezone: {tz_abbr}\n"
-            "Supported timezones are: EST, EDT, CST, CDT, MST, MDT, PST, PDT, UTC, GMT"
-        )
-    
     # Create time object
     time_obj = time(hour, minute)
-    return time_obj, pytz.timezone(timezone_map[tz_abbr])
+    return time_obj, get_timezone(tz_name)
 
 def parse_workout_days(days_str: str) -> List[int]:
     """Convert comma-separated days to list of weekday numbers (0=Monday, 6=Sunday)"""
@@ -207,80 +240,159 @@ def parse_workout_days(days_str: str) -> List[int]:
         'sunday': 6, 'sun': 6
     }
     
-    days = [day.strip().lower() for day in days_str.split(',')]
+    days = [day.strip().lower() for day in days_str.split(',') if day.strip()]
+    unknown = [day for day in days if day not in day_map]
+    if unknown:
+        raise ValueError(f"Unknown workout day: {unknown[0]}")
     return [day_map[day] for day in days]
 
-def generate_calendar(start_date: datetime, workout_days: List[int], workout_time: time, timezone: pytz.timezone, output_file: str):
+def schedule_workouts(start_date: datetime, workout_days: List[int], workout_time: time) -> List[datetime]:
+    """Local start time of every workout: one per workout day, starting on or after start_date"""
+    return WorkoutPlan.create(start_date, workout_days, workout_time, len(WORKOUTS)).starts
+
+def workout_summary(workout_index: int) -> str:
+    """Event title of a workout, e.g. 'C25K Week 1 Day 2'"""
+    week_num = workout_index // 3 + 1
+    day_num = workout_index % 3 + 1
+    summary = f'C25K Week {week_num} Day {day_num}'
+    if workout_index == len(WORKOUTS) - 1:
+        summary += ' - FINAL WORKOUT! 🎉'
+    return summary
+
+def workout_uid(workout_index: int) -> str:
+    """Stable event UID of a workout"""
+    return f'c25k-w{workout_index // 3 + 1}d{workout_index % 3 + 1}@calendar'
+
+def new_calendar() -> "Calendar":
+    """Empty calendar with the program's header properties"""
+    from icalendar import Calendar
+    
     cal = Calendar()
     cal.add('prodid', '-//Couch to 5K Calendar//EN')
     cal.add('version', '2.0')
     cal.add('calscale', 'GREGORIAN')
     cal.add('method', 'PUBLISH')
+    return cal
 
-    # Convert start_date to the specified timezone
-    start_date = timezone.localize(start_date.replace(
-        hour=workout_time.hour,
-        minute=workout_time.minute,
-        second=0,
-        microsecond=0
-    ))
+def workout_event(workout_index: int, start: datetime, sequence: int = 0) -> "Event":
+    """VEVENT of a workout; SEQUENCE is only written once the event has been rescheduled"""
+    from icalendar import Event
     
-    current_date = start_date
-    workout_index = 0
+    workout = WORKOUTS[workout_index]
+    event = Event()
+    event.add('summary', workout_summary(workout_index))
+    event.add('description', workout['description'])
+    event.add('dtstart', start)
+    event.add('dtend', start + timedelta(minutes=workout['duration']))
+    event.add('status', 'CONFIRMED')
+    event['uid'] = workout_uid(workout_index)
+    if sequence:
+        event.add('sequence', sequence)
+    return event
+
+def write_plan_calendar(plan: WorkoutPlan, timezone: ZoneInfo, output_file: str,
+                        workout_indices: Optional[List[int]] = None):
+    """
+    Write a plan's workouts as an ICS file
     
-    while workout_index < len(WORKOUTS):
-        # Skip to next workout day
-        while current_date.weekday() not in workout_days:
-            current_date += timedelta(days=1)
-        
-        workout = WORKOUTS[workout_index]
-        week_num = workout_index // 3 + 1
-        day_num = workout_index % 3 + 1
-        
-        event = Event()
-        event.add('summary', f'C25K Week {week_num} Day {day_num}')
-        if workout_index == len(WORKOUTS) - 1:
-            event['summary'] += ' - FINAL WORKOUT! 🎉'
-            
-        event.add('description', workout['description'])
-        event.add('dtstart', current_date)
-        event.add('dtend', current_date + timedelta(minutes=workout['duration']))
-        event.add('status', 'CONFIRMED')
-        event['uid'] = f'c25k-w{week_num}d{day_num}@calendar'
-        
-        cal.add_component(event)
-        
-        # Move to next day
-        current_date += timedelta(days=1)
-        workout_index += 1
+    Args:
+        plan: Runner's plan
+        timezone: Timezone of the plan's local start times
+        output_file: Output ICS file path
+        workout_indices: Only write these workouts (e.g. the ones a reschedule changed)
+    """
+    cal = new_calendar()
+    
+    if workout_indices is None:
+        workout_indices = range(len(plan.starts))
+    for workout_index in workout_indices:
+        # Convert to the specified timezone
+        current_date = plan.starts[workout_index].replace(tzinfo=timezone)
+        cal.add_component(workout_event(workout_index, current_date, plan.sequences[workout_index]))
 
     with open(output_file, 'wb') as f:
         f.write(cal.to_ical())
 
+def generate_calendar(start_date: datetime, workout_days: List[int], workout_time: time, timezone: ZoneInfo, output_file: str):
+    plan = WorkoutPlan.create(start_date, workout_days, workout_time, len(WORKOUTS), timezone.key)
+    write_plan_calendar(plan, timezone, output_file)
+
+def load_plan(plan_file: str) -> Optional[WorkoutPlan]:
+    """Read a saved plan, or None if the file does not exist"""
+    try:
+        with open(plan_file, 'r', encoding='utf-8') as f:
+            return WorkoutPlan.from_dict(json.load(f))
+    except FileNotFoundError:
+        return None
+
+def save_plan(plan: WorkoutPlan, plan_file: str):
+    with open(plan_file, 'w', encoding='utf-8') as f:
+        json.dump(plan.to_dict(), f, indent=2)
+
 def main():
     parser = argparse.ArgumentParser(description='Generate Couch to 5K calendar')
-    parser.add_argument('--start-date', required=True, help='Start date (YYYY-MM-DD)')
-    parser.add_argument('--workout-days', required=True, help='Comma-separated workout days (e.g., "Monday,Wednesday,Friday")')
-    parser.add_argument('--workout-time', required=True, 
+    parser.add_argument('--start-date', help='Start date (YYYY-MM-DD)')
+    parser.add_argument('--workout-days', help='Comma-separated workout days (e.g., "Monday,Wednesday,Friday")')
+    parser.add_argument('--workout-time', 
                        help='Workout time and timezone (e.g., "7:00 am CDT", "7:00am CDT", or "7 am CDT")')
     parser.add_argument('--output', default='couch_to_5k_calendar.ics', help='Output ICS file path')
+    parser.add_argument('--roster',
+                       help='CSV or JSONL roster with start_date, workout_days, workout_time, timezone and output '
+                            'for each runner; generates every calendar in one run')
+    parser.add_argument('--output-dir', default='.', help='Directory for the roster\'s relative output paths')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                       help='Worker processes for --roster (default: CPU count)')
+    parser.add_argument('--plan',
+                       help='JSON file keeping the runner\'s schedule between runs; created on first use, '
+                            'after which --start-date, --workout-days and --workout-time are not needed')
+    parser.add_argument('--missed', type=int,
+                       help='Number of a missed workout (1-27): it and every later workout move to the next '
+                            'workout days, and only the moved events are written, with a bumped SEQUENCE')
+    parser.add_argument('--resume-date', help='Earliest date to resume after --missed (YYYY-MM-DD, default: the day after)')
     
     args = parser.parse_args()
     
+    if args.roster:
+        # Imported here because the roster module builds on this one
+        from roster_calendars import generate_roster_calendars
+        
+        started = time_module.perf_counter()
+        written, errors = generate_roster_calendars(args.roster, args.output_dir, args.jobs)
+        elapsed = time_module.perf_counter() - started
+        print(f"Generated {written} calendars in {elapsed:.1f}s ({written / max(elapsed, 1e-9):.0f}/s)")
+        for line_number, error in errors[:20]:
+            print(f"Error: {args.roster} line {line_number}: {error}")
+        if len(errors) > 20:
+            print(f"... and {len(errors) - 20} more errors")
+        return
+    
+    plan = load_plan(args.plan) if args.plan else None
+    if plan is None and not (args.start_date and args.workout_days and args.workout_time):
+        parser.error('--start-date, --workout-days and --workout-time are required without --roster or a saved --plan')
+    
     try:
-        start_date = datetime.strptime(args.start_date, '%Y-%m-%d')
-        workout_days = parse_workout_days(args.workout_days)
-        workout_time, timezone = parse_time_and_timezone(args.workout_time)
+        if plan is None:
+            start_date = datetime.strptime(args.start_date, '%Y-%m-%d')
+            workout_days = parse_workout_days(args.workout_days)
+            workout_time, timezone = parse_time_and_timezone(args.workout_time)
+            plan = WorkoutPlan.create(start_date, workout_days, workout_time, len(WORKOUTS), timezone.key)
+        else:
+            timezone = get_timezone(plan.timezone)
+        
+        if args.missed is not None:
+            resume_date = datetime.strptime(args.resume_date, '%Y-%m-%d').date() if args.resume_date else None
+            changed = plan.reschedule(args.missed - 1, resume_date)
+            write_plan_calendar(plan, timezone, args.output, changed)
+            print(f"Rescheduled {len(changed)} workouts from {workout_summary(args.missed - 1)} onwards: {args.output}")
+        else:
+            write_plan_calendar(plan, timezone, args.output)
+            print(f"Calendar generated successfully: {args.output}")
         
-        if len(workout_days) != 3:
-            print("Error: Exactly 3 workout days must be specified")
-            return
-            
-        generate_calendar(start_date, workout_days, workout_time, timezone, args.output)
-        print(f"Calendar generated successfully: {args.output}")
+        if args.plan:
+            save_plan(plan, args.plan)
         
     except ValueError as e:
         print(f"Error: {str(e)}")
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
\ No newline at end of file
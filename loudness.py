@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Couch to 5K Loudness
+EBU R128 (ITU-R BS.1770) loudness and true-peak measurement of speech cues, so every cue
+can be brought to the same level once instead of normalizing each 40-minute workout
+"""
+
+import math
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Gating from BS.1770-4: 400 ms blocks every 100 ms, an absolute gate at -70 LUFS and a
+# relative gate 10 LU below the loudness of the blocks that pass the absolute one
+BLOCK_SECONDS = 0.4
+STEP_SECONDS = 0.1
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+
+# True peak is the sample peak of the signal oversampled 4x (BS.1770 Annex 2), interpolated
+# with a windowed-sinc FIR of this many taps per phase
+TRUE_PEAK_OVERSAMPLING = 4
+TRUE_PEAK_TAPS = 12
+
+# Silence appended before filtering so the K-weighting filter's ringing is not wrapped
+# around by the FFT
+FILTER_TAIL_SECONDS = 0.5
+
+# (b, a) biquad coefficients of one K-weighting stage
+Biquad = Tuple[List[float], List[float]]
+
+
+def k_weighting(sample_rate: int) -> List[Biquad]:
+    """
+    K-weighting filter of BS.1770 for any sample rate
+
+    The standard gives coefficients for 48 kHz only; these are the analog prototypes
+    (a high shelf modelling the head, then a high pass) mapped to the sample rate.
+
+    Args:
+        sample_rate: Sample rate in Hz
+
+    Returns:
+        The shelf and high-pass stages as (b, a) coefficients
+    """
+    # Stage 1: high shelf, +4 dB above about 1.5 kHz
+    k = math.tan(math.pi * 1681.974450955533 / sample_rate)
+    q = 0.7071752369554196
+    vh = 10 ** (3.999843853973347 / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = (
+        [(vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0],
+        [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0],
+    )
+
+    # Stage 2: high pass at about 38 Hz
+    k = math.tan(math.pi * 38.13547087602444 / sample_rate)
+    q = 0.5003270373238773
+    a0 = 1 + k / q + k * k
+    high_pass = (
+        [1.0, -2.0, 1.0],
+        [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0],
+    )
+    return [shelf, high_pass]
+
+
+@lru_cache(maxsize=32)
+def k_weighting_response(size: int, sample_rate: int) -> np.ndarray:
+    """Complex frequency response of the K-weighting filter on the bins of a real FFT of the given size"""
+    delay = np.exp(-2j * np.pi * np.fft.rfftfreq(size))  # z^-1 on every bin
+    response = np.ones_like(delay)
+    for b, a in k_weighting(sample_rate):
+        response *= (b[0] + b[1] * delay + b[2] * delay * delay) / (a[0] + a[1] * delay + a[2] * delay * delay)
+    return response
+
+
+def k_weight(signal: np.ndarray, sample_rate: int) -> np.ndarray:
+    """
+    Apply the K-weighting filter to every channel at once
+
+    The biquads are applied as their exact frequency response on a zero-padded FFT,
+    which equals running the recursive filter for as long as its impulse response
+    lasts, without a per-sample Python loop.
+
+    Args:
+        signal: Float samples shaped (channels, frames)
+        sample_rate: Sample rate in Hz
+
+    Returns:
+        K-weighted samples with the same shape
+    """
+    frames = signal.shape[1]
+    # Power-of-two sizes keep the FFT fast and the cached responses few
+    size = 1 << (frames + int(FILTER_TAIL_SECONDS * sample_rate) - 1).bit_length()
+    spectrum = np.fft.rfft(signal, size) * k_weighting_response(size, sample_rate)
+    return np.fft.irfft(spectrum, size)[:, :frames]
+
+
+def integrated_loudness(signal: np.ndarray, sample_rate: int) -> Optional[float]:
+    """
+    Gated integrated loudness of a signal
+
+    Args:
+        signal: Float samples in [-1, 1] shaped (channels, frames)
+        sample_rate: Sample rate in Hz
+
+    Returns:
+        Loudness in LUFS, or None when the signal is silent (every block falls below the absolute gate)
+    """
+    weighted = k_weight(signal, sample_rate)
+    # Mono, left, right and centre all have a channel weight of 1.0
+    energy = np.concatenate(([0.0], np.cumsum(np.sum(weighted * weighted, axis=0))))
+
+    frames = weighted.shape[1]
+    block = int(BLOCK_SECONDS * sample_rate)
+    step = int(STEP_SECONDS * sample_rate)
+    if frames < block:
+        # Cues shorter than one gating block are measured as a single block
+        block = frames
+    if block == 0:
+        return None
+    starts = np.arange(0, frames - block + 1, step)
+    powers = (energy[starts + block] - energy[starts]) / block
+
+    with np.errstate(divide="ignore"):
+        loudness = -0.691 + 10 * np.log10(powers)
+    gated = powers[loudness > ABSOLUTE_GATE_LUFS]
+    if not len(gated):
+        return None
+    relative_gate = -0.691 + 10 * math.log10(gated.mean()) + RELATIVE_GATE_LU
+    gated = powers[(loudness > ABSOLUTE_GATE_LUFS) & (loudness > relative_gate)]
+    return -0.691 + 10 * math.log10(gated.mean())
+
+
+@lru_cache(maxsize=None)
+def interpolation_phases() -> np.ndarray:
+    """Windowed-sinc FIR phases that interpolate 1/4, 2/4 and 3/4 of the way between samples"""
+    offsets = np.arange(TRUE_PEAK_TAPS) - (TRUE_PEAK_TAPS // 2 - 1)
+    phases = []
+    for phase in range(1, TRUE_PEAK_OVERSAMPLING):
+        t = phase / TRUE_PEAK_OVERSAMPLING - offsets
+        phases.append(np.sinc(t) * (0.5 + 0.5 * np.cos(np.pi * t / (TRUE_PEAK_TAPS / 2))))
+    return np.array(phases)
+
+
+def true_peak(signal: np.ndarray) -> Optional[float]:
+    """
+    True peak of a signal, including inter-sample peaks a lossy encoder or DAC can reproduce
+
+    Args:
+        signal: Float samples in [-1, 1] shaped (channels, frames)
+
+    Returns:
+        Peak level in dBTP, or None for digital silence
+    """
+    if not signal.size:
+        return None
+    peak = float(np.abs(signal).max())
+    for channel in signal:
+        for phase in interpolation_phases():
+            peak = max(peak, float(np.abs(np.convolve(channel, phase)).max()))
+    return 20 * math.log10(peak) if peak > 0 else None
+
+
+def measure_loudness(samples: np.ndarray, sample_rate: int = 44100, channels: int = 1) -> Dict[str, Optional[float]]:
+    """
+    Measure a cue's integrated loudness and true peak
+
+    Args:
+        samples: Interleaved int16 samples in the mixer's internal format
+        sample_rate: Sample rate in Hz
+        channels: Channel count
+
+    Returns:
+        {"integrated_lufs": ..., "true_peak_dbtp": ...}; either is None for a silent cue
+    """
+    signal = samples.reshape(-1, channels).T.astype(np.float64) / 32768.0
+    return {
+        "integrated_lufs": integrated_loudness(signal, sample_rate),
+        "true_peak_dbtp": true_peak(signal),
+    }
+
+
+def normalization_gain_db(measurement: Dict[str, Optional[float]], target_lufs: float,
+                          true_peak_dbtp: float) -> float:
+    """
+    Gain that brings a measured cue to the target loudness without exceeding the true-peak ceiling
+
+    A cue too peaky to reach the target is only raised as far as its peaks allow,
+    so normalization never clips or needs a limiter.
+
+    Args:
+        measurement: Result of measure_loudness
+        target_lufs: Integrated loudness every cue should have
+        true_peak_dbtp: Highest true peak a normalized cue may reach
+
+    Returns:
+        Gain in dB (0.0 for a silent cue)
+    """
+    integrated = measurement.get("integrated_lufs")
+    if integrated is None:
+        return 0.0
+    gain = target_lufs - integrated
+    peak = measurement.get("true_peak_dbtp")
+    if peak is not None:
+        gain = min(gain, true_peak_dbtp - peak)
+    return gain
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Couch to 5K Mock TTS Server
+Local stand-in for the ElevenLabs text-to-speech endpoints with configurable latency,
+so scripts can be rendered and pipeline throughput measured without network access or spend
+"""
+
+import json
+import math
+import random
+import re
+import base64
+import argparse
+import threading
+import subprocess
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 44100
+# Roughly the pace of the ElevenLabs voices
+SECONDS_PER_CHARACTER = 0.06
+BREAK_PATTERN = re.compile(r'<break time="([\d.]+)s" />')
+
+
+def synthesize_tone(text: str) -> Tuple[np.ndarray, Dict]:
+    """
+    Render placeholder "speech" for a text: one short tone per word, silence for break markers
+
+    Args:
+        text: Request text
+
+    Returns:
+        Tuple of (int16 mono samples, alignment dictionary in the ElevenLabs format)
+    """
+    characters, starts, ends = [], [], []
+    chunks = []
+    clock = 0.0
+    position = 0
+    for match in list(BREAK_PATTERN.finditer(text)) + [None]:
+        span_end = match.start() if match else len(text)
+        for character in text[position:span_end]:
+            characters.append(character)
+            starts.append(round(clock, 3))
+            clock += SECONDS_PER_CHARACTER
+            ends.append(round(clock, 3))
+        spoken = text[position:span_end]
+        if spoken:
+            frames = int(len(spoken) * SECONDS_PER_CHARACTER * SAMPLE_RATE)
+            t = np.arange(frames) / SAMPLE_RATE
+            # Pitch changes per word so cues are audibly distinct
+            pitch = 180 + 40 * (len(spoken.split()) % 5)
+            envelope = np.abs(np.sin(math.pi * t / 0.25))
+            chunks.append((np.sin(2 * math.pi * pitch * t) * envelope * 8000).astype(np.int16))
+        if match:
+            pause = float(match.group(1))
+            # Break markers are spoken as silence, one aligned character each
+            for character in match.group(0):
+                characters.append(character)
+                starts.append(round(clock, 3))
+                ends.append(round(clock + pause / len(match.group(0)), 3))
+                clock += pause / len(match.group(0))
+            chunks.append(np.zeros(int(pause * SAMPLE_RATE), dtype=np.int16))
+            position = match.end()
+
+    samples = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int16)
+    alignment = {
+        "characters": characters,
+        "character_start_times_seconds": starts,
+        "character_end_times_seconds": ends,
+    }
+    return samples, alignment
+
+
+def encode_mp3(samples: np.ndarray, bitrate: str = "128k", converter: str = "ffmpeg") -> bytes:
+    """
+    Encode mono 44.1 kHz samples to MP3 like the real API's mp3_44100_128 output
+
+    Args:
+        samples: int16 mono samples
+        bitrate: MP3 bitrate
+        converter: ffmpeg executable
+
+    Returns:
+        MP3 bytes
+
+    Raises:
+        RuntimeError: When ffmpeg fails
+    """
+    result = subprocess.run(
+        [converter, "-hide_banner", "-loglevel", "error",
+         "-f", "s16le", "-ar", str(SAMPLE_RATE), "-ac", "1", "-i", "pipe:0",
+         "-b:a", bitrate, "-f", "mp3", "pipe:1"],
+        input=samples.tobytes(), stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not encode mock audio: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout
+
+
+class MockTTSServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, latency_ms: float = 0,
+                 jitter_ms: float = 0, quota_characters: int = 0, max_in_flight: int = 0,
+                 chunk_delay_ms: float = 0):
+        """
+        Initialize the mock server
+
+        Args:
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free port)
+            latency_ms: Delay added to every request, in milliseconds
+            jitter_ms: Random extra delay of up to this many milliseconds
+            quota_characters: Characters billed before requests fail with quota_exceeded (0 = unlimited)
+            max_in_flight: Concurrent requests before answering 429 (0 = unlimited)
+            chunk_delay_ms: Delay between chunks on the streaming endpoint, to mimic audio
+                            generated while it is sent
+        """
+        super().__init__((host, port), MockTTSHandler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.quota_characters = quota_characters
+        self.max_in_flight = max_in_flight
+        self.chunk_delay_ms = chunk_delay_ms
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.stats = {"requests": 0, "connections": 0, "characters": 0, "rate_limited": 0, "quota_rejected": 0}
+
+    @property
+    def url(self) -> str:
+        """Base URL to pass as --tts-url"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockTTSServer":
+        """Serve requests on a background thread (for benchmarks and scripted runs)"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class MockTTSHandler(BaseHTTPRequestHandler):
+    server: MockTTSServer
+    protocol_version = "HTTP/1.1"
+    # Bytes per chunk on the streaming endpoint
+    stream_chunk_size = 4096
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.stats["connections"] += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: Dict):
+        self._send(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def _send_chunked(self, body: bytes, content_type: str):
+        """Send a body with chunked transfer encoding, pausing between chunks"""
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for start in range(0, len(body), self.stream_chunk_size):
+            if start and self.server.chunk_delay_ms:
+                time.sleep(self.server.chunk_delay_ms / 1000)
+            chunk = body[start:start + self.stream_chunk_size]
+            self.wfile.write(f"{len(chunk):X}\r\n".encode("ascii") + chunk + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self):
+        if self.path == "/stats":
+            with self.server.lock:
+                self._send_json(200, dict(self.server.stats))
+        else:
+            self._send_json(404, {"detail": "Not found"})
+
+    def do_POST(self):
+        match = re.match(r"^/v1/text-to-speech/([^/?]+)(/with-timestamps|/stream)?(\?.*)?$", self.path)
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not match:
+            self._send_json(404, {"detail": "Not found"})
+            return
+
+        server = self.server
+        text = body.get("text", "")
+        with server.lock:
+            server.stats["requests"] += 1
+            if server.max_in_flight and server.in_flight >= server.max_in_flight:
+                server.stats["rate_limited"] += 1
+                rejected = (429, {"detail": {"status": "too_many_concurrent_requests",
+                                             "message": "Too many concurrent requests"}})
+            elif server.quota_characters and server.stats["characters"] + len(text) > server.quota_characters:
+                server.stats["quota_rejected"] += 1
+                rejected = (401, {"detail": {"status": "quota_exceeded",
+                                             "message": "This request exceeds your quota."}})
+            else:
+                rejected = None
+                server.in_flight += 1
+                server.stats["characters"] += len(text)
+        if rejected:
+            self._send_json(*rejected)
+            return
+
+        try:
+            time.sleep((server.latency_ms + random.uniform(0, server.jitter_ms)) / 1000)
+            samples, alignment = synthesize_tone(text)
+            audio = encode_mp3(samples)
+            if match.group(2) == "/stream":
+                self._send_chunked(audio, "audio/mpeg")
+            elif match.group(2):
+                self._send_json(200, {
+                    "audio_base64": base64.b64encode(audio).decode("ascii"),
+                    "alignment": alignment,
+                    "normalized_alignment": alignment,
+                })
+            else:
+                self._send(200, audio, "audio/mpeg")
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock of the ElevenLabs text-to-speech API")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument("--latency-ms", type=float, default=300, help="Delay added to every request (default: 300)")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="Random extra delay, up to (default: 100)")
+    parser.add_argument("--quota-characters", type=int, default=0,
+                        help="Characters billed before answering quota_exceeded (default: unlimited)")
+    parser.add_argument("--max-in-flight", type=int, default=0,
+                        help="Concurrent requests before answering 429 (default: unlimited)")
+    parser.add_argument("--chunk-delay-ms", type=float, default=0,
+                        help="Delay between chunks of streamed audio (default: 0)")
+    args = parser.parse_args()
+
+    server = MockTTSServer(args.host, args.port, args.latency_ms, args.jitter_ms,
+                           args.quota_characters, args.max_in_flight, args.chunk_delay_ms)
+    print(f"🧪 Mock TTS server listening on {server.url} (latency {args.latency_ms:.0f}ms ± {args.jitter_ms:.0f}ms)")
+    print(f"💡 Render against it with: python generate_audio.py --tts-backend mock --tts-url {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        with server.lock:
+            print(f"\n📊 {server.stats['requests']} requests over {server.stats['connections']} connections, "
+                  f"{server.stats['characters']} characters")
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Couch to 5K PCM Cue Store
+Decoded cues kept as raw 16-bit PCM and memory-mapped on reuse, so a cached cue is mixed
+without an ffmpeg decode and render processes on one host share its pages
+"""
+
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from cue_cache import atomic_write_bytes
+
+# Raw little-endian 16-bit samples, interleaved in the mixer's internal format
+PCM_DTYPE = np.dtype("<i2")
+PCM_EXTENSION = "pcm"
+
+
+class PCMCueStore:
+    def __init__(self, store_dir: str, sample_rate: int = 44100, channels: int = 1, max_size_mb: float = 2000):
+        """
+        Initialize the PCM cue store
+
+        Files have no header: each holds a cue's samples in exactly the internal
+        format, and every format gets its own subdirectory (e.g. 44100x1/) so a
+        file never has to be checked or converted before it is mapped. Like the
+        cue cache, the modification time is the last-access time for LRU eviction.
+
+        Args:
+            store_dir: Directory holding the PCM files
+            sample_rate: Sample rate of the stored cues
+            channels: Channel count of the stored cues
+            max_size_mb: Size bound in megabytes before least recently used cues are evicted
+        """
+        self.store_dir = Path(store_dir) / f"{sample_rate}x{channels}"
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.frame_bytes = PCM_DTYPE.itemsize * channels
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+
+    def path(self, key: str) -> Path:
+        """File holding a cue's samples"""
+        return self.store_dir / f"{key}.{PCM_EXTENSION}"
+
+    def contains(self, key: str) -> bool:
+        """Check whether a cue's samples are stored"""
+        try:
+            return self.path(key).stat().st_size % self.frame_bytes == 0
+        except FileNotFoundError:
+            return False
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Map a stored cue's samples
+
+        The array is a read-only view of the page cache: nothing is read until the
+        mixer touches it, and every process mapping the same cue shares its pages.
+
+        Args:
+            key: Content address from cue_cache_key
+
+        Returns:
+            int16 samples, or None if the cue is not stored
+        """
+        path = self.path(key)
+        try:
+            size = path.stat().st_size
+            if size % self.frame_bytes:
+                # Not written by this store (writes are atomic); treat it as missing
+                return None
+            # np.memmap cannot map an empty file
+            samples = np.memmap(path, dtype=PCM_DTYPE, mode="r") if size else np.zeros(0, dtype=PCM_DTYPE)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        # Touch the entry so LRU eviction sees it as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        return samples
+
+    def put(self, key: str, samples: np.ndarray):
+        """
+        Store a decoded cue and evict old entries if the store grew past its bound
+
+        Args:
+            key: Content address from cue_cache_key
+            samples: Interleaved int16 samples in the store's format
+        """
+        atomic_write_bytes(self.path(key), np.ascontiguousarray(samples, dtype=PCM_DTYPE).tobytes())
+        self.evict()
+
+    def size_bytes(self) -> int:
+        """Total size of all stored cues"""
+        return sum(entry.stat().st_size for entry in self.store_dir.glob(f"*.{PCM_EXTENSION}"))
+
+    def evict(self) -> int:
+        """
+        Remove least recently used cues until the store fits its size bound
+
+        A process that still has an evicted cue mapped keeps reading it; the file
+        is only gone for new lookups.
+
+        Returns:
+            Number of cues evicted
+        """
+        entries = []
+        total = 0
+        for entry in self.store_dir.glob(f"*.{PCM_EXTENSION}"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+            total += stat.st_size
+
+        if total <= self.max_size_bytes:
+            return 0
+
+        evicted = 0
+        for _, size, entry in sorted(entries, key=lambda x: x[0]):
+            if total <= self.max_size_bytes:
+                break
+            try:
+                entry.unlink()
+            except (FileNotFoundError, PermissionError):
+                # Windows refuses to delete a file another process has mapped
+                continue
+            total -= size
+            evicted += 1
+        return evicted
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Couch to 5K Pipeline Metrics
+Per-stage timers and counters for audio generation, reported as JSON or a Prometheus textfile
+"""
+
+import json
+import time
+import threading
+import contextlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from cue_cache import atomic_write_bytes
+
+# Stages timed during a render; the numpy backend mixes and exports separately, the
+# streaming and ffmpeg paths mix while encoding so their time is counted as export.
+# tts_first_byte is the part of streamed TTS requests spent waiting for the first chunk.
+# loudness is the one-time EBU R128 measurement of newly synthesized cues.
+STAGES = ("tts", "tts_first_byte", "rate_limit_wait", "decode", "loudness", "mix", "export")
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """
+    Summarize a list of observations
+
+    Args:
+        values: Observed values
+
+    Returns:
+        Dictionary with count, sum, mean, p50, p95 and max
+    """
+    if not values:
+        return {"count": 0, "sum": 0.0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(values)
+
+    def percentile(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+    return {
+        "count": len(ordered),
+        "sum": sum(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": percentile(0.5),
+        "p95": percentile(0.95),
+        "max": ordered[-1],
+    }
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class PipelineMetrics:
+    def __init__(self):
+        """
+        Initialize empty metrics
+
+        Stage times and counters are attributed to the run as a whole and, while
+        a script is being rendered (see script()), to that script as well. Cue
+        worker threads record into the script their generator is rendering;
+        threads rendering scripts concurrently each record into their own.
+        """
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self.current_script: Optional[str] = None
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, float] = {}
+        self.tts_latencies: List[float] = []
+        self.scripts: Dict[str, Dict] = {}
+        self.peak_rss_mb: Dict[str, float] = {}
+
+    def _script_entry(self, script_name: str) -> Dict:
+        return self.scripts.setdefault(script_name, {"seconds": 0.0, "stages": {}, "counters": {}})
+
+    def _active_script(self) -> Optional[str]:
+        return getattr(self._local, "script", None) or self.current_script
+
+    def add_time(self, stage: str, seconds: float):
+        """Record time spent in a stage"""
+        with self._lock:
+            targets = [self.stages]
+            script_name = self._active_script()
+            if script_name:
+                targets.append(self._script_entry(script_name)["stages"])
+            for stages in targets:
+                entry = stages.setdefault(stage, {"seconds": 0.0, "count": 0})
+                entry["seconds"] += seconds
+                entry["count"] += 1
+
+    @contextlib.contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """Time a block as one occurrence of a stage"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - started)
+
+    def count(self, counter: str, amount: float = 1):
+        """Increase a counter"""
+        with self._lock:
+            counters = [self.counters]
+            script_name = self._active_script()
+            if script_name:
+                counters.append(self._script_entry(script_name)["counters"])
+            for target in counters:
+                target[counter] = target.get(counter, 0) + amount
+
+    def record_tts_request(self, seconds: float, characters: int, downloaded_bytes: int):
+        """
+        Record one completed TTS request
+
+        Args:
+            seconds: Request latency
+            characters: Characters billed for the request
+            downloaded_bytes: Size of the returned audio
+        """
+        self.add_time("tts", seconds)
+        with self._lock:
+            self.tts_latencies.append(seconds)
+        self.count("tts_requests")
+        self.count("characters_billed", characters)
+        self.count("bytes_downloaded", downloaded_bytes)
+
+    @contextlib.contextmanager
+    def script(self, script_name: str) -> Iterator[Dict]:
+        """Attribute everything recorded inside the block to a script and time it"""
+        with self._lock:
+            entry = self._script_entry(script_name)
+        self._local.script = script_name
+        self.current_script = script_name
+        started = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            with self._lock:
+                entry["seconds"] += time.perf_counter() - started
+            self._local.script = None
+            self.current_script = None
+
+    def observe_peak_rss(self, peak: Dict[str, float]):
+        """Keep the highest peak RSS seen so far"""
+        with self._lock:
+            for key, value in peak.items():
+                self.peak_rss_mb[key] = max(self.peak_rss_mb.get(key, 0.0), value)
+
+    def snapshot(self) -> Dict:
+        """Raw metrics, for shipping from a render worker to the parent process"""
+        with self._lock:
+            return json.loads(json.dumps({
+                "stages": self.stages,
+                "counters": self.counters,
+                "tts_latencies": self.tts_latencies,
+                "scripts": self.scripts,
+                "peak_rss_mb": self.peak_rss_mb,
+            }))
+
+    def merge(self, snapshot: Dict):
+        """Add the metrics of a render worker to these"""
+        with self._lock:
+            for stage, entry in snapshot["stages"].items():
+                total = self.stages.setdefault(stage, {"seconds": 0.0, "count": 0})
+                total["seconds"] += entry["seconds"]
+                total["count"] += entry["count"]
+            for counter, amount in snapshot["counters"].items():
+                self.counters[counter] = self.counters.get(counter, 0) + amount
+            self.tts_latencies.extend(snapshot["tts_latencies"])
+            self.scripts.update(snapshot["scripts"])
+            for key, value in snapshot["peak_rss_mb"].items():
+                self.peak_rss_mb[key] = max(self.peak_rss_mb.get(key, 0.0), value)
+
+    def slowest_script(self) -> Optional[str]:
+        """Name of the script that took longest to render"""
+        with self._lock:
+            if not self.scripts:
+                return None
+            return max(self.scripts, key=lambda name: self.scripts[name]["seconds"])
+
+    def report(self) -> Dict:
+        """
+        Build the run report
+
+        Returns:
+            JSON-serializable dictionary of every stage, counter and script
+        """
+        slowest = self.slowest_script()
+        snapshot = self.snapshot()
+        http_requests = snapshot["counters"].get("http_requests", 0)
+        opened = snapshot["counters"].get("http_connections_opened", 0)
+        return {
+            "started_at": self.started_at.isoformat(),
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "wall_seconds": time.perf_counter() - self._started,
+            "stages": snapshot["stages"],
+            "counters": snapshot["counters"],
+            "tts_latency_seconds": summarize(snapshot["tts_latencies"]),
+            # Share of HTTP requests served on an already open keep-alive connection
+            "connection_reuse_rate": 1 - opened / http_requests if http_requests else None,
+            "peak_rss_mb": snapshot["peak_rss_mb"],
+            "slowest_script": slowest,
+            "scripts": snapshot["scripts"],
+        }
+
+    def write_json(self, path: str) -> Dict:
+        """
+        Write the run report as JSON
+
+        Args:
+            path: Destination file
+
+        Returns:
+            The report that was written
+        """
+        report = self.report()
+        _atomic_write_text(Path(path), json.dumps(report, indent=2, ensure_ascii=False))
+        return report
+
+    def write_prometheus(self, path: str):
+        """
+        Write the run metrics in the Prometheus text exposition format
+
+        The file is replaced atomically, as the node_exporter textfile collector
+        requires; give it a .prom extension inside the collector directory.
+
+        Args:
+            path: Destination .prom file
+        """
+        report = self.report()
+        lines = [
+            "# HELP c25k_stage_seconds_total Time spent in each audio pipeline stage.",
+            "# TYPE c25k_stage_seconds_total counter",
+        ]
+        for stage, entry in sorted(report["stages"].items()):
+            lines.append(f'c25k_stage_seconds_total{{stage="{_escape_label(stage)}"}} {entry["seconds"]:.6f}')
+        lines += [
+            "# HELP c25k_stage_operations_total Operations performed in each audio pipeline stage.",
+            "# TYPE c25k_stage_operations_total counter",
+        ]
+        for stage, entry in sorted(report["stages"].items()):
+            lines.append(f'c25k_stage_operations_total{{stage="{_escape_label(stage)}"}} {entry["count"]}')
+
+        for counter, value in sorted(report["counters"].items()):
+            lines += [f"# TYPE c25k_{counter}_total counter", f"c25k_{counter}_total {value}"]
+
+        latency = report["tts_latency_seconds"]
+        lines += [
+            "# HELP c25k_tts_latency_seconds Latency of TTS requests.",
+            "# TYPE c25k_tts_latency_seconds summary",
+            f'c25k_tts_latency_seconds{{quantile="0.5"}} {latency["p50"]:.6f}',
+            f'c25k_tts_latency_seconds{{quantile="0.95"}} {latency["p95"]:.6f}',
+            f"c25k_tts_latency_seconds_sum {latency['sum']:.6f}",
+            f"c25k_tts_latency_seconds_count {latency['count']}",
+            "# HELP c25k_script_render_seconds Wall-clock render time of each script in the last run.",
+            "# TYPE c25k_script_render_seconds gauge",
+        ]
+        for script_name, entry in sorted(report["scripts"].items()):
+            lines.append(f'c25k_script_render_seconds{{script="{_escape_label(script_name)}"}} {entry["seconds"]:.6f}')
+        lines += ["# TYPE c25k_peak_rss_bytes gauge"]
+        for process, megabytes in sorted(report["peak_rss_mb"].items()):
+            lines.append(f'c25k_peak_rss_bytes{{process="{process}"}} {int(megabytes * 1024 * 1024)}')
+        lines += [
+            "# TYPE c25k_run_wall_seconds gauge",
+            f"c25k_run_wall_seconds {report['wall_seconds']:.6f}",
+            "# TYPE c25k_run_finished_timestamp_seconds gauge",
+            f"c25k_run_finished_timestamp_seconds {time.time():.0f}",
+        ]
+        _atomic_write_text(Path(path), "\n".join(lines) + "\n")
+
+    def print_summary(self):
+        """Print where the run spent its time"""
+        report = self.report()
+        print(f"\n⏱️  Pipeline stages ({report['wall_seconds']:.1f}s wall clock):")
+        for stage in STAGES:
+            entry = report["stages"].get(stage)
+            if entry:
+                print(f"  {stage:<16} {entry['seconds']:>8.2f}s  ({entry['count']} operations)")
+        counters = report["counters"]
+        latency = report["tts_latency_seconds"]
+        if latency["count"]:
+            print(f"  TTS: {latency['count']} requests, p50 {latency['p50'] * 1000:.0f} ms, "
+                  f"p95 {latency['p95'] * 1000:.0f} ms, {counters.get('characters_billed', 0)} characters billed, "
+                  f"{counters.get('bytes_downloaded', 0) / (1024 * 1024):.1f} MB downloaded")
+        if counters.get("cues_mapped") or counters.get("cues_decoded"):
+            print(f"  Cues: {counters.get('cues_mapped', 0)} memory-mapped from the PCM store, "
+                  f"{counters.get('cues_decoded', 0)} decoded")
+        if report["connection_reuse_rate"] is not None:
+            print(f"  HTTP: {counters['http_requests']} requests over {counters.get('http_connections_opened', 0)} "
+                  f"connections ({report['connection_reuse_rate']:.0%} reused)")
+        if report["slowest_script"]:
+            slowest = report["slowest_script"]
+            print(f"  Slowest script: {slowest} ({report['scripts'][slowest]['seconds']:.1f}s)")
+
+
+def _atomic_write_text(path: Path, text: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_bytes(path, text.encode("utf-8"))
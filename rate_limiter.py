@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Couch to 5K Rate Limiter
+Thread-safe token bucket used to pace ElevenLabs API requests
+"""
+
+import time
+import threading
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = None):
+        """
+        Initialize the token bucket
+
+        Args:
+            rate: Tokens added per second (sustained requests per second)
+            capacity: Maximum burst size (default: one second worth of tokens, at least 1)
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be greater than zero")
+
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Block until enough tokens are available and take them
+
+        Args:
+            tokens: Number of tokens to take
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return waited
+                wait = max(self.blocked_until - now, (tokens - self.tokens) / self.rate)
+            time.sleep(wait)
+            waited += wait
+
+    def penalize(self, seconds: float):
+        """
+        Stop handing out tokens for a while, e.g. after the provider answered 429
+
+        Args:
+            seconds: How long every caller should back off
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            self.tokens = 0.0
+            self.updated_at = now
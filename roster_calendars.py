@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Couch to 5K Roster Calendars
+Bulk calendar generation for a whole cohort from a CSV or JSONL roster, using pre-rendered VEVENT templates
+"""
+
+import os
+import csv
+import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from zoneinfo import ZoneInfo
+
+from icalendar import Event
+
+from generate_calendar import (WORKOUTS, new_calendar, parse_time_and_timezone, parse_workout_days,
+                               workout_summary, workout_uid)
+from schedule_engine import WeeklyPattern
+
+# Roster rows handed to a worker process at a time
+DEFAULT_CHUNK_SIZE = 2000
+
+# Chunks queued per worker process: enough to keep every worker busy without
+# reading the whole roster ahead of them
+CHUNKS_IN_FLIGHT_PER_JOB = 2
+
+# Placeholder start time rendered into the templates and cut out again
+_SENTINEL = datetime(2000, 1, 1, tzinfo=ZoneInfo("UTC"))
+
+
+class CalendarTemplate:
+    def __init__(self):
+        """
+        Pre-render the calendar once so each runner only costs string joins
+
+        Every workout's VEVENT is serialized by icalendar with a placeholder start
+        and end, then split around its DTSTART and DTEND lines; a calendar is the
+        header, each event with its two date lines filled in, and the footer.
+        The output is byte-for-byte what generate_calendar() writes.
+
+        Schedules only depend on the start weekday and the workout days, so the
+        day offsets of each combination are worked out once, and formatted dates
+        and times of day are cached as they come up.
+        """
+        calendar = new_calendar().to_ical()
+        footer_at = calendar.index(b"END:VCALENDAR")
+        self.header = calendar[:footer_at]
+        self.footer = calendar[footer_at:]
+        self.durations = [timedelta(minutes=workout["duration"]) for workout in WORKOUTS]
+        self.events = [self._event_template(i) for i in range(len(WORKOUTS))]
+        self._datetime_lines: Dict[str, Tuple[bytes, bytes, bytes]] = {}
+        self._day_offsets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+        self._dates: Dict[int, bytes] = {}
+        self._clocks: Dict[int, bytes] = {}
+
+    def _event_template(self, workout_index: int) -> Tuple[bytes, bytes, bytes]:
+        """Split a serialized event into the bytes before DTSTART, between DTSTART and DTEND, and after DTEND"""
+        workout = WORKOUTS[workout_index]
+        event = Event()
+        event.add('summary', workout_summary(workout_index))
+        event.add('description', workout['description'])
+        event.add('dtstart', _SENTINEL)
+        event.add('dtend', _SENTINEL + self.durations[workout_index])
+        event.add('status', 'CONFIRMED')
+        event['uid'] = workout_uid(workout_index)
+
+        lines = event.to_ical().split(b"\r\n")
+        start_line = next(i for i, line in enumerate(lines) if line.startswith(b"DTSTART"))
+        end_line = next(i for i, line in enumerate(lines) if line.startswith(b"DTEND"))
+        if end_line < start_line:
+            raise RuntimeError("icalendar wrote DTEND before DTSTART; templates need updating")
+
+        def join(part: List[bytes]) -> bytes:
+            return b"".join(line + b"\r\n" for line in part)
+
+        tail = b"\r\n".join(lines[end_line + 1:])
+        return join(lines[:start_line]), join(lines[start_line + 1:end_line]), tail
+
+    def datetime_lines(self, timezone: ZoneInfo) -> Tuple[bytes, bytes, bytes]:
+        """
+        Property prefixes and value suffix icalendar uses for datetimes in a timezone
+
+        Returns:
+            Tuple of (b"DTSTART;TZID=...:", b"DTEND;TZID=...:", suffix), where the
+            suffix is b"Z" for UTC and empty otherwise
+        """
+        cached = self._datetime_lines.get(timezone.key)
+        if cached:
+            return cached
+
+        event = Event()
+        event.add('dtstart', _SENTINEL.replace(tzinfo=timezone))
+        line = next(line for line in event.to_ical().split(b"\r\n") if line.startswith(b"DTSTART"))
+        prefix, value = line.rsplit(b":", 1)
+        suffix = value[len(b"20000101T000000"):]
+        lines = (prefix + b":", b"DTEND" + prefix[len(b"DTSTART"):] + b":", suffix)
+        self._datetime_lines[timezone.key] = lines
+        return lines
+
+    def day_offsets(self, start_weekday: int, workout_days: List[int]) -> List[int]:
+        """Days from the start date to each workout, for a start weekday and set of workout days"""
+        key = (start_weekday, tuple(sorted(set(workout_days))))
+        offsets = self._day_offsets.get(key)
+        if offsets is None:
+            offsets = WeeklyPattern(workout_days).offsets(start_weekday, len(WORKOUTS))
+            self._day_offsets[key] = offsets
+        return offsets
+
+    def _date(self, ordinal: int) -> bytes:
+        stamp = self._dates.get(ordinal)
+        if stamp is None:
+            day = datetime.fromordinal(ordinal)
+            stamp = self._dates[ordinal] = f"{day.year:04d}{day.month:02d}{day.day:02d}".encode("ascii")
+        return stamp
+
+    def _clock(self, minute_of_day: int) -> bytes:
+        stamp = self._clocks.get(minute_of_day)
+        if stamp is None:
+            hour, minute = divmod(minute_of_day, 60)
+            stamp = self._clocks[minute_of_day] = f"T{hour:02d}{minute:02d}00".encode("ascii")
+        return stamp
+
+    def render(self, start_date: datetime, workout_days: List[int], workout_time: time,
+               timezone: ZoneInfo) -> bytes:
+        """
+        Render one runner's calendar
+
+        Args:
+            start_date: Program start date
+            workout_days: Weekday numbers (0=Monday, 6=Sunday)
+            workout_time: Local workout start time
+            timezone: Timezone of the workout time
+
+        Returns:
+            ICS file contents
+        """
+        start_prefix, end_prefix, suffix = self.datetime_lines(timezone)
+        line_end = suffix + b"\r\n"
+        first_day = start_date.toordinal()
+        start_minute = workout_time.hour * 60 + workout_time.minute
+        start_clock = self._clock(start_minute)
+        parts = [self.header]
+        for workout_index, offset in enumerate(self.day_offsets(start_date.weekday(), workout_days)):
+            before, between, after = self.events[workout_index]
+            day = first_day + offset
+            # A late workout can end after midnight
+            end_days, end_minute = divmod(start_minute + WORKOUTS[workout_index]["duration"], 24 * 60)
+            parts += [before, start_prefix, self._date(day), start_clock, line_end,
+                      between, end_prefix, self._date(day + end_days), self._clock(end_minute), line_end, after]
+        parts.append(self.footer)
+        return b"".join(parts)
+
+
+_template: Optional[CalendarTemplate] = None
+
+
+def get_template() -> CalendarTemplate:
+    """Calendar template of this process, built on first use"""
+    global _template
+    if _template is None:
+        _template = CalendarTemplate()
+    return _template
+
+
+@lru_cache(maxsize=None)
+def _parse_time(time_str: str) -> Tuple[time, ZoneInfo]:
+    return parse_time_and_timezone(time_str)
+
+
+@lru_cache(maxsize=None)
+def _parse_days(days_str: str) -> Tuple[int, ...]:
+    return tuple(parse_workout_days(days_str))
+
+
+def parse_roster_entry(entry: Dict) -> Tuple[datetime, List[int], time, ZoneInfo, str]:
+    """
+    Validate one roster entry
+
+    Args:
+        entry: Roster fields: start_date (YYYY-MM-DD), workout_days ("Mon,Wed,Fri" or a
+               list), workout_time ("7:00 am", with the timezone appended if there is
+               no timezone field), timezone (e.g. "CDT") and output (ICS path)
+
+    Returns:
+        Tuple of (start date, workout days, workout time, timezone, output path)
+
+    Raises:
+        ValueError: When the entry is not an object, or a field is missing or invalid
+    """
+    if not isinstance(entry, dict):
+        raise ValueError(f"Expected an object of roster fields, got {type(entry).__name__}")
+    for field in ("start_date", "workout_days", "workout_time", "output"):
+        if not entry.get(field):
+            raise ValueError(f"Missing {field}")
+
+    start_date = datetime.strptime(str(entry["start_date"]).strip(), '%Y-%m-%d')
+
+    days = entry["workout_days"]
+    if isinstance(days, list):
+        if not all(isinstance(day, str) for day in days):
+            raise ValueError(f"workout_days must be day names, got {days!r}")
+        days = ",".join(days)
+    elif not isinstance(days, str):
+        raise ValueError(f"workout_days must be a string or a list of day names, got {days!r}")
+    workout_days = list(_parse_days(days))
+
+    time_str = str(entry["workout_time"]).strip()
+    if entry.get("timezone"):
+        time_str = f"{time_str} {str(entry['timezone']).strip()}"
+    workout_time, timezone = _parse_time(time_str)
+
+    return start_date, workout_days, workout_time, timezone, str(entry["output"]).strip()
+
+
+def read_roster(roster_file: str) -> Iterator[Tuple[int, Dict]]:
+    """
+    Read a CSV (with a header row) or JSONL roster
+
+    Args:
+        roster_file: Roster path; .jsonl/.ndjson files are read as JSON lines, anything else as CSV
+
+    Yields:
+        (line number, entry) tuples
+    """
+    with open(roster_file, "r", encoding="utf-8", newline="") as f:
+        if Path(roster_file).suffix.lower() in (".jsonl", ".ndjson"):
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_number, {"_error": f"Invalid JSON: {e}"}
+        else:
+            reader = csv.DictReader(f)
+            for entry in reader:
+                yield reader.line_num, entry
+
+
+def _render_chunk(rows: List[Tuple[int, Dict]], output_dir: str) -> Tuple[int, List[Tuple[int, str]]]:
+    """
+    Write the calendars of a slice of the roster (runs in a worker process)
+
+    Returns:
+        Tuple of (calendars written, (line number, error) for every rejected entry)
+    """
+    template = get_template()
+    written = 0
+    errors = []
+    created_dirs = set()
+    for line_number, entry in rows:
+        try:
+            if "_error" in entry:
+                raise ValueError(entry["_error"])
+            start_date, workout_days, workout_time, timezone, output = parse_roster_entry(entry)
+            output_file = os.path.join(output_dir, output)
+            parent = os.path.dirname(output_file)
+            if parent and parent not in created_dirs:
+                os.makedirs(parent, exist_ok=True)
+                created_dirs.add(parent)
+            with open(output_file, "wb") as f:
+                f.write(template.render(start_date, workout_days, workout_time, timezone))
+            written += 1
+        except (ValueError, OSError) as e:
+            errors.append((line_number, str(e)))
+    return written, errors
+
+
+def _chunks(rows: Iterator[Tuple[int, Dict]], size: int) -> Iterator[List[Tuple[int, Dict]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def generate_roster_calendars(roster_file: str, output_dir: str = ".", jobs: int = 1,
+                              chunk_size: int = DEFAULT_CHUNK_SIZE) -> Tuple[int, List[Tuple[int, str]]]:
+    """
+    Generate a calendar for every runner in a roster
+
+    Args:
+        roster_file: CSV or JSONL roster (see parse_roster_entry for the fields)
+        output_dir: Directory that relative output paths are resolved against
+        jobs: Worker processes; 1 renders in this process
+        chunk_size: Roster rows per worker task
+
+    Returns:
+        Tuple of (calendars written, (line number, error) for every rejected entry)
+    """
+    written = 0
+    errors: List[Tuple[int, str]] = []
+    chunks = _chunks(read_roster(roster_file), max(1, chunk_size))
+
+    if jobs <= 1:
+        for chunk in chunks:
+            count, chunk_errors = _render_chunk(chunk, output_dir)
+            written += count
+            errors += chunk_errors
+        return written, errors
+
+    # Results are collected in submission order, so errors stay in roster order
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for chunk in chunks:
+            pending.append(executor.submit(_render_chunk, chunk, output_dir))
+            if len(pending) < jobs * CHUNKS_IN_FLIGHT_PER_JOB:
+                continue
+            count, chunk_errors = pending.popleft().result()
+            written += count
+            errors += chunk_errors
+        for future in pending:
+            count, chunk_errors = future.result()
+            written += count
+            errors += chunk_errors
+    return written, errors
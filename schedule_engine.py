@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Couch to 5K Schedule Engine
+Arithmetic workout dates for any weekly pattern, and rescheduling of missed workouts
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional
+
+
+class WeeklyPattern:
+    def __init__(self, workout_days: List[int]):
+        """
+        Initialize a weekly workout pattern
+
+        The days from any weekday to the next workout day are tabulated once, so
+        the date of the k-th workout is a constant-time calculation rather than a
+        walk through the calendar.
+
+        Args:
+            workout_days: Weekday numbers (0=Monday, 6=Sunday), in any order
+
+        Raises:
+            ValueError: When no days or invalid weekday numbers are given
+        """
+        days = sorted(set(workout_days))
+        if not days:
+            raise ValueError("At least one workout day must be specified")
+        if days[0] < 0 or days[-1] > 6:
+            raise ValueError(f"Invalid weekday numbers: {workout_days} (0=Monday, 6=Sunday)")
+        self.days = days
+
+        # For each weekday: days until the next workout day (0 on a workout day) and that day's position
+        self._lead: List[int] = []
+        self._position: List[int] = []
+        for weekday in range(7):
+            position = next((i for i, day in enumerate(days) if day >= weekday), 0)
+            self._lead.append((days[position] - weekday) % 7)
+            self._position.append(position)
+
+    def offset(self, start_weekday: int, k: int) -> int:
+        """
+        Days from a start date to its k-th workout (counting from 0)
+
+        Args:
+            start_weekday: Weekday of the start date (0=Monday)
+            k: Workout number, from 0
+
+        Returns:
+            Day offset; the first workout is on the start date if it is a workout day
+        """
+        position = self._position[start_weekday]
+        weeks, index = divmod(position + k, len(self.days))
+        return self._lead[start_weekday] + weeks * 7 + self.days[index] - self.days[position]
+
+    def offsets(self, start_weekday: int, count: int) -> List[int]:
+        """Day offsets of the first count workouts from a start date on the given weekday"""
+        return [self.offset(start_weekday, k) for k in range(count)]
+
+    def next_workout_day(self, day: date) -> date:
+        """The first workout day on or after a date"""
+        return day + timedelta(days=self._lead[day.weekday()])
+
+
+class WorkoutPlan:
+    def __init__(self, workout_days: List[int], workout_time: time, starts: List[datetime],
+                 sequences: Optional[List[int]] = None, timezone: Optional[str] = None):
+        """
+        Initialize a runner's plan
+
+        Args:
+            workout_days: Weekday numbers of the runner's pattern
+            workout_time: Local workout start time
+            starts: Local start time of every workout
+            sequences: iCalendar SEQUENCE of every workout event (all 0 by default)
+            timezone: Name of the timezone the start times are in
+        """
+        self.pattern = WeeklyPattern(workout_days)
+        self.workout_time = workout_time
+        self.starts = list(starts)
+        self.sequences = list(sequences) if sequences is not None else [0] * len(starts)
+        self.timezone = timezone
+
+    @classmethod
+    def create(cls, start_date: datetime, workout_days: List[int], workout_time: time, count: int,
+               timezone: Optional[str] = None) -> "WorkoutPlan":
+        """
+        Schedule count workouts, one per workout day, starting on or after start_date
+
+        Args:
+            start_date: Program start date
+            workout_days: Weekday numbers (0=Monday, 6=Sunday)
+            workout_time: Local workout start time
+            count: Number of workouts in the program
+            timezone: Name of the timezone of the workout time
+
+        Returns:
+            New plan with every SEQUENCE at 0
+        """
+        pattern = WeeklyPattern(workout_days)
+        first = datetime.combine(start_date.date() if isinstance(start_date, datetime) else start_date,
+                                 workout_time.replace(second=0, microsecond=0))
+        weekday = first.weekday()
+        starts = [first + timedelta(days=pattern.offset(weekday, k)) for k in range(count)]
+        return cls(pattern.days, workout_time, starts, timezone=timezone)
+
+    def reschedule(self, missed_index: int, resume_date: Optional[date] = None) -> List[int]:
+        """
+        Move a missed workout and everything after it to later workout days
+
+        Workouts before the missed one keep their dates. The missed workout goes
+        to the first workout day on or after resume_date, the rest of the program
+        follows the weekly pattern from there, and every event whose date changed
+        gets its SEQUENCE bumped so calendar apps accept the update.
+
+        Args:
+            missed_index: Index of the missed workout (0 = Week 1 Day 1)
+            resume_date: Earliest day to pick up again (default: the day after the missed workout)
+
+        Returns:
+            Indices of the workouts whose dates changed
+
+        Raises:
+            ValueError: When the index is out of range or resume_date is not after the previous workout
+        """
+        if not 0 <= missed_index < len(self.starts):
+            raise ValueError(f"Workout {missed_index + 1} is not in the plan (1-{len(self.starts)})")
+        if resume_date is None:
+            resume_date = self.starts[missed_index].date() + timedelta(days=1)
+        if missed_index and resume_date <= self.starts[missed_index - 1].date():
+            raise ValueError(f"Cannot resume on {resume_date}: workout {missed_index} is scheduled for "
+                             f"{self.starts[missed_index - 1].date()}")
+
+        first = datetime.combine(self.pattern.next_workout_day(resume_date),
+                                 self.workout_time.replace(second=0, microsecond=0))
+        weekday = first.weekday()
+        changed = []
+        for k, index in enumerate(range(missed_index, len(self.starts))):
+            start = first + timedelta(days=self.pattern.offset(weekday, k))
+            if start != self.starts[index]:
+                self.starts[index] = start
+                self.sequences[index] += 1
+                changed.append(index)
+        return changed
+
+    def to_dict(self) -> Dict:
+        """JSON-serializable state of the plan"""
+        return {
+            "workout_days": self.pattern.days,
+            "workout_time": self.workout_time.strftime("%H:%M"),
+            "timezone": self.timezone,
+            "starts": [start.isoformat(timespec="minutes") for start in self.starts],
+            "sequences": self.sequences,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "WorkoutPlan":
+        """Restore a plan saved with to_dict()"""
+        return cls(
+            data["workout_days"],
+            time.fromisoformat(data["workout_time"]),
+            [datetime.fromisoformat(start) for start in data["starts"]],
+            data["sequences"],
+            data.get("timezone"),
+        )
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Couch to 5K Script Index
+One-pass streaming script parser and a compiled cue index keyed by script content hash
+"""
+
+import os
+import re
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from cue_cache import atomic_write_bytes
+
+# Bump when the parser's output changes so compiled entries are rebuilt
+PARSER_VERSION = 2
+
+# A cue opens with a timestamp like "5:00 - " followed by a double-quoted text that may span lines
+CUE_START = re.compile(r'(\d{1,2}):(\d{2})\s*-\s*"')
+
+# The start of a cue whose dash or opening quote is on a later line ("5:00 -" at the end of a line)
+CUE_START_PENDING = re.compile(r'(\d{1,2}):(\d{2})\s*(?:-\s*)?\Z')
+
+# The original whole-file parser; iter_script must find exactly the cues it finds
+REFERENCE_CUE_PATTERN = re.compile(r'(\d{1,2}):(\d{2})\s*-\s*"([^"]+)"')
+
+# Header duration patterns, in order of preference
+DURATION_PATTERNS = [
+    re.compile(r'Total Duration:\s*(\d+)\s*minutes', re.IGNORECASE),
+    re.compile(r'Duration:\s*(\d+)\s*minutes', re.IGNORECASE),
+    re.compile(r'(\d+)\s*minutes\s*total', re.IGNORECASE),
+]
+
+# Used when a script states no duration: last cue plus this much, or the default below without cues
+DURATION_TAIL_SECONDS = 300
+DEFAULT_DURATION_SECONDS = 2400
+
+
+def clean_cue_text(text: str) -> str:
+    """Collapse a cue spread over several lines into one line"""
+    return text.strip().replace('\n', ' ').replace('  ', ' ')
+
+
+def parse_script_reference(content: str) -> List[Tuple[int, str]]:
+    """
+    Cues of a whole script found by the original single-regex parser
+
+    Kept as the reference that the streaming parser is checked against (see
+    check_parser_parity in benchmarks.py); not used for rendering.
+
+    Args:
+        content: Full script text
+
+    Returns:
+        (timestamp_seconds, text) tuples sorted by timestamp
+    """
+    cues = [(int(minutes) * 60 + int(seconds), clean_cue_text(text))
+            for minutes, seconds, text in REFERENCE_CUE_PATTERN.findall(content)]
+    return sorted(cues, key=lambda cue: cue[0])
+
+
+def iter_script(lines: Iterable[str], metadata: Dict) -> Iterator[Tuple[int, str]]:
+    """
+    Stream cues out of script lines in a single pass
+
+    Header details are collected into metadata as they are read: "title" (the
+    first non-empty line) and "duration_matches" (the first match of each
+    duration pattern that can still matter, resolved by resolve_duration).
+
+    Args:
+        lines: Script lines, e.g. an open file
+        metadata: Dictionary that receives header details
+
+    Yields:
+        (timestamp_seconds, text) tuples in file order
+    """
+    metadata.setdefault("title", None)
+    duration_matches: List[Optional[int]] = metadata.setdefault("duration_matches", [None] * len(DURATION_PATTERNS))
+
+    timestamp = None
+    parts: List[str] = []
+    # Unfinished cue start carried over from the previous line
+    carry = ""
+    for line in lines:
+        if metadata["title"] is None and line.strip():
+            metadata["title"] = line.strip()
+        # Once a pattern matched, only patterns preferred over it can still change the result
+        for i, pattern in enumerate(DURATION_PATTERNS):
+            if duration_matches[i] is not None:
+                break
+            match = pattern.search(line)
+            if match:
+                duration_matches[i] = int(match.group(1)) * 60
+                break
+
+        if carry:
+            line = carry + line
+            carry = ""
+        position = 0
+        while position <= len(line):
+            if timestamp is None:
+                match = CUE_START.search(line, position)
+                if not match:
+                    pending = CUE_START_PENDING.search(line, position)
+                    if pending:
+                        carry = line[pending.start():]
+                    break
+                timestamp = int(match.group(1)) * 60 + int(match.group(2))
+                parts = []
+                position = match.end()
+            else:
+                close = line.find('"', position)
+                if close < 0:
+                    parts.append(line[position:])
+                    break
+                parts.append(line[position:close])
+                position = close + 1
+                text = "".join(parts)
+                if text:
+                    yield timestamp, clean_cue_text(text)
+                timestamp = None
+
+
+def resolve_duration(metadata: Dict, cues: List[Tuple[int, str]]) -> int:
+    """
+    Workout duration in seconds from the header, falling back to the last cue
+
+    Args:
+        metadata: Header details collected by iter_script
+        cues: Cues of the script, sorted by timestamp
+
+    Returns:
+        Duration in seconds
+    """
+    for duration in metadata.get("duration_matches", []):
+        if duration is not None:
+            return duration
+    if cues:
+        return int(cues[-1][0]) + DURATION_TAIL_SECONDS
+    return DEFAULT_DURATION_SECONDS
+
+
+def parse_script_lines(lines: Iterable[str]) -> Tuple[List[Tuple[int, str]], int, Dict]:
+    """
+    Parse a whole script in one pass
+
+    Args:
+        lines: Script lines
+
+    Returns:
+        Tuple of (cues sorted by timestamp, duration in seconds, header metadata)
+    """
+    metadata: Dict = {}
+    cues = sorted(iter_script(lines, metadata), key=lambda cue: cue[0])
+    duration = resolve_duration(metadata, cues)
+    return cues, duration, {"title": metadata.get("title")}
+
+
+class ScriptIndex:
+    def __init__(self, index_file: str):
+        """
+        Initialize the compiled cue index
+
+        Parsed scripts are stored by the SHA-256 of their contents, so unchanged,
+        renamed or duplicated scripts are never parsed twice. A path table maps
+        each file's size and modification time to its hash, so scripts that have
+        not been touched since they were compiled are not even read.
+
+        Args:
+            index_file: JSON file holding the index
+        """
+        self.index_file = Path(index_file)
+        self.files: Dict[str, Dict] = {}
+        self.scripts: Dict[str, Dict] = {}
+        self.dirty = False
+        self.stats = {"hits": 0, "parsed": 0}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if data.get("parser_version") != PARSER_VERSION:
+            return
+        self.files = data.get("files", {})
+        self.scripts = data.get("scripts", {})
+
+    def load(self, script_file: str) -> Tuple[List[Tuple[int, str]], int]:
+        """
+        Get the cues and duration of a script, parsing it only if it changed
+
+        Args:
+            script_file: Path to the script file
+
+        Returns:
+            Tuple of (cues sorted by timestamp, duration in seconds)
+        """
+        entry = self.lookup(script_file)
+        return [(timestamp, text) for timestamp, text in entry["cues"]], entry["duration"]
+
+    def lookup(self, script_file: str) -> Dict:
+        """
+        Get the compiled entry of a script ({"cues", "duration", "title"})
+
+        Args:
+            script_file: Path to the script file
+
+        Returns:
+            Compiled entry
+        """
+        path = os.path.abspath(script_file)
+        stat = os.stat(path)
+        known = self.files.get(path)
+        if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            entry = self.scripts.get(known["hash"])
+            if entry is not None:
+                self.stats["hits"] += 1
+                return entry
+
+        with open(path, "rb") as f:
+            content = f.read()
+        script_hash = hashlib.sha256(content).hexdigest()
+        self.files[path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": script_hash}
+        self.dirty = True
+
+        entry = self.scripts.get(script_hash)
+        if entry is not None:
+            self.stats["hits"] += 1
+            return entry
+
+        # Universal newlines, as when the file is opened in text mode
+        text = content.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+        cues, duration, header = parse_script_lines(text.splitlines(keepends=True))
+        entry = {"cues": cues, "duration": duration, "title": header["title"]}
+        self.scripts[script_hash] = entry
+        self.stats["parsed"] += 1
+        return entry
+
+    def compile(self, script_files: Iterable[str]) -> int:
+        """
+        Bring the index up to date for a set of scripts and save it
+
+        Args:
+            script_files: Script files to index
+
+        Returns:
+            Number of scripts that had to be parsed
+        """
+        parsed_before = self.stats["parsed"]
+        for script_file in script_files:
+            self.lookup(str(script_file))
+        self.save()
+        return self.stats["parsed"] - parsed_before
+
+    def prune(self):
+        """Forget files that no longer exist and scripts no file refers to"""
+        self.files = {path: known for path, known in self.files.items() if os.path.exists(path)}
+        referenced = {known["hash"] for known in self.files.values()}
+        removed = [script_hash for script_hash in self.scripts if script_hash not in referenced]
+        for script_hash in removed:
+            del self.scripts[script_hash]
+        if removed:
+            self.dirty = True
+
+    def save(self):
+        """Write the index if anything changed"""
+        if not self.dirty:
+            return
+        self.prune()
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        index = {"parser_version": PARSER_VERSION, "files": self.files, "scripts": self.scripts}
+        atomic_write_bytes(self.index_file, json.dumps(index, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        self.dirty = False
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Couch to 5K Timeline Mixer
+Single-pass PCM mixer that places speech cues on a workout timeline
+"""
+
+import subprocess
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+from pydub import AudioSegment
+
+from export_ladder import encode_pcm
+
+INT16_MIN = -32768
+INT16_MAX = 32767
+# Frames of music bed rendered per vectorized step, so long timelines never need full-length float arrays
+MUSIC_BLOCK_FRAMES = 1 << 18
+
+
+class MusicBed:
+    def __init__(self, track: np.ndarray, sample_rate: int = 44100, channels: int = 1, gain_db: float = -18.0,
+                 duck_db: float = -12.0, attack_ms: int = 200, release_ms: int = 600,
+                 crossfade_ms: int = 3000, fade_ms: int = 2000):
+        """
+        Initialize a background music bed that ducks under speech
+
+        The track is looped over the whole timeline with a crossfade at each seam;
+        the loop is prepared once, so any stretch of the bed is a single gather.
+        Ducking is a gain envelope at millisecond resolution computed from the cue
+        placements with whole-array operations: the bed starts dipping attack_ms
+        before each cue (cue positions are known, so the first word is already
+        clear), stays down while speech plays and recovers over release_ms.
+
+        Args:
+            track: Interleaved int16 samples of the music in the timeline's format
+            sample_rate: Sample rate of the track and timeline
+            channels: Channel count of the track and timeline
+            gain_db: Level of the bed while nobody is speaking
+            duck_db: Additional attenuation under speech (negative)
+            attack_ms: How long the bed takes to duck before a cue
+            release_ms: How long the bed takes to come back after a cue
+            crossfade_ms: Overlap between the end of the track and its next repeat
+            fade_ms: Fade-in at the start and fade-out at the end of the timeline
+
+        Raises:
+            ValueError: When the track is empty
+        """
+        frames = np.asarray(track, dtype=np.int16).reshape(-1, channels).astype(np.float32)
+        if not len(frames):
+            raise ValueError("The music track is empty")
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.gain_db = gain_db
+        self.duck_db = duck_db
+        self.attack_ms = max(0, int(attack_ms))
+        self.release_ms = max(0, int(release_ms))
+        self.fade_ms = max(0, int(fade_ms))
+
+        # Each repeat after the first starts with the previous repeat's tail crossfaded into the head
+        crossfade = min(crossfade_ms * sample_rate // 1000, len(frames) // 2)
+        period = len(frames) - crossfade
+        loop = frames[:period].copy()
+        if crossfade:
+            fade_in = np.linspace(0.0, 1.0, crossfade, dtype=np.float32)[:, None]
+            loop[:crossfade] = frames[:crossfade] * fade_in + frames[period:] * (1.0 - fade_in)
+        self._loop = loop
+        self._intro = frames[:crossfade]
+
+    def frames(self, start_frame: int, count: int) -> np.ndarray:
+        """
+        A stretch of the looped track
+
+        Returns:
+            float32 array of shape (count, channels)
+        """
+        # Contiguous copies of the loop rather than a per-frame gather
+        block = np.empty((count, self.channels), dtype=np.float32)
+        filled = 0
+        while filled < count:
+            position = (start_frame + filled) % len(self._loop)
+            take = min(len(self._loop) - position, count - filled)
+            block[filled:filled + take] = self._loop[position:position + take]
+            filled += take
+        intro = len(self._intro) - start_frame
+        if intro > 0:
+            # The very first repeat has nothing to crossfade from
+            block[:intro] = self._intro[start_frame:start_frame + min(intro, count)]
+        return block
+
+    def gain_envelope(self, speech_spans_ms: List[Tuple[int, int]], duration_ms: int) -> np.ndarray:
+        """
+        Linear gain of the bed for every millisecond of the timeline
+
+        Args:
+            speech_spans_ms: (start, end) of every cue in milliseconds
+            duration_ms: Timeline length in milliseconds
+
+        Returns:
+            float32 array of duration_ms + 1 gains
+        """
+        length = duration_ms + 1
+        # Speech mask from +1/-1 edges, so overlapping cues cost nothing extra
+        edges = np.zeros(length + 1, dtype=np.int32)
+        for start, end in speech_spans_ms:
+            start = min(max(start, 0), length)
+            end = min(max(end, start), length)
+            edges[start] += 1
+            edges[end] -= 1
+        speaking = np.cumsum(edges[:length]) > 0
+
+        positions = np.arange(length)
+        ducked = speaking.astype(np.float32)
+        if speaking.any():
+            # Distance to the next speech ahead and since the last speech behind, by running min/max
+            far = 2 * length
+            next_speech = np.minimum.accumulate(np.where(speaking, positions, far)[::-1])[::-1]
+            last_speech = np.maximum.accumulate(np.where(speaking, positions, -far))
+            if self.attack_ms:
+                np.maximum(ducked, np.clip(1.0 - (next_speech - positions) / self.attack_ms, 0.0, 1.0), out=ducked)
+            if self.release_ms:
+                np.maximum(ducked, np.clip(1.0 - (positions - last_speech) / self.release_ms, 0.0, 1.0), out=ducked)
+
+        gain = np.power(10.0, (self.gain_db + ducked * self.duck_db) / 20.0).astype(np.float32)
+        if self.fade_ms:
+            fade = min(self.fade_ms, length)
+            ramp = np.linspace(0.0, 1.0, fade, dtype=np.float32)
+            gain[:fade] *= ramp
+            gain[length - fade:] *= ramp[::-1]
+        return gain
+
+
+class TimelineMixer:
+    def __init__(self, duration_ms: int, sample_rate: int = 44100, channels: int = 1):
+        """
+        Initialize the mixer with a silent timeline
+
+        Cues are recorded as placements and mixed in a single pass, either into one
+        preallocated 16-bit array (render) or into fixed-size chunks that are
+        handed to the encoder as they are ready (iter_chunks / export_stream).
+        Mixing cost is proportional to the amount of speech, not to the number
+        of cues times the workout length.
+
+        Args:
+            duration_ms: Timeline length in milliseconds
+            sample_rate: Sample rate of the timeline in Hz
+            channels: Number of interleaved channels
+        """
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frame_count = int(duration_ms * sample_rate // 1000)
+        self.sample_count = self.frame_count * channels
+        # (start sample index, int16 samples)
+        self.placements: List[Tuple[int, np.ndarray, float]] = []
+        self.clipped_samples = 0
+        self.music: Optional[MusicBed] = None
+        self._music_gain: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        """Timeline length in milliseconds, like AudioSegment"""
+        return self.frame_count * 1000 // self.sample_rate
+
+    def add(self, cue_samples: np.ndarray, position_ms: int, gain_db: float = 0.0) -> bool:
+        """
+        Place interleaved 16-bit samples on the timeline
+
+        The samples are only referenced, not copied, so a memory-mapped cue is read
+        straight into the mix.
+
+        Args:
+            cue_samples: int16 samples in the timeline's rate and channel layout
+            position_ms: Where the cue starts, in milliseconds
+            gain_db: Gain applied to the cue as it is mixed (e.g. its loudness normalization)
+
+        Returns:
+            True if the cue was placed, False if it starts past the end of the timeline
+        """
+        start_frame = position_ms * self.sample_rate // 1000
+        if start_frame >= self.frame_count or position_ms < 0:
+            return False
+
+        start = start_frame * self.channels
+        cue_samples = cue_samples[:self.sample_count - start]
+        self.placements.append((start, cue_samples, 10 ** (gain_db / 20)))
+        self._music_gain = None
+        return True
+
+    def set_music_bed(self, music: Optional[MusicBed]):
+        """Play a music bed under the whole timeline, ducked under every cue (None removes it)"""
+        self.music = music
+        self._music_gain = None
+
+    def _music_envelope(self) -> np.ndarray:
+        """Ducking envelope of the music bed, worked out once for the current placements"""
+        if self._music_gain is None:
+            samples_per_ms = self.sample_rate * self.channels / 1000
+            spans = [(int(start // samples_per_ms), int(-(-(start + len(cue_samples)) // samples_per_ms)))
+                     for start, cue_samples, _ in self.placements]
+            self._music_gain = self.music.gain_envelope(spans, len(self))
+        return self._music_gain
+
+    def _add_music(self, buffer: np.ndarray, buffer_start: int):
+        """Add the ducked music bed to a buffer, a block at a time"""
+        gain = self._music_envelope()
+        frames = buffer.reshape(-1, self.channels)
+        first_frame = buffer_start // self.channels
+        for offset in range(0, len(frames), MUSIC_BLOCK_FRAMES):
+            region = frames[offset:offset + MUSIC_BLOCK_FRAMES]
+            start_frame = first_frame + offset
+            # Each millisecond's gain held over its frames; consecutive steps are far below audible
+            end_frame = start_frame + len(region)
+            first_ms = start_frame * 1000 // self.sample_rate
+            last_ms = (end_frame - 1) * 1000 // self.sample_rate + 1
+            bounds = np.clip((np.arange(first_ms, last_ms + 1) * self.sample_rate + 999) // 1000, start_frame, end_frame)
+            block_gain = np.repeat(gain[first_ms:last_ms], np.diff(bounds))
+            bed = self.music.frames(start_frame, len(region))
+            bed *= block_gain[:, None]
+            mixed = region + np.rint(bed)
+            clipped = np.count_nonzero((mixed < INT16_MIN) | (mixed > INT16_MAX))
+            if clipped:
+                np.clip(mixed, INT16_MIN, INT16_MAX, out=mixed)
+                self.clipped_samples += int(clipped)
+            region[:] = mixed
+
+    def add_segment(self, segment: AudioSegment, position_ms: int) -> bool:
+        """
+        Place an AudioSegment on the timeline, converting it to the timeline format if needed
+
+        Args:
+            segment: Speech cue to place
+            position_ms: Where the cue starts, in milliseconds
+
+        Returns:
+            True if the cue was placed, False if it starts past the end of the timeline
+        """
+        return self.add(segment_to_samples(segment, self.sample_rate, self.channels), position_ms)
+
+    def _mix_into(self, buffer: np.ndarray, buffer_start: int, placements: List[Tuple[int, np.ndarray, float]]):
+        """
+        Add the given placements into a buffer where they overlap it, saturating on overlap
+
+        Args:
+            buffer: int16 samples covering [buffer_start, buffer_start + len(buffer))
+            buffer_start: Timeline sample index of buffer[0]
+            placements: Candidate placements; those outside the buffer are skipped
+        """
+        buffer_end = buffer_start + len(buffer)
+        if self.music is not None:
+            self._add_music(buffer, buffer_start)
+        for start, cue_samples, gain in placements:
+            end = start + len(cue_samples)
+            if start >= buffer_end or end <= buffer_start:
+                continue
+
+            overlap_start = max(start, buffer_start)
+            overlap_end = min(end, buffer_end)
+            region = buffer[overlap_start - buffer_start:overlap_end - buffer_start]
+
+            # Sum in 32-bit so overlapping cues saturate instead of wrapping around
+            mixed = region.astype(np.int32)
+            cue = cue_samples[overlap_start - start:overlap_end - start]
+            if gain == 1.0:
+                mixed += cue
+            else:
+                mixed += np.rint(cue * np.float32(gain)).astype(np.int32)
+            clipped = np.count_nonzero((mixed < INT16_MIN) | (mixed > INT16_MAX))
+            if clipped:
+                np.clip(mixed, INT16_MIN, INT16_MAX, out=mixed)
+                self.clipped_samples += int(clipped)
+            region[:] = mixed
+
+    def render(self) -> np.ndarray:
+        """
+        Mix the whole timeline into one preallocated array
+
+        Returns:
+            int16 array of interleaved samples for the full duration
+        """
+        # np.zeros is lazily zero-filled by the OS, so untouched silence costs nothing up front
+        samples = np.zeros(self.sample_count, dtype=np.int16)
+        self.clipped_samples = 0
+        self._mix_into(samples, 0, sorted(self.placements, key=lambda placement: placement[0]))
+        return samples
+
+    def iter_chunks(self, chunk_ms: int = 10000) -> Iterator[np.ndarray]:
+        """
+        Mix the timeline in fixed-size chunks so memory stays flat regardless of duration
+
+        Args:
+            chunk_ms: Chunk length in milliseconds
+
+        Yields:
+            int16 arrays of interleaved samples, in timeline order
+        """
+        chunk_size = max(1, chunk_ms * self.sample_rate // 1000) * self.channels
+        self.clipped_samples = 0
+        # Sorted once; each chunk only looks at the cues still playing and the ones starting in it
+        placements = sorted(self.placements, key=lambda placement: placement[0])
+        upcoming = 0
+        playing = []
+        for chunk_start in range(0, self.sample_count, chunk_size):
+            chunk = np.zeros(min(chunk_size, self.sample_count - chunk_start), dtype=np.int16)
+            chunk_end = chunk_start + len(chunk)
+            while upcoming < len(placements) and placements[upcoming][0] < chunk_end:
+                playing.append(placements[upcoming])
+                upcoming += 1
+            self._mix_into(chunk, chunk_start, playing)
+            playing = [placement for placement in playing if placement[0] + len(placement[1]) > chunk_end]
+            yield chunk
+
+    def to_audio_segment(self) -> AudioSegment:
+        """
+        Hand the finished timeline to pydub as a single buffer for export
+
+        Returns:
+            AudioSegment backed by the mixed timeline
+        """
+        return AudioSegment(
+            data=self.render().tobytes(),
+            sample_width=2,
+            frame_rate=self.sample_rate,
+            channels=self.channels
+        )
+
+    def export_stream(self, output_file: str, bitrate: str = "128k", chunk_ms: int = 10000):
+        """
+        Encode the timeline by piping chunks into ffmpeg as they are mixed
+
+        The output format is taken from the file extension.
+
+        Args:
+            output_file: Destination audio file
+            bitrate: Encoder bitrate
+            chunk_ms: Chunk length in milliseconds
+
+        Raises:
+            RuntimeError: When ffmpeg fails to encode the audio
+        """
+        command = [
+            AudioSegment.converter, "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "s16le", "-ar", str(self.sample_rate), "-ac", str(self.channels), "-i", "pipe:0",
+            "-b:a", bitrate,
+            str(output_file),
+        ]
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            for chunk in self.iter_chunks(chunk_ms):
+                process.stdin.write(memoryview(chunk))
+        except BrokenPipeError:
+            pass
+        finally:
+            process.stdin.close()
+        stderr = process.stderr.read()
+        process.stderr.close()
+
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg could not encode {output_file}: {stderr.decode(errors='replace').strip()}")
+
+    def export_renditions(self, outputs: List[Tuple[Path, str, str]], chunk_ms: int = 10000,
+                          samples: Optional[np.ndarray] = None):
+        """
+        Encode the timeline into several formats and bitrates from a single mix
+
+        Args:
+            outputs: (output path, format, bitrate) of every rendition
+            chunk_ms: Chunk length in milliseconds fed to the encoders
+            samples: Timeline already mixed by render(); mixed chunk by chunk when omitted
+
+        Raises:
+            RuntimeError: When an encoder fails
+        """
+        chunk_size = max(1, chunk_ms * self.sample_rate // 1000) * self.channels
+        if samples is None:
+            chunks = self.iter_chunks(chunk_ms)
+        else:
+            chunks = (samples[start:start + chunk_size] for start in range(0, len(samples), chunk_size))
+        encode_pcm(chunks, outputs, self.sample_rate, self.channels, AudioSegment.converter)
+
+
+def scale_samples(samples: np.ndarray, gain_db: float) -> np.ndarray:
+    """
+    Apply a gain to int16 samples, saturating instead of wrapping around
+
+    Args:
+        samples: int16 samples (a memory-mapped array is left untouched)
+        gain_db: Gain in dB
+
+    Returns:
+        Scaled int16 samples; the input itself when the gain is 0 dB
+    """
+    if not gain_db:
+        return samples
+    scaled = np.rint(samples * np.float32(10 ** (gain_db / 20)))
+    np.clip(scaled, INT16_MIN, INT16_MAX, out=scaled)
+    return scaled.astype(np.int16)
+
+
+def segment_to_samples(segment: AudioSegment, sample_rate: int = 44100, channels: int = 1) -> np.ndarray:
+    """
+    Convert an AudioSegment to interleaved int16 samples in the given format
+
+    Args:
+        segment: Audio to convert
+        sample_rate: Target sample rate in Hz
+        channels: Target channel count
+
+    Returns:
+        int16 NumPy array of interleaved samples
+    """
+    if segment.frame_rate != sample_rate:
+        segment = segment.set_frame_rate(sample_rate)
+    if segment.channels != channels:
+        segment = segment.set_channels(channels)
+    if segment.sample_width != 2:
+        segment = segment.set_sample_width(2)
+    return np.frombuffer(segment.raw_data, dtype=np.int16)
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Couch to 5K TTS Backends
+Interchangeable speech engines: the ElevenLabs API, an offline espeak-ng voice for draft
+renders, and an ElevenLabs-compatible mock server for network-free testing
+"""
+
+import base64
+import shutil
+import subprocess
+import threading
+from typing import Dict, Iterator, Optional, Tuple
+
+from tts_transport import TTSTransport
+
+TTS_BACKENDS = ("elevenlabs", "local", "mock", "tone")
+ELEVENLABS_API_URL = "https://api.elevenlabs.io"
+DEFAULT_MOCK_URL = "http://127.0.0.1:8765"
+# Format requested from the streaming endpoint; matches the internal PCM sample rate
+STREAM_OUTPUT_FORMAT = "mp3_44100_128"
+# Default speaking rate of the local backend and cue length of the tone backend
+ESPEAK_WORDS_PER_MINUTE = 165
+TONE_SECONDS = 2.0
+
+
+class TTSBackend:
+    """
+    Base class of speech engines
+
+    voice_id and model_id identify the rendered voice; they are part of every cue
+    cache key and build fingerprint, so cues from different engines never mix.
+    """
+    name = "base"
+    # Whether synthesize_with_timestamps is available for batched requests
+    supports_alignment = False
+    # Whether synthesize_stream yields MP3 chunks as the provider produces them
+    supports_streaming = False
+    # Remote backends are paced by the rate limiter and retried on HTTP 429
+    remote = True
+
+    def __init__(self, voice_id: str, model_id: str):
+        self.voice_id = voice_id
+        self.model_id = model_id
+
+    def synthesize(self, text: str) -> bytes:
+        """
+        Convert one cue to speech
+
+        Args:
+            text: Normalized cue text
+
+        Returns:
+            Encoded audio bytes (MP3 or WAV)
+        """
+        raise NotImplementedError
+
+    def synthesize_with_timestamps(self, text: str) -> Tuple[bytes, Dict]:
+        """
+        Convert text to speech along with its character alignment
+
+        Args:
+            text: Text to synthesize
+
+        Returns:
+            Tuple of (encoded audio bytes, alignment dictionary in the ElevenLabs format)
+        """
+        raise NotImplementedError(f"The {self.name} backend does not provide alignment timestamps")
+
+    def synthesize_stream(self, text: str) -> Iterator[bytes]:
+        """
+        Convert one cue to speech, yielding MP3 chunks as they arrive
+
+        Args:
+            text: Normalized cue text
+
+        Yields:
+            Consecutive chunks of MP3 audio
+        """
+        raise NotImplementedError(f"The {self.name} backend does not stream audio")
+
+    def connection_stats(self) -> Dict[str, int]:
+        """HTTP requests made and connections opened so far (empty for local backends)"""
+        return {}
+
+
+class ElevenLabsBackend(TTSBackend):
+    name = "elevenlabs"
+    supports_alignment = True
+    supports_streaming = True
+
+    def __init__(self, api_key: str, voice_id: str, model_id: str, base_url: str = ELEVENLABS_API_URL,
+                 pool_size: int = 4):
+        """
+        Initialize the ElevenLabs backend
+
+        Every request goes through one pooled transport, so cues reuse keep-alive
+        connections instead of paying a new TCP and TLS handshake each.
+
+        Args:
+            api_key: ElevenLabs API key
+            voice_id: ElevenLabs voice ID
+            model_id: ElevenLabs model ID
+            base_url: API root; point it at another server that speaks the same protocol
+            pool_size: Keep-alive connections held open; match the request concurrency
+        """
+        super().__init__(voice_id, model_id)
+        # Model ID sent with requests; subclasses may cache under a different model_id
+        self.request_model_id = model_id
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.transport = TTSTransport(pool_size)
+
+    def _endpoint(self, suffix: str = "") -> str:
+        return f"{self.base_url}/v1/text-to-speech/{self.voice_id}{suffix}"
+
+    def synthesize(self, text: str) -> bytes:
+        return b"".join(self.synthesize_stream(text))
+
+    def synthesize_stream(self, text: str) -> Iterator[bytes]:
+        """
+        Call the streaming endpoint
+
+        Raises:
+            APIRequestError: When the API rejects the request (on the first chunk)
+        """
+        return self.transport.post_stream(
+            self._endpoint("/stream"),
+            headers={"xi-api-key": self.api_key},
+            payload={"text": text, "model_id": self.request_model_id},
+            params={"output_format": STREAM_OUTPUT_FORMAT}
+        )
+
+    def synthesize_with_timestamps(self, text: str) -> Tuple[bytes, Dict]:
+        """
+        Call the with-timestamps endpoint
+
+        Raises:
+            APIRequestError: When the API rejects the request
+        """
+        payload = self.transport.post_json(
+            self._endpoint("/with-timestamps"),
+            headers={"xi-api-key": self.api_key},
+            payload={"text": text, "model_id": self.request_model_id}
+        )
+        return base64.b64decode(payload["audio_base64"]), payload["alignment"]
+
+    def connection_stats(self) -> Dict[str, int]:
+        return self.transport.connection_stats()
+
+
+class MockServerBackend(ElevenLabsBackend):
+    name = "mock"
+
+    def __init__(self, voice_id: str, model_id: str, base_url: str = DEFAULT_MOCK_URL, pool_size: int = 4):
+        """
+        Initialize a backend that talks to mock_tts_server.py
+
+        Requests go through the same client code as the real API; cues are cached
+        under a separate model ID so mock audio never replaces real takes.
+
+        Args:
+            voice_id: Voice ID sent to the server
+            model_id: Model ID sent to the server
+            base_url: Address of the mock server
+            pool_size: Keep-alive connections held open
+        """
+        super().__init__("mock", voice_id, model_id, base_url, pool_size)
+        self.model_id = f"mock:{model_id}"
+
+
+class EspeakBackend(TTSBackend):
+    name = "local"
+    remote = False
+
+    def __init__(self, voice: str = "en-us", words_per_minute: int = ESPEAK_WORDS_PER_MINUTE, executable: Optional[str] = None):
+        """
+        Initialize the offline espeak-ng backend
+
+        Args:
+            voice: espeak voice name
+            words_per_minute: Speaking rate
+            executable: espeak binary; espeak-ng or espeak is looked up on PATH by default
+
+        Raises:
+            RuntimeError: When no espeak binary is installed
+        """
+        super().__init__(voice, f"espeak-ng-{words_per_minute}wpm")
+        self.voice = voice
+        self.words_per_minute = words_per_minute
+        self.executable = executable or shutil.which("espeak-ng") or shutil.which("espeak")
+        if not self.executable:
+            raise RuntimeError("espeak-ng not found. Install it (apt install espeak-ng / brew install espeak-ng) "
+                               "to use the local TTS backend.")
+
+    def synthesize(self, text: str) -> bytes:
+        """
+        Synthesize a cue locally
+
+        Raises:
+            RuntimeError: When espeak fails
+        """
+        result = subprocess.run(
+            [self.executable, "--stdout", "-v", self.voice, "-s", str(self.words_per_minute), text],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"espeak failed: {result.stderr.decode(errors='replace').strip()}")
+        return result.stdout
+
+
+class ToneBackend(TTSBackend):
+    name = "tone"
+    remote = False
+
+    def __init__(self, seconds: float = TONE_SECONDS):
+        """
+        Initialize a backend that answers every cue with the same fixed-length tone
+
+        Synthesis is free and instant, while cues still go through MP3 decoding, so
+        benchmarks measure the rest of the pipeline with no network involved.
+
+        Args:
+            seconds: Length of every cue
+        """
+        super().__init__("tone", f"tone-{seconds:g}s")
+        self.seconds = seconds
+        self._audio = None
+        self._lock = threading.Lock()
+
+    def synthesize(self, text: str) -> bytes:
+        with self._lock:
+            if self._audio is None:
+                # Imported here so numpy and the server module are only loaded when this backend is used
+                import numpy as np
+                from mock_tts_server import SAMPLE_RATE, encode_mp3
+                t = np.arange(int(self.seconds * SAMPLE_RATE)) / SAMPLE_RATE
+                self._audio = encode_mp3((np.sin(2 * np.pi * 220 * t) * 8000).astype(np.int16))
+            return self._audio
+
+
+def create_tts_backend(name: str, api_key: str = "", voice_id: str = "21m00Tcm4TlvDq8ikWAM",
+                       model_id: str = "eleven_monolingual_v1", url: Optional[str] = None,
+                       local_voice: str = "en-us", pool_size: int = 4) -> TTSBackend:
+    """
+    Create a TTS backend by name
+
+    Args:
+        name: One of TTS_BACKENDS
+        api_key: ElevenLabs API key (elevenlabs backend only)
+        voice_id: ElevenLabs voice ID (elevenlabs and mock backends)
+        model_id: ElevenLabs model ID (elevenlabs and mock backends)
+        url: Server address overriding the default of the elevenlabs or mock backend
+        local_voice: espeak voice name (local backend only)
+        pool_size: Keep-alive HTTP connections (elevenlabs and mock backends)
+
+    Returns:
+        Configured backend
+
+    Raises:
+        ValueError: When the backend name is unknown
+    """
+    if name == "elevenlabs":
+        return ElevenLabsBackend(api_key, voice_id, model_id, url or ELEVENLABS_API_URL, pool_size)
+    if name == "mock":
+        return MockServerBackend(voice_id, model_id, url or DEFAULT_MOCK_URL, pool_size)
+    if name == "local":
+        return EspeakBackend(local_voice)
+    if name == "tone":
+        return ToneBackend()
+    raise ValueError(f"Unknown TTS backend: {name} (choose from {', '.join(TTS_BACKENDS)})")
+
+
+def backend_identity(name: str, voice_id: str = "21m00Tcm4TlvDq8ikWAM", model_id: str = "eleven_monolingual_v1",
+                     local_voice: str = "en-us") -> Tuple[str, str]:
+    """
+    Voice and model ID a backend records in cue keys and build fingerprints, without creating it
+
+    Creating the local backend needs espeak installed and the remote ones open connection
+    pools; a dry run only needs to know what a build would be fingerprinted with.
+
+    Args:
+        name: One of TTS_BACKENDS
+        voice_id: ElevenLabs voice ID (elevenlabs and mock backends)
+        model_id: ElevenLabs model ID (elevenlabs and mock backends)
+        local_voice: espeak voice name (local backend only)
+
+    Returns:
+        (voice_id, model_id) as the backend created by create_tts_backend would report them
+
+    Raises:
+        ValueError: When the backend name is unknown
+    """
+    if name == "elevenlabs":
+        return voice_id, model_id
+    if name == "mock":
+        return voice_id, f"mock:{model_id}"
+    if name == "local":
+        return local_voice, f"espeak-ng-{ESPEAK_WORDS_PER_MINUTE}wpm"
+    if name == "tone":
+        return "tone", f"tone-{TONE_SECONDS:g}s"
+    raise ValueError(f"Unknown TTS backend: {name} (choose from {', '.join(TTS_BACKENDS)})")
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Couch to 5K TTS Transport
+Pooled keep-alive HTTP connections for TTS requests and an incremental decoder fed while audio downloads
+"""
+
+import threading
+import subprocess
+from typing import Dict, Iterator, List, Optional
+
+
+class APIRequestError(Exception):
+    """Raised when a direct HTTP call to the ElevenLabs API fails"""
+    def __init__(self, status_code: int, body: str):
+        super().__init__(f"status_code: {status_code}, body: {body}")
+        self.status_code = status_code
+        self.body = body
+
+
+def counting_pool(base: type, on_new_connection) -> type:
+    """
+    Connection pool class that reports every connection it opens
+
+    Args:
+        base: urllib3 HTTPConnectionPool or HTTPSConnectionPool
+        on_new_connection: Called without arguments each time a connection is created
+
+    Returns:
+        Subclass of base to register in PoolManager.pool_classes_by_scheme
+    """
+    class CountingPool(base):
+        def _new_conn(self):
+            on_new_connection()
+            return super()._new_conn()
+
+    CountingPool.__name__ = f"Counting{base.__name__}"
+    return CountingPool
+
+
+class TTSTransport:
+    def __init__(self, pool_size: int = 4, timeout: float = 120, chunk_size: int = 4096):
+        """
+        Initialize the transport
+
+        One session holds a pool of keep-alive connections per host, sized to the
+        number of concurrent requests, so consecutive cues reuse warm TCP/TLS
+        connections instead of reconnecting.
+
+        Args:
+            pool_size: Connections kept open per host, and host pools kept; match the request concurrency
+            timeout: Seconds to wait for the server to start answering
+            chunk_size: Bytes read from a streaming response at a time
+        """
+        # Imported on first use: local backends and dry runs never load the HTTP stack
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.requests_made = 0
+        self.connections_opened = 0
+        self._stats_lock = threading.Lock()
+
+        pool_size = max(1, pool_size)
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+        # Count connections as the pools open them instead of reading urllib3's internals
+        self.adapter.poolmanager.pool_classes_by_scheme = {
+            "http": counting_pool(HTTPConnectionPool, self._count_connection),
+            "https": counting_pool(HTTPSConnectionPool, self._count_connection),
+        }
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+    def _count_connection(self):
+        with self._stats_lock:
+            self.connections_opened += 1
+
+    def _count_request(self):
+        with self._stats_lock:
+            self.requests_made += 1
+
+    def post_stream(self, url: str, headers: Dict, payload: Dict, params: Optional[Dict] = None) -> Iterator[bytes]:
+        """
+        POST a request and yield the response body in chunks as it arrives
+
+        Args:
+            url: Endpoint URL
+            headers: Request headers
+            payload: JSON body
+            params: Query parameters
+
+        Yields:
+            Response body chunks
+
+        Raises:
+            APIRequestError: When the server answers with an error status
+        """
+        self._count_request()
+        response = self.session.post(url, headers=headers, json=payload, params=params,
+                                     stream=True, timeout=self.timeout)
+        try:
+            if response.status_code != 200:
+                raise APIRequestError(response.status_code, response.text)
+            for chunk in response.iter_content(self.chunk_size):
+                if chunk:
+                    yield chunk
+        finally:
+            # A fully read response hands its connection back to the pool
+            response.close()
+
+    def post_json(self, url: str, headers: Dict, payload: Dict) -> Dict:
+        """
+        POST a request and return its JSON response
+
+        Raises:
+            APIRequestError: When the server answers with an error status
+        """
+        self._count_request()
+        response = self.session.post(url, headers=headers, json=payload, timeout=self.timeout)
+        if response.status_code != 200:
+            raise APIRequestError(response.status_code, response.text)
+        return response.json()
+
+    def connection_stats(self) -> Dict[str, int]:
+        """
+        Count requests and the connections opened to serve them
+
+        Returns:
+            Dictionary with "requests" and "connections"; requests minus
+            connections is the number of requests served on a reused connection
+        """
+        with self._stats_lock:
+            return {"requests": self.requests_made, "connections": self.connections_opened}
+
+
+class StreamingDecoder:
+    def __init__(self, sample_rate: int, channels: int, converter: str = "ffmpeg",
+                 input_format: Optional[str] = None):
+        """
+        Start an ffmpeg process that decodes audio while it is still downloading
+
+        Encoded chunks go to ffmpeg's stdin as they arrive and PCM is drained from
+        its stdout on a background thread, so when the last chunk lands only the
+        tail of the cue is left to decode.
+
+        Args:
+            sample_rate: Output sample rate in Hz
+            channels: Output channel count
+            converter: ffmpeg executable
+            input_format: ffmpeg demuxer name (e.g. "mp3") to skip format probing
+        """
+        command = [converter, "-hide_banner", "-loglevel", "error"]
+        if input_format:
+            command += ["-f", input_format]
+        command += ["-i", "pipe:0", "-f", "s16le", "-acodec", "pcm_s16le",
+                    "-ar", str(sample_rate), "-ac", str(channels), "pipe:1"]
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.PIPE)
+        self._pcm: List[bytes] = []
+        self._stderr: List[bytes] = []
+        self._readers = [
+            threading.Thread(target=self._drain, args=(self.process.stdout, self._pcm), daemon=True),
+            threading.Thread(target=self._drain, args=(self.process.stderr, self._stderr), daemon=True),
+        ]
+        for reader in self._readers:
+            reader.start()
+        self._broken = False
+
+    @staticmethod
+    def _drain(stream, sink: List[bytes]):
+        for block in iter(lambda: stream.read(65536), b""):
+            sink.append(block)
+        stream.close()
+
+    def feed(self, chunk: bytes):
+        """Send an encoded chunk to the decoder"""
+        if self._broken:
+            return
+        try:
+            self.process.stdin.write(chunk)
+        except BrokenPipeError:
+            # ffmpeg gave up; finish() reports why
+            self._broken = True
+
+    def finish(self) -> bytes:
+        """
+        Wait for the remaining audio to be decoded
+
+        Returns:
+            Raw PCM bytes
+
+        Raises:
+            RuntimeError: When ffmpeg cannot decode the audio
+        """
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        for reader in self._readers:
+            reader.join()
+        if self.process.wait() != 0:
+            stderr = b"".join(self._stderr).decode(errors="replace").strip()
+            raise RuntimeError(f"ffmpeg could not decode audio: {stderr}")
+        return b"".join(self._pcm)
+
+    def abort(self):
+        """Stop decoding after a failed download"""
+        self.process.kill()
+        try:
+            self.process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.wait()
+        for reader in self._readers:
+            reader.join()
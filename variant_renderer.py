@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""
+Couch to 5K Variant Renderer
+Personalized renders of the workouts (names, longer warm-ups, slower intervals) built from shared cue audio
+"""
+
+import re
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Set, Tuple
+
+from build_manifest import BuildManifest, build_fingerprint
+from cue_cache import normalize_cue_text
+
+if TYPE_CHECKING:
+    import numpy as np
+    from generate_audio import C25KAudioGenerator
+
+# Variant ids become directory names
+VARIANT_ID = re.compile(r'[A-Za-z0-9][A-Za-z0-9_.-]*')
+# Same tail of silence build_timeline adds after the last cue
+BUFFER_SECONDS = 10
+
+# A cue as rendered for one variant: timestamp and the fragment texts spoken back to back
+VariantCue = Tuple[float, Tuple[str, ...]]
+
+# The same cue texts come up for every variant
+_normalize = lru_cache(maxsize=65536)(normalize_cue_text)
+
+
+def parse_variant(entry: Dict) -> Dict:
+    """
+    Validate one variant definition
+
+    Args:
+        entry: Variant fields: id (output directory name), substitutions (list of
+               {"find", "replace"} applied to cue text, or a {find: replace} mapping),
+               shifts (list of {"after", "by"} in seconds: cues at or after "after"
+               move by "by", and the workout grows by it) and scripts (optional list
+               of script names to render; all scripts by default)
+
+    Returns:
+        Normalized variant with id, substitutions as (find, replace) pairs,
+        shifts as (after, by) pairs and scripts as a set of names or None
+
+    Raises:
+        ValueError: When a field is missing or invalid
+    """
+    variant_id = str(entry.get("id", "")).strip()
+    if not VARIANT_ID.fullmatch(variant_id):
+        raise ValueError(f"Invalid variant id: {variant_id!r} (letters, digits, '_', '-' and '.')")
+
+    substitutions = entry.get("substitutions") or []
+    if isinstance(substitutions, dict):
+        substitutions = [{"find": find, "replace": replace} for find, replace in substitutions.items()]
+    pairs = []
+    for substitution in substitutions:
+        find = str(substitution.get("find", ""))
+        if not find:
+            raise ValueError(f"Variant {variant_id}: substitution without 'find'")
+        pairs.append((find, str(substitution.get("replace", ""))))
+
+    shifts = []
+    for shift in entry.get("shifts") or []:
+        try:
+            shifts.append((float(shift["after"]), float(shift["by"])))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Variant {variant_id}: shifts need numeric 'after' and 'by' seconds")
+
+    scripts = entry.get("scripts")
+    return {
+        "id": variant_id,
+        "substitutions": pairs,
+        "shifts": sorted(shifts),
+        "scripts": {Path(name).stem for name in scripts} if scripts else None,
+    }
+
+
+def read_variants(variants_file: str) -> List[Dict]:
+    """
+    Read variant definitions from a JSONL file (one JSON object per line)
+
+    Returns:
+        Validated variants, in file order
+
+    Raises:
+        ValueError: When a line is not valid JSON, a variant is invalid or an id repeats
+    """
+    variants = []
+    seen: Set[str] = set()
+    with open(variants_file, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                variant = parse_variant(json.loads(line))
+            except (json.JSONDecodeError, ValueError) as e:
+                raise ValueError(f"{variants_file}:{line_number}: {e}")
+            if variant["id"] in seen:
+                raise ValueError(f"{variants_file}:{line_number}: duplicate variant id {variant['id']}")
+            seen.add(variant["id"])
+            variants.append(variant)
+    return variants
+
+
+def split_fragments(text: str, substitutions: List[Tuple[str, str]]) -> Tuple[str, ...]:
+    """
+    Cut a cue around its substituted spans
+
+    The text between substitutions is the same for every variant, so it becomes
+    a fragment of its own that is synthesized once and shared; only the
+    replacement texts are specific to a variant.
+
+    Args:
+        text: Cue text from the script
+        substitutions: (find, replace) pairs, applied left to right
+
+    Returns:
+        Non-empty normalized fragments; a single fragment when nothing matched
+    """
+    if not any(find in text for find, _ in substitutions):
+        fragment = _normalize(text)
+        return (fragment,) if fragment else ()
+
+    pieces = [(text, False)]
+    for find, replace in substitutions:
+        next_pieces = []
+        for piece, substituted in pieces:
+            if substituted or find not in piece:
+                next_pieces.append((piece, substituted))
+                continue
+            parts = piece.split(find)
+            for i, part in enumerate(parts):
+                if i:
+                    next_pieces.append((replace, True))
+                next_pieces.append((part, False))
+        pieces = next_pieces
+    fragments = (_normalize(piece) for piece, _ in pieces)
+    return tuple(fragment for fragment in fragments if fragment)
+
+
+def shift_seconds(timestamp: float, shifts: List[Tuple[float, float]]) -> float:
+    """Total shift applied to a point in the workout"""
+    return sum(by for after, by in shifts if timestamp >= after)
+
+
+def apply_variant(timestamps: List[Tuple[float, str]], duration: int, variant: Dict,
+                  split: bool = True) -> Tuple[List[VariantCue], int]:
+    """
+    Work out a variant's cues from the base script
+
+    Args:
+        timestamps: Base script cues as (timestamp_seconds, text)
+        duration: Base workout duration in seconds
+        variant: Variant from parse_variant
+        split: If True, substituted cues are spoken as separate fragments so the
+               unchanged parts are shared; if False, each substituted cue is one new text
+
+    Returns:
+        Tuple of (cues as (timestamp, fragments), duration in seconds)
+
+    Raises:
+        ValueError: When a shift moves a cue before the start of the workout
+    """
+    substitutions = variant["substitutions"]
+    shifts = variant["shifts"]
+    cues = []
+    for timestamp, text in timestamps:
+        if split:
+            fragments = split_fragments(text, substitutions)
+        else:
+            for find, replace in substitutions:
+                text = text.replace(find, replace)
+            fragment = _normalize(text)
+            fragments = (fragment,) if fragment else ()
+        if not fragments:
+            continue
+        shifted = timestamp + shift_seconds(timestamp, shifts)
+        if shifted < 0:
+            raise ValueError(f"Variant {variant['id']}: the cue at {timestamp:g}s would move before the start")
+        cues.append((shifted, fragments))
+    cues.sort(key=lambda cue: cue[0])
+    return cues, max(0, int(round(duration + shift_seconds(duration, shifts))))
+
+
+class VariantRenderer:
+    def __init__(self, generator: "C25KAudioGenerator", output_dir: str = "generated_audio/variants",
+                 split: bool = True, jobs: int = 1):
+        """
+        Initialize the variant renderer
+
+        Every distinct fragment across all variants and scripts is synthesized once
+        through the generator (and kept in its cue cache), then decoded once per
+        script; each variant's timeline only references those shared samples, so a
+        render costs one linear mix and an encode.
+
+        Args:
+            generator: Generator providing the TTS backend, cue cache, export settings and metrics
+            output_dir: Directory that receives one subdirectory per variant
+            split: Speak substituted cues as separate fragments (see apply_variant)
+            jobs: Variants rendered at the same time; encoding runs in ffmpeg, so threads overlap it
+
+        Raises:
+            ValueError: When the generator has no cue cache to share fragments through
+        """
+        if generator.cache is None:
+            raise ValueError("Variant rendering shares fragments through the cue cache; it cannot run with --no-cache")
+        self.generator = generator
+        self.output_dir = Path(output_dir)
+        self.split = split
+        self.jobs = max(1, jobs)
+        self.stats = {"rendered": 0, "skipped": 0, "incomplete": 0, "failed": 0, "fragments": 0, "synthesized": 0}
+
+    def variant_manifest(self, variant_id: str) -> BuildManifest:
+        return BuildManifest(self.output_dir / variant_id)
+
+    def output_path(self, variant_id: str, script_file: str) -> Path:
+        return self.output_dir / variant_id / f"{Path(script_file).stem}.{self.generator.audio_format}"
+
+    def fingerprint(self, cues: List[VariantCue], duration: int) -> Dict:
+        generator = self.generator
+        timestamps = [(timestamp, "\x1f".join(fragments)) for timestamp, fragments in cues]
+        return build_fingerprint(timestamps, duration, generator.tts.voice_id, generator.tts.model_id,
+                                 generator.audio_format, generator.bitrate, generator.renditions[1:],
+                                 generator.music_fingerprint,
+                                 generator.loudness_fingerprint)
+
+    def plan(self, script_files: List[Path], variants: List[Dict], fragments: Dict[str, None],
+             force_regenerate: bool = False) -> List[Tuple[Path, List[Tuple[Dict, Dict]]]]:
+        """
+        Find every stale (variant, script) render and the fragments they need
+
+        Only fingerprints are kept; a variant's cues are cheap to work out again
+        from the base script when it is rendered.
+
+        Args:
+            script_files: Base scripts
+            variants: Variants from read_variants
+            fragments: Receives every fragment text needed, in first-use order
+            force_regenerate: Treat every render as stale
+
+        Returns:
+            (script file, [(variant, fingerprint), ...]) for every script with work to do
+        """
+        plans = []
+        for script_file in script_files:
+            timestamps, duration = self.generator.load_script(str(script_file))
+            if not timestamps:
+                continue
+            script_name = script_file.stem
+            renders = []
+            for variant in variants:
+                if variant["scripts"] is not None and script_name not in variant["scripts"]:
+                    continue
+                cues, variant_duration = apply_variant(timestamps, duration, variant, self.split)
+                fingerprint = self.fingerprint(cues, variant_duration)
+                output_file = self.output_path(variant["id"], str(script_file))
+                extra_outputs = [path for path, _, _ in self.generator.rendition_outputs(output_file)[1:]]
+                if not force_regenerate and not self.variant_manifest(variant["id"]).stale_reasons(
+                        script_name, output_file, fingerprint, extra_outputs):
+                    self.stats["skipped"] += 1
+                    continue
+                renders.append((variant, fingerprint))
+                for _, cue_fragments in cues:
+                    for fragment in cue_fragments:
+                        fragments[fragment] = None
+            if renders:
+                plans.append((script_file, renders))
+        return plans
+
+    def synthesize_fragments(self, fragments: List[str]) -> Set[str]:
+        """
+        Make sure every fragment is in the cue cache, requesting each missing one once
+
+        Args:
+            fragments: Distinct fragment texts
+
+        Returns:
+            Cue keys of the fragments that could not be synthesized
+
+        Raises:
+            QuotaExceededException: When API quota is exceeded
+        """
+        from generate_audio import QuotaExceededException
+
+        generator = self.generator
+        missing = [text for text in fragments if not generator.is_synthesized(generator.cue_key(text))]
+        print(f"🧩 Fragments: {len(fragments)} unique, {len(missing)} to synthesize")
+        if not missing:
+            return set()
+
+        generator.prefetch_batched(missing)
+
+        def fetch(text: str) -> bool:
+            try:
+                generator.get_speech_bytes(text)
+                return True
+            except QuotaExceededException:
+                raise
+            except Exception as e:
+                generator._handle_speech_error(e, text)
+                return False
+
+        results = generator._synthesize_concurrently(fetch, missing, "Fragment")
+        self.stats["synthesized"] += sum(1 for result in results if result)
+        return {generator.cue_key(text) for text, result in zip(missing, results) if not result}
+
+    def decode_fragments(self, fragments: List[str]) -> Dict[str, "np.ndarray"]:
+        """Load and loudness-normalize each fragment once into timeline-format samples, keyed by cue key"""
+        from timeline_mixer import scale_samples
+
+        generator = self.generator
+        samples = {}
+        for text in fragments:
+            key = generator.cue_key(text)
+            if key in samples:
+                continue
+            # Memory-mapped from the PCM store when the fragment was decoded before
+            fragment = generator.stored_samples(text)
+            if fragment is None:
+                continue
+            samples[key] = scale_samples(fragment, generator.cue_gain_db(text, samples=fragment))
+        return samples
+
+    def join_cues(self, variant_cues: List[Tuple[List[VariantCue], int]],
+                  fragment_samples: Dict[str, "np.ndarray"]) -> Dict[Tuple[str, ...], "np.ndarray"]:
+        """
+        Join the fragments of every distinct cue once, before variants are rendered in parallel
+
+        Args:
+            variant_cues: Results of apply_variant for the variants of one script
+            fragment_samples: Decoded fragments by cue key
+
+        Returns:
+            Cue samples by their fragment keys; cues missing a fragment are left out
+        """
+        import numpy as np
+
+        generator = self.generator
+        joined = {}
+        for cues, _ in variant_cues:
+            for _, fragments in cues:
+                keys = tuple(generator.cue_key(fragment) for fragment in fragments)
+                if not keys or keys in joined or not all(key in fragment_samples for key in keys):
+                    continue
+                parts = [fragment_samples[key] for key in keys]
+                joined[keys] = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        return joined
+
+    def render_variant(self, script_file: Path, variant: Dict, cues: List[VariantCue], duration: int,
+                       fingerprint: Dict, fragment_samples: Dict[str, "np.ndarray"],
+                       cue_samples: Dict[Tuple[str, ...], "np.ndarray"]) -> bool:
+        """
+        Mix and export one variant of a script from decoded fragments
+
+        Args:
+            script_file: Base script
+            variant: Variant being rendered
+            cues: Variant cues from apply_variant
+            duration: Variant duration in seconds
+            fingerprint: Build fingerprint recorded once the render is complete
+            fragment_samples: Decoded fragments by cue key
+            cue_samples: Cues from join_cues, shared read-only between variants
+
+        Returns:
+            True if every fragment was available (the render is recorded as up to date)
+        """
+        import numpy as np
+        from generate_audio import CHANNELS, SAMPLE_RATE
+        from timeline_mixer import TimelineMixer
+
+        generator = self.generator
+        output_file = self.output_path(variant["id"], str(script_file))
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+
+        complete = True
+        mixer = TimelineMixer((duration + BUFFER_SECONDS) * 1000, SAMPLE_RATE, CHANNELS)
+        for timestamp, fragments in cues:
+            keys = tuple(generator.cue_key(fragment) for fragment in fragments)
+            samples = cue_samples.get(keys)
+            if samples is None:
+                # A fragment is missing: mix the ones there are
+                parts = [fragment_samples[key] for key in keys if key in fragment_samples]
+                if len(parts) < len(keys):
+                    complete = False
+                if not parts:
+                    continue
+                samples = parts[0] if len(parts) == 1 else np.concatenate(parts)
+            mixer.add(samples, int(timestamp * 1000))
+
+        generator.apply_music_bed(mixer)
+        generator.export_timeline(mixer, output_file)
+
+        if complete:
+            self.variant_manifest(variant["id"]).record(script_file.stem, str(script_file), output_file, fingerprint)
+        return complete
+
+    def render_all(self, script_files: List[Path], variants: List[Dict], force_regenerate: bool = False) -> Dict[str, int]:
+        """
+        Render every variant of every script
+
+        Fragments for all stale renders are synthesized up front, so the API sees
+        each distinct fragment once no matter how many variants share it. Scripts
+        are then rendered one at a time, keeping only one script's decoded
+        fragments in memory.
+
+        Args:
+            script_files: Base scripts
+            variants: Variants from read_variants
+            force_regenerate: Render even variants whose outputs are up to date
+
+        Returns:
+            Counts of rendered, skipped, incomplete and failed outputs, unique fragments and fragments synthesized
+
+        Raises:
+            QuotaExceededException: When API quota is exceeded
+        """
+        all_fragments: Dict[str, None] = {}
+        plans = self.plan(script_files, variants, all_fragments, force_regenerate)
+        self.stats["fragments"] = len(all_fragments)
+        total = sum(len(renders) for _, renders in plans)
+        print(f"👥 {len(variants)} variants: {total} renders to do, {self.stats['skipped']} up to date")
+        if not total:
+            return self.stats
+
+        failed_keys = self.synthesize_fragments(list(all_fragments))
+        if failed_keys:
+            print(f"⚠️  {len(failed_keys)} fragments could not be synthesized; affected renders will be rebuilt next run")
+
+        done = 0
+        for script_file, renders in plans:
+            started = time.perf_counter()
+            timestamps, duration = self.generator.load_script(str(script_file))
+            variant_cues = [apply_variant(timestamps, duration, variant, self.split) for variant, _ in renders]
+            fragment_samples = self.decode_fragments(list(dict.fromkeys(
+                fragment for cues, _ in variant_cues for _, fragments in cues for fragment in fragments
+            )))
+            cue_samples = self.join_cues(variant_cues, fragment_samples)
+
+            def render(item) -> str:
+                (variant, fingerprint), (cues, variant_duration) = item
+                try:
+                    with self.generator.metrics.script(f"{variant['id']}/{script_file.stem}"):
+                        rendered = self.render_variant(script_file, variant, cues, variant_duration, fingerprint,
+                                                       fragment_samples, cue_samples)
+                    if rendered:
+                        return "rendered"
+                    # Written with silence where fragments are missing, and rebuilt next run
+                    return "incomplete"
+                except (OSError, RuntimeError) as e:
+                    print(f"❌ {variant['id']}/{script_file.stem}: {e}")
+                    return "failed"
+
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                for outcome in executor.map(render, zip(renders, variant_cues)):
+                    self.stats[outcome] += 1
+                    done += 1
+            elapsed = time.perf_counter() - started
+            print(f"  {script_file.stem}: {len(renders)} variants from {len(fragment_samples)} fragments "
+                  f"in {elapsed:.1f}s ({done}/{total})")
+
+        return self.stats